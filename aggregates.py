@@ -0,0 +1,64 @@
+import threading
+from decimal import Decimal
+
+from config import DASHBOARD_SUMMARY_TABLE
+from db import SQL_DASHBOARD_BY_ROOM_TYPE, SQL_DASHBOARD_SUMMARY
+
+
+# ---------------- DASHBOARD AGGREGATES ----------------
+# Booking count, revenue and bookings per room type, loaded with one query at
+# startup and then kept current by applying each booking change as a delta.
+# Refreshing the cards and chart reads this cache, never the bookings table.
+def to_decimal(value):
+    return value if isinstance(value, Decimal) else Decimal(str(value))
+
+
+class DashboardAggregates:
+    def __init__(self, summary_table=DASHBOARD_SUMMARY_TABLE):
+        self.summary_table = summary_table
+        self._counts = {}          # room type -> bookings
+        self._revenue = {}         # room type -> sum of total_cost
+        self._lock = threading.Lock()
+        # Writers hold this around "commit + apply delta" so a resync can never
+        # count a booking that is also about to be applied as a delta.
+        self.write_lock = threading.Lock()
+
+    def resync(self, conn, before=None):
+        # Full recount. With the summary table the triggers have already done
+        # the work and this is a handful of rows; otherwise one GROUP BY scan.
+        # before(conn) runs first in the same read snapshot (the change feed
+        # marks its starting version there).
+        sql = SQL_DASHBOARD_SUMMARY if self.summary_table else SQL_DASHBOARD_BY_ROOM_TYPE
+        with self.write_lock:
+            if before is not None:
+                before(conn)
+            rows = conn.execute(sql).fetchall()
+            conn.rollback()        # don't leave a read snapshot behind for the next resync
+        with self._lock:
+            self._counts = {room_type: int(count) for room_type, count, revenue in rows}
+            self._revenue = {room_type: to_decimal(revenue) for room_type, count, revenue in rows}
+
+    def apply_insert(self, room_type, total_cost):
+        self._apply(room_type, 1, total_cost)
+
+    def apply_delete(self, room_type, total_cost):
+        self._apply(room_type, -1, -to_decimal(total_cost))
+
+    def apply_update(self, old_room_type, old_total, new_room_type, new_total):
+        with self._lock:
+            self._apply_locked(old_room_type, -1, -to_decimal(old_total))
+            self._apply_locked(new_room_type, 1, new_total)
+
+    def snapshot(self):
+        # (total bookings, total revenue, [(room type, bookings), ...])
+        with self._lock:
+            per_type = sorted((t, c) for t, c in self._counts.items() if c > 0)
+            return sum(self._counts.values()), sum(self._revenue.values(), Decimal(0)), per_type
+
+    def _apply(self, room_type, count, total_cost):
+        with self._lock:
+            self._apply_locked(room_type, count, total_cost)
+
+    def _apply_locked(self, room_type, count, total_cost):
+        self._counts[room_type] = self._counts.get(room_type, 0) + count
+        self._revenue[room_type] = self._revenue.get(room_type, Decimal(0)) + to_decimal(total_cost)
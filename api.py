@@ -0,0 +1,291 @@
+import argparse
+import datetime
+import json
+import re
+import threading
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+from mysql.connector import errors
+
+from availability import OverbookedError, stay_length
+from booking_service import BookingService
+from config import TREND_YEARS
+from db import BOOKING_COLUMNS
+
+
+# ---------------- HTTP API ----------------
+# Local JSON API over BookingService for the web booking widget and for load
+# testing. One thread per connection (ThreadingHTTPServer); the connection
+# pool bounds how many requests hit MySQL at once.
+#
+#   GET    /bookings?after=<id>&limit=<n>   keyset page in id order
+#   GET    /bookings/<id>
+#   GET    /bookings/<id>/receipt           the receipt PDF
+#   POST   /bookings                        {"name", "phone", "email", "id_number", "room_type", "nights", "check_in"}
+#   PUT    /bookings/<id>                   same body
+#   DELETE /bookings/<id>
+#   GET    /search?q=<name or id number>
+#   GET    /availability?room_type=&check_in=&nights=
+#   GET    /quote?room_type=&nights=
+#   GET    /dashboard
+#   GET    /dashboard/trend?period=day|week|month&years=<n>
+FIELDS = [column.strip() for column in BOOKING_COLUMNS.split(",")]
+BODY_FIELDS = ("name", "phone", "email", "id_number", "room_type", "nights", "check_in")
+MAX_BODY = 64 * 1024
+MAX_TREND_YEARS = 10               # a day-by-day trend is one JSON entry per day
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def to_json(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    raise TypeError(f"Not JSON serializable: {type(value).__name__}")
+
+
+def booking_dict(row):
+    return dict(zip(FIELDS, row))
+
+
+def body_fields(body):
+    if not isinstance(body, dict):
+        raise HTTPError(400, "Expected a JSON object")
+    return [body.get(field) for field in BODY_FIELDS]
+
+
+def query_value(query, name, kind=str, default=None):
+    values = query.get(name)
+    if not values:
+        if default is None:
+            raise HTTPError(400, f"Missing query parameter: {name}")
+        return default
+    try:
+        return kind(values[0])
+    except ValueError:
+        raise HTTPError(400, f"Invalid value for {name}: {values[0]}") from None
+
+
+# ---- routes: (service, url match, query, body) -> (status, payload) ----
+def list_bookings(service, match, query, body):
+    after = query_value(query, "after", int, default=0) or None
+    limit = query_value(query, "limit", int, default=100)
+    if limit < 1:
+        raise HTTPError(400, f"Invalid value for limit: {limit}")
+    limit = min(limit, 1000)
+    return 200, [booking_dict(row) for row in service.list(after, limit)]
+
+
+def get_booking(service, match, query, body):
+    return 200, booking_dict(service.get(int(match["id"])))
+
+
+def get_receipt(service, match, query, body):
+    path, cached = service.receipt(int(match["id"]))
+    with open(path, "rb") as f:
+        return 200, f.read()
+
+
+def create_booking(service, match, query, body):
+    return 201, booking_dict(service.book(*body_fields(body)))
+
+
+def update_booking(service, match, query, body):
+    return 200, booking_dict(service.update(int(match["id"]), *body_fields(body)))
+
+
+def delete_booking(service, match, query, body):
+    service.delete(int(match["id"]))
+    return 204, None
+
+
+def search_bookings(service, match, query, body):
+    return 200, [booking_dict(row) for row in service.find(query_value(query, "q"))]
+
+
+def availability(service, match, query, body):
+    room_type = query_value(query, "room_type")
+    check_in = query_value(query, "check_in", datetime.date.fromisoformat)
+    # Bounded before it reaches the availability index (MAX_STAY_NIGHTS)
+    nights = stay_length(query_value(query, "nights", int, default=1))
+    return 200, {"room_type": room_type, "check_in": check_in, "nights": nights,
+                 "free": service.free_rooms(room_type, check_in, nights)}
+
+
+def quote(service, match, query, body):
+    return 200, service.quote(query_value(query, "room_type"), query_value(query, "nights", int))
+
+
+def dashboard(service, match, query, body):
+    return 200, service.dashboard()
+
+
+def trend(service, match, query, body):
+    period = query_value(query, "period", default="month")
+    years = query_value(query, "years", int, default=TREND_YEARS)
+    if not 1 <= years <= MAX_TREND_YEARS:
+        raise HTTPError(400, f"Invalid value for years: {years} (1 to {MAX_TREND_YEARS})")
+    return 200, [{"period_start": first, "bookings": count, "revenue": revenue, "occupancy": occupancy}
+                 for first, count, revenue, occupancy in service.trend(period, years)]
+
+
+ROUTES = [
+    ("GET", r"/bookings", list_bookings),
+    ("GET", r"/bookings/(?P<id>\d+)", get_booking),
+    ("GET", r"/bookings/(?P<id>\d+)/receipt", get_receipt),
+    ("POST", r"/bookings", create_booking),
+    ("PUT", r"/bookings/(?P<id>\d+)", update_booking),
+    ("DELETE", r"/bookings/(?P<id>\d+)", delete_booking),
+    ("GET", r"/search", search_bookings),
+    ("GET", r"/availability", availability),
+    ("GET", r"/quote", quote),
+    ("GET", r"/dashboard", dashboard),
+    ("GET", r"/dashboard/trend", trend),
+]
+ROUTES = [(method, re.compile(pattern + r"/?\Z"), handler) for method, pattern, handler in ROUTES]
+
+
+class BookingRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"          # keep-alive, so clients can reuse connections
+    disable_nagle_algorithm = True         # headers and body go out as separate writes
+    server_version = "LapsaBookingAPI/1.0"
+
+    def do_GET(self):
+        self.dispatch("GET")
+
+    def do_POST(self):
+        self.dispatch("POST")
+
+    def do_PUT(self):
+        self.dispatch("PUT")
+
+    def do_DELETE(self):
+        self.dispatch("DELETE")
+
+    def dispatch(self, method):
+        url = urlsplit(self.path)
+        try:
+            handler, match = self.route(method, url.path)
+            status, payload = handler(self.server.service, match, parse_qs(url.query), self.read_body())
+        except HTTPError as err:
+            status, payload = err.status, {"error": str(err)}
+        except OverbookedError as err:
+            status, payload = 409, {"error": str(err)}
+        except ValueError as err:          # validation, same messages as the booking form
+            status, payload = 400, {"error": str(err)}
+        except LookupError as err:
+            status, payload = 404, {"error": str(err).strip("'")}
+        except errors.PoolError as err:
+            status, payload = 503, {"error": str(err)}
+        except errors.Error as err:
+            self.log_error("database error: %s", err)
+            status, payload = 500, {"error": "Database error"}
+        except Exception as err:
+            self.log_error("unhandled error: %r", err)
+            status, payload = 500, {"error": "Internal error"}
+        self.respond(status, payload)
+
+    def route(self, method, path):
+        allowed = False
+        for route_method, pattern, handler in ROUTES:
+            match = pattern.match(path)
+            if match:
+                if route_method == method:
+                    return handler, match
+                allowed = True
+        if allowed:
+            raise HTTPError(405, f"{method} not allowed on {path}")
+        raise HTTPError(404, f"No such endpoint: {path}")
+
+    def read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if not length:
+            return None
+        if length > MAX_BODY:
+            raise HTTPError(413, "Request body too large")
+        try:
+            return json.loads(self.rfile.read(length))
+        except ValueError:
+            raise HTTPError(400, "Request body is not valid JSON") from None
+
+    def respond(self, status, payload):
+        if isinstance(payload, bytes):
+            body, content_type = payload, "application/pdf"
+        elif payload is None:
+            body, content_type = b"", None
+        else:
+            body, content_type = json.dumps(payload, default=to_json).encode("utf-8"), "application/json"
+        self.send_response(status)
+        if content_type:
+            self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+
+class BookingAPIServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, service, quiet=False):
+        super().__init__(address, BookingRequestHandler)
+        self.service = service
+        self.quiet = quiet
+
+    def start(self):
+        # Serve from a background thread (tests, benchmarks); returns the thread
+        thread = threading.Thread(target=self.serve_forever, name="booking-api", daemon=True)
+        thread.start()
+        return thread
+
+
+def main():
+    #   python api.py                         # http://127.0.0.1:8080
+    #   python api.py --host 0.0.0.0 --port 9000 --quiet
+    from receipt_cache import ReceiptCache
+    from schema import migrate
+    from db import pool
+    from config import CHANGE_FEED
+    from changefeed import ChangeFeed, follow, tag_connection, terminal_id
+
+    parser = argparse.ArgumentParser(description="Local HTTP/JSON booking API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--quiet", action="store_true", help="don't log every request")
+    args = parser.parse_args()
+
+    feed = None
+    if CHANGE_FEED:
+        # Keep the caches behind /availability and /dashboard current with the desks' writes
+        feed = ChangeFeed(f"api-{terminal_id()}"[:64])
+        pool.on_connect = lambda conn: tag_connection(conn, feed.terminal)
+    with pool.connection() as conn:
+        migrate(conn)
+    service = BookingService(receipt_cache=ReceiptCache(), feed=feed)
+    service.load()
+    if feed is not None:
+        follow(feed, service.sync)
+    server = BookingAPIServer((args.host, args.port), service, quiet=args.quiet)
+    print(f"Booking API on http://{args.host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.receipt_cache.flush()
+        pool.close_all()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,58 +1,53 @@
+import datetime
 import os
 import sys
 import subprocess
-import datetime
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, filedialog
 
 import mysql.connector
 
-# ReportLab (PDF)
-from reportlab.lib.pagesizes import letter
-from reportlab.lib import colors
-from reportlab.lib.units import inch
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.platypus import (
-    SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image
+# App modules
+from config import (
+    PRICES, RECEIPTS_DIR, OCCUPANCY_DAYS, BOOKING_STORE, FAST_START, FAST_START_WARM_MS, METRICS_ENABLED,
+    STARTUP_RETRY_S, STARTUP_RETRY_MAX_S,
+    JOURNAL_ENABLED, CHANGE_FEED, CHANGE_POLL_MS, REVENUE_ROLLUPS,
 )
-from reportlab.graphics.barcode import qr
-from reportlab.graphics.shapes import Drawing
-from reportlab.graphics import renderPDF
-
-# Charts in dashboard
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-
-
-# ---------------- CONFIG ----------------
-TOTAL_ROOM_INVENTORY = 30          # adjust to your hotel inventory
-PRICES = {"Single": 50, "Double": 80, "Suite": 120}
-VAT_RATE = 0.16                    # 16% VAT (change to your region)
+from db import pool
+from tasks import TaskRunner
+from metrics import Metrics, LagProbe
+from metrics_view import MetricsWindow
+from pager import KeysetPager, first_id, last_id
+from store import BookingStore, StorePager, COLUMNS
+from schema import migrate
+from booking_service import BookingService
+from journal import BookingJournal, JournalFlusher, TRANSIENT_ERRORS, pending_key
+from changefeed import ChangeFeed, latest_rows, tag_connection
+from billing import validate_booking, format_money
+from receipt_cache import ReceiptCache
+from importer import import_bookings
+from exporter import export_bookings, format_for
 
 
 # ---------------- DATABASE CONNECTION ----------------
 def connect_db():
-    try:
-        conn = mysql.connector.connect(
-            host="localhost",
-            user="root",
-            password="",
-            database="hotel_db"
-        )
-        return conn
-    except mysql.connector.Error as err:
-        messagebox.showerror("Database Error", f"Error: {err}")
-        return None
+    # Borrow a connection from the pool; leaving the with-block (or conn.close())
+    # hands it back. Called from worker threads, so errors are raised and shown
+    # by the task runner on the Tk thread.
+    return pool.acquire()
 
 
-# ---------------- UTILITIES ----------------
-def format_money(value):
-    try:
-        return "${:,.2f}".format(float(value))
-    except Exception:
-        return f"${value}"
+# ---------------- HEAVY MODULES ----------------
+# charts (matplotlib) and receipts (ReportLab) take seconds to import on the
+# desk PCs, so they are imported where first used instead of up here. With
+# FAST_START they are warmed on a worker thread once the window is showing;
+# otherwise they are loaded before it, as before.
+def warm_heavy_modules():
+    import charts       # noqa: F401
+    import receipts     # noqa: F401
 
 
+# ---------------- UTILITIES ----------------
 def open_file(path):
     try:
         if os.name == "nt":
@@ -66,6 +61,15 @@ def open_file(path):
         pass
 
 
+# Dashboard chart picker: label -> trend period (None = bookings per room type)
+CHART_VIEWS = {
+    "Bookings per room type": None,
+    "Revenue & occupancy by day": "day",
+    "Revenue & occupancy by week": "week",
+    "Revenue & occupancy by month": "month",
+}
+
+
 # ---------------- MAIN APP ----------------
 class HotelBookingApp:
     def __init__(self, root):
@@ -92,6 +96,32 @@ class HotelBookingApp:
         )
         title.pack(fill="x")
 
+        # Status bar (busy state while background tasks run; journaled bookings not yet in MySQL)
+        status_bar = tk.Frame(root, bg="#dfe4ea")
+        status_bar.pack(side="bottom", fill="x")
+        self.journal_label = tk.Label(status_bar, text="", font=("Segoe UI", 9), bg="#dfe4ea", fg="#c0392b", padx=10)
+        self.journal_label.pack(side="right")
+        self.status_label = tk.Label(
+            status_bar,
+            text="Ready",
+            font=("Segoe UI", 9),
+            bg="#dfe4ea",
+            fg="#2c3e50",
+            anchor="w",
+            padx=10
+        )
+        self.status_label.pack(side="left", fill="x", expand=True)
+
+        # Timings of SQL, actions, tasks and event-loop lag (⏱ Performance window, slow log)
+        self.metrics = Metrics() if METRICS_ENABLED else None
+        pool.metrics = self.metrics
+        self.lag_probe = LagProbe(root, self.metrics) if self.metrics else None
+        self.metrics_window = None
+
+        # Background worker threads for DB queries and receipt builds
+        self.tasks = TaskRunner(root, on_busy=self.set_busy, on_error=self.show_task_error, metrics=self.metrics)
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+
         # Layout frames
         container = tk.Frame(root, bg="#f4f6f9")
         container.pack(fill="both", expand=True, padx=15, pady=15)
@@ -109,6 +139,7 @@ class HotelBookingApp:
         self.card_total = self.create_card(dashboard_frame, "📊 Total Bookings", "0", "#3498db")
         self.card_rooms = self.create_card(dashboard_frame, "🛏️ Available Rooms", "0", "#27ae60")
         self.card_revenue = self.create_card(dashboard_frame, "💰 Total Revenue", "$0", "#e67e22")
+        self.card_occupancy = self.create_card(dashboard_frame, f"📅 Occupancy ({OCCUPANCY_DAYS} days)", "0%", "#8e44ad")
 
         # Refresh Dashboard button (doesn't reload table)
         refresh_bar = tk.Frame(right_frame, bg="white")
@@ -116,13 +147,21 @@ class HotelBookingApp:
         ttk.Button(
             refresh_bar,
             text="⟲ Refresh Dashboard",
-            command=self.update_dashboard
-        ).pack(anchor="e", padx=5, pady=6)
+            command=self.instrumented(self.update_dashboard)
+        ).pack(side="right", padx=5, pady=6)
+        # Trend charts read the revenue rollups, never the bookings table
+        self.chart_view = tk.StringVar(value=next(iter(CHART_VIEWS)))
+        if REVENUE_ROLLUPS:
+            chart_picker = ttk.Combobox(refresh_bar, textvariable=self.chart_view, values=list(CHART_VIEWS),
+                                        width=30, state="readonly")
+            chart_picker.pack(side="left", padx=5, pady=6)
+            chart_picker.bind("<<ComboboxSelected>>", self.instrumented(self.change_chart))
 
         # ----------- Chart Section -----------
         self.chart_frame = tk.Frame(right_frame, bg="white")
         self.chart_frame.pack(fill="x", padx=10, pady=10)
-        self.chart_canvas = None
+        self.chart = None          # built on first data (imports matplotlib)
+        self.trend_chart = None    # built when a trend is first picked
         self.chart_placeholder = tk.Label(
             self.chart_frame,
             text="No data to display yet.",
@@ -138,7 +177,7 @@ class HotelBookingApp:
         form_frame.pack(pady=10)
 
         self.fields = {}
-        labels = ["Full Name", "Phone", "Email", "ID/Passport No", "Room Type", "Nights"]
+        labels = ["Full Name", "Phone", "Email", "ID/Passport No", "Room Type", "Nights", "Check-in"]
         for i, label in enumerate(labels):
             tk.Label(form_frame, text=label + ":", font=("Segoe UI", 11), bg="white", anchor="w").grid(row=i, column=0, sticky="w", pady=5)
             if label == "Room Type":
@@ -147,37 +186,169 @@ class HotelBookingApp:
             else:
                 self.fields[label] = tk.Entry(form_frame, font=("Segoe UI", 11))
             self.fields[label].grid(row=i, column=1, pady=5, padx=5)
+        self.fields["Check-in"].insert(0, datetime.date.today().isoformat())
 
         # Buttons
         btn_frame = tk.Frame(left_frame, bg="white")
         btn_frame.pack(pady=15)
-        ttk.Button(btn_frame, text="Book Now", command=self.book_room).grid(row=0, column=0, padx=5, pady=5, sticky="ew")
-        ttk.Button(btn_frame, text="Update", command=self.update_booking).grid(row=1, column=0, padx=5, pady=5, sticky="ew")
-        ttk.Button(btn_frame, text="Delete", command=self.delete_booking).grid(row=2, column=0, padx=5, pady=5, sticky="ew")
-        ttk.Button(btn_frame, text="Search", command=self.search_booking).grid(row=3, column=0, padx=5, pady=5, sticky="ew")
-        ttk.Button(btn_frame, text="View All", command=self.view_bookings).grid(row=4, column=0, padx=5, pady=5, sticky="ew")
-        ttk.Button(btn_frame, text="Generate Receipt", command=self.generate_receipt).grid(row=5, column=0, padx=5, pady=5, sticky="ew")
+        ttk.Button(btn_frame, text="Book Now", command=self.instrumented(self.book_room)).grid(row=0, column=0, padx=5, pady=5, sticky="ew")
+        ttk.Button(btn_frame, text="Update", command=self.instrumented(self.update_booking)).grid(row=1, column=0, padx=5, pady=5, sticky="ew")
+        ttk.Button(btn_frame, text="Delete", command=self.instrumented(self.delete_booking)).grid(row=2, column=0, padx=5, pady=5, sticky="ew")
+        ttk.Button(btn_frame, text="Search", command=self.instrumented(self.search_booking)).grid(row=3, column=0, padx=5, pady=5, sticky="ew")
+        ttk.Button(btn_frame, text="View All", command=self.instrumented(self.view_bookings)).grid(row=4, column=0, padx=5, pady=5, sticky="ew")
+        ttk.Button(btn_frame, text="Generate Receipt", command=self.instrumented(self.generate_receipt)).grid(row=5, column=0, padx=5, pady=5, sticky="ew")
+        ttk.Button(btn_frame, text="Batch Receipts", command=self.instrumented(self.batch_receipts)).grid(row=6, column=0, padx=5, pady=5, sticky="ew")
+        ttk.Button(btn_frame, text="Import Bookings", command=self.instrumented(self.import_file)).grid(row=7, column=0, padx=5, pady=5, sticky="ew")
+        ttk.Button(btn_frame, text="Export Bookings", command=self.instrumented(self.export_file)).grid(row=8, column=0, padx=5, pady=5, sticky="ew")
+        if self.metrics is not None:
+            ttk.Button(btn_frame, text="⏱ Performance", command=self.show_metrics).grid(row=9, column=0, padx=5, pady=5, sticky="ew")
 
         # ----------- Booking Table (Right Panel) -----------
         table_frame = tk.Frame(right_frame, bg="white")
         table_frame.pack(fill="both", expand=True, padx=10, pady=10)
 
+        # Page controls (table is loaded one keyset page at a time)
+        page_bar = tk.Frame(table_frame, bg="white")
+        page_bar.pack(side="bottom", fill="x", pady=(6, 0))
+        self.page_buttons = {
+            "first": ttk.Button(page_bar, text="⏮ First", command=self.instrumented(self.first_page)),
+            "prev": ttk.Button(page_bar, text="◀ Prev", command=self.instrumented(self.prev_page)),
+            "next": ttk.Button(page_bar, text="Next ▶", command=self.instrumented(self.next_page)),
+            "last": ttk.Button(page_bar, text="Last ⏭", command=self.instrumented(self.last_page)),
+        }
+        for name in ("first", "prev"):
+            self.page_buttons[name].pack(side="left", padx=3)
+        for name in ("last", "next"):
+            self.page_buttons[name].pack(side="right", padx=3)
+        self.page_label = tk.Label(page_bar, text="", font=("Segoe UI", 10), bg="white", fg="#7f8c8d")
+        self.page_label.pack(side="top", pady=4)
+
+        # Filters run against the in-memory booking store
+        self.filter_fields = {}
+        if BOOKING_STORE:
+            filter_bar = tk.Frame(table_frame, bg="white")
+            filter_bar.pack(side="top", fill="x", pady=(0, 6))
+            tk.Label(filter_bar, text="Room:", font=("Segoe UI", 10), bg="white").pack(side="left")
+            self.filter_fields["room"] = ttk.Combobox(filter_bar, values=["All", *PRICES], width=8, state="readonly")
+            self.filter_fields["room"].set("All")
+            self.filter_fields["room"].pack(side="left", padx=(3, 10))
+            for key, label in (("nights", "Nights:"), ("cost", "Cost:")):
+                tk.Label(filter_bar, text=label, font=("Segoe UI", 10), bg="white").pack(side="left")
+                for bound in ("min", "max"):
+                    entry = tk.Entry(filter_bar, width=7, font=("Segoe UI", 10))
+                    entry.pack(side="left", padx=2)
+                    self.filter_fields[f"{key}_{bound}"] = entry
+                tk.Frame(filter_bar, width=8, bg="white").pack(side="left")
+            ttk.Button(filter_bar, text="Filter", command=self.instrumented(self.apply_filters)).pack(side="left", padx=3)
+            ttk.Button(filter_bar, text="Clear", command=self.instrumented(self.clear_filters)).pack(side="left", padx=3)
+
         self.tree = ttk.Treeview(
             table_frame,
-            columns=("ID", "Name", "Phone", "Email", "ID No", "Room", "Nights", "Cost"),
+            columns=("ID", "Name", "Phone", "Email", "ID No", "Room", "Nights", "Cost", "Check-in"),
             show="headings"
         )
         self.tree.pack(fill="both", expand=True)
 
+        sort_by = self.instrumented(self.sort_by)
         for col in self.tree["columns"]:
-            self.tree.heading(col, text=col)
+            if BOOKING_STORE:
+                self.tree.heading(col, text=col, command=lambda c=col: sort_by(c))
+            else:
+                self.tree.heading(col, text=col)
             self.tree.column(col, anchor="center")
 
         self.tree.tag_configure("oddrow", background="#ecf0f1")
         self.tree.tag_configure("evenrow", background="white")
+        self.tree.tag_configure("pending", foreground="#95a5a6")   # still in the local journal
         self.tree.bind("<<TreeviewSelect>>", self.on_row_selected)
 
+        if BOOKING_STORE:
+            self.store = BookingStore()
+            self.pager = StorePager(self.store)
+        else:
+            self.store = None
+            self.pager = KeysetPager(connect_db)
+        self.current_page = None
+        # Booking logic and its caches live in the service; the UI reads the caches
+        self.receipt_cache = ReceiptCache()
+        # Other desks' writes arrive through the change feed, polled every CHANGE_POLL_MS;
+        # this desk's connections are tagged so it can skip its own
+        self.feed = ChangeFeed() if CHANGE_FEED else None
+        if self.feed is not None:
+            pool.on_connect = lambda conn: tag_connection(conn, self.feed.terminal)
+        self.service = BookingService(connect_db, receipt_cache=self.receipt_cache, feed=self.feed)
+        self.search = self.service.search
+        self.aggregates = self.service.aggregates
+        self.availability = self.service.availability
+        # Write-behind journal: Book/Update return once the booking is on local disk
+        self.journal = BookingJournal() if JOURNAL_ENABLED else None
+        self.flusher = None
+        self.pending = {}          # client_ref -> journal Entry not yet in MySQL
+        self.startup_retry_s = STARTUP_RETRY_S
+        self.database_down = False     # start-up failed; retrying
+        self.start_database()
+        if FAST_START:
+            # Failures are left for the first real use to report
+            self.root.after(FAST_START_WARM_MS, lambda: self.tasks.submit(
+                warm_heavy_modules, quiet=True, on_error=lambda error: None))
+        else:
+            warm_heavy_modules()
+
+    def start_database(self):
+        self.tasks.submit(self.prepare_database, on_done=self.on_database_ready,
+                          on_error=self.on_database_ready)
+
+    def prepare_database(self):
+        # Worker thread: one-off schema upgrades, then local indexes & dashboard
+        # cache. Returns the journal entries a previous session left unflushed.
+        with connect_db() as conn:
+            migrate(conn)
+        self.service.load()
+        self.load_store()
+        if self.journal is None:
+            return []
+        entries = self.journal.pending()
+        self.hold_pending_stays(entries)
+        return entries
+
+    def load_store(self):
+        # Worker thread
+        if self.store is not None:
+            with connect_db() as conn:
+                self.store.load(conn)
+
+    def on_database_ready(self, result):
+        if isinstance(result, Exception):
+            self.retry_database(result)
+            return
+        self.database_down = False
+        self.startup_retry_s = STARTUP_RETRY_S
+        if self.journal is not None:
+            # Only once the schema has client_ref; until then bookings stay journaled
+            for entry in result:
+                self.pending[entry.client_ref] = entry
+            self.flusher = JournalFlusher(self.journal, self.service, on_flushed=self.on_journal_flushed,
+                                          on_status=lambda count, error: self.tasks.post(self.show_journal_status))
+            self.flusher.start()
+            self.show_journal_status()
         self.view_bookings()
+        if self.store is not None:
+            self.tasks.submit(self.store.prepare_sorts, quiet=True, on_error=lambda error: None)
+        if self.feed is not None:
+            self.schedule_sync()
+
+    def retry_database(self, error):
+        # No database at start-up: bookings are journaled (and shown as waiting)
+        # but nothing flushes or syncs until prepare_database has run, so try
+        # it again, waiting longer each time. Other errors (a failed migration)
+        # are shown once.
+        delay = self.startup_retry_s
+        if delay == STARTUP_RETRY_S and not isinstance(error, TRANSIENT_ERRORS):
+            self.show_task_error(error)
+        self.startup_retry_s = min(delay * 2, STARTUP_RETRY_MAX_S)
+        self.database_down = True
+        self.show_journal_status()
+        self.root.after(delay * 1000, self.start_database)
 
     # ---------------- Dashboard Card ----------------
     def create_card(self, parent, title, value, color):
@@ -191,149 +362,563 @@ class HotelBookingApp:
         return label_val
 
     def update_dashboard(self):
-        conn = connect_db()
-        if conn:
-            cursor = conn.cursor()
-
-            # Total bookings
-            cursor.execute("SELECT COUNT(*) FROM bookings")
-            total_bookings = cursor.fetchone()[0]
-
-            # Revenue
-            cursor.execute("SELECT SUM(total_cost) FROM bookings")
-            revenue = cursor.fetchone()[0] or 0
-
-            # Available rooms
-            available_rooms = max(TOTAL_ROOM_INVENTORY - (total_bookings or 0), 0)
-
-            # Update dashboard labels
-            self.card_total.config(text=str(total_bookings))
-            self.card_revenue.config(text=format_money(revenue))
-            self.card_rooms.config(text=str(available_rooms))
-
-            # Update chart
-            self.update_chart(cursor)
-
-            conn.close()
-
-    def update_chart(self, cursor):
-        cursor.execute("SELECT room_type, COUNT(*) FROM bookings GROUP BY room_type")
-        data = cursor.fetchall()
-
-        # Clear old chart or placeholder
-        if self.chart_canvas:
-            self.chart_canvas.get_tk_widget().destroy()
-            self.chart_canvas = None
-        self.chart_placeholder.pack_forget()
-
+        # "⟲ Refresh Dashboard": full resync, e.g. to pick up other desks' bookings
+        self.tasks.submit(self.resync_dashboard, key="dashboard", on_done=self.show_resynced)
+
+    def resync_dashboard(self):
+        # Worker thread: other desks' changes the resync folded in still go to the table
+        changes = self.service.resync()
+        self.hold_pending_stays()
+        self.load_store()
+        return self.take_changes(changes)
+
+    def show_resynced(self, result):
+        self.show_changes(result)
+        self.show_dashboard()
+
+    def show_dashboard(self, _result=None):
+        # Reads the incrementally maintained cache: O(1) in the number of bookings
+        total_bookings, revenue, chart_data = self.aggregates.snapshot()
+
+        # Rooms free tonight, and how full the coming weeks are, from the availability index
+        available_rooms = self.availability.free_tonight()
+        nights = self.availability.occupancy()
+        taken = sum(row[1] for row in nights)
+        capacity = sum(row[2] for row in nights)
+
+        # Update dashboard labels
+        self.card_total.config(text=str(total_bookings))
+        self.card_revenue.config(text=format_money(revenue))
+        self.card_rooms.config(text=str(available_rooms))
+        self.card_occupancy.config(text=f"{taken / capacity:.0%}" if capacity else "–")
+
+        # Update chart
+        self.update_chart(chart_data)
+
+    def change_chart(self, _event=None):
+        self.show_dashboard()
+
+    def update_chart(self, data):
+        period = CHART_VIEWS[self.chart_view.get()]
+        if period is not None:
+            self.update_trend_chart(period)
+            return
         if not data:
+            self.show_chart(None)
+            return
+
+        if self.chart is None:
+            from charts import RoomTypeChart
+            self.chart = RoomTypeChart(self.chart_frame)
+        self.show_chart(self.chart)
+        # Moves the existing bars; no redraw at all if the counts are unchanged
+        self.chart.update(data)
+
+    def update_trend_chart(self, period):
+        # Cost depends on the number of days shown, not the number of bookings
+        trend = self.service.trend(period)
+        if not any(row[1] for row in trend):
+            self.show_chart(None)
+            return
+        if self.trend_chart is None:
+            from charts import TrendChart
+            self.trend_chart = TrendChart(self.chart_frame)
+        self.show_chart(self.trend_chart)
+        self.trend_chart.update(period, trend)
+
+    def show_chart(self, chart):
+        # One chart in the chart frame at a time; None shows the placeholder
+        for other in (self.chart, self.trend_chart):
+            if other is not None and other is not chart:
+                other.widget.pack_forget()
+        if chart is None:
             self.chart_placeholder.config(text="No data to display yet.")
             self.chart_placeholder.pack(pady=10)
             return
+        self.chart_placeholder.pack_forget()
+        if not chart.widget.winfo_manager():
+            chart.widget.pack(fill="both", expand=True)
 
-        room_types = [row[0] for row in data]
-        counts = [row[1] for row in data]
-
-        fig, ax = plt.subplots(figsize=(6.5, 3.2))
-        ax.bar(room_types, counts)
-        ax.set_title("Bookings per Room Type")
-        ax.set_ylabel("Number of Bookings")
-        ax.set_xlabel("Room Type")
-        ax.grid(axis="y", linestyle="--", alpha=0.3)
+    # ---------------- Busy State ----------------
+    def set_busy(self, busy):
+        self.root.config(cursor="watch" if busy else "")
+        self.status_label.config(text="Working…" if busy else "Ready")
 
-        self.chart_canvas = FigureCanvasTkAgg(fig, master=self.chart_frame)
-        self.chart_canvas.draw()
-        self.chart_canvas.get_tk_widget().pack(fill="both", expand=True)
+    def show_task_error(self, error):
+        if isinstance(error, mysql.connector.Error):
+            self.modal(messagebox.showerror, "Database Error", f"Error: {error}")
+        else:
+            self.modal(messagebox.showerror, "Error", str(error))
+
+    # ---------------- Instrumentation ----------------
+    def instrumented(self, handler):
+        # Button commands: time the Tk-thread part, less the user's time in
+        # dialogs (modal()), and name the background tasks it submits after
+        # the button, not the worker function
+        if self.metrics is None:
+            return handler
+        name = handler.__name__
+
+        def run(*args):
+            capture = self.metrics.capture(name, on_saved=self.on_profile_saved)
+            self.tasks.action, self.tasks.capture = name, capture
+            try:
+                with self.metrics.timed("action", name):
+                    if capture is not None:
+                        return capture.run(handler, *args)
+                    return handler(*args)
+            finally:
+                self.tasks.action = self.tasks.capture = None
+                if capture is not None:
+                    capture.close()
+        return run
+
+    def modal(self, dialog, *args, **kwargs):
+        # Every file, confirm and message dialog opens through here, so the
+        # clerk's time in it isn't timed or profiled as UI work
+        if self.metrics is None:
+            return dialog(*args, **kwargs)
+        return self.metrics.dialog(dialog, *args, **kwargs)
+
+    def show_metrics(self):
+        if self.metrics_window is not None and self.metrics_window.is_open:
+            self.metrics_window.lift()
+            return
+        self.metrics_window = MetricsWindow(self.root, self.metrics, on_profile=self.profile_next_action,
+                                            open_path=open_file)
+
+    def profile_next_action(self):
+        self.metrics.profile_next = True
+        self.status_label.config(text="Profiling the next action…")
+
+    def on_profile_saved(self, path):
+        self.modal(messagebox.showinfo, "Profile Saved", f"cProfile capture of the action saved to:\n{path}")
+
+    def on_close(self):
+        # A flush still running after stop() keeps the journal open; the
+        # process exit ends it and its group is replayed next start
+        stopped = self.flusher is None or self.flusher.stop()
+        if self.journal is not None and stopped:
+            self.journal.close()
+        if self.lag_probe is not None:
+            self.lag_probe.stop()
+        if self.metrics_window is not None and self.metrics_window.is_open:
+            self.metrics_window.close()
+        self.tasks.shutdown()
+        self.receipt_cache.flush()
+        pool.close_all()
+        self.root.destroy()
 
     # ---------------- CRUD Functions ----------------
     def book_room(self):
         data = self.get_form_data()
         if not data:
             return
-        name, phone, email, id_number, room_type, nights, total_cost = data
-        conn = connect_db()
-        if conn:
-            cursor = conn.cursor()
-            cursor.execute(
-                "INSERT INTO bookings (name, phone, email, id_number, room_type, nights, total_cost) VALUES (%s,%s,%s,%s,%s,%s,%s)",
-                (name, phone, email, id_number, room_type, nights, total_cost)
-            )
-            conn.commit()
-            conn.close()
-            messagebox.showinfo("Success", f"Room booked! Total cost: {format_money(total_cost)}")
-            self.clear_form()
-            self.view_bookings()
+        try:
+            # Instant answer from the local index; insert_booking re-checks in the DB
+            self.availability.check(data[4], data[7], data[5])
+        except ValueError as err:
+            self.modal(messagebox.showerror, "Error", str(err))
+            return
+        if self.journal is not None:
+            self.tasks.submit(self.journal_write, "insert", data, None, on_done=self.on_journaled)
+        else:
+            self.tasks.submit(self.insert_booking, data, on_done=self.on_booked)
+
+    def insert_booking(self, data):
+        # Worker thread
+        row = self.service.insert(data)
+        if self.store is not None:
+            self.store.put(row)
+        self.pager.invalidate()
+        return row
+
+    def on_booked(self, row):
+        self.modal(messagebox.showinfo, "Success", f"Room booked! Total cost: {format_money(row[7])}")
+        self.clear_form()
+        self.put_row(row, append=True)
+        self.show_dashboard()
 
     def update_booking(self):
-        selected = self.tree.selection()
-        if not selected:
-            messagebox.showerror("Error", "Select a booking to update")
+        booking_id = self.selected_booking_id("update")
+        if booking_id is None:
             return
-        booking_id = self.tree.item(selected[0])["values"][0]
         data = self.get_form_data()
         if not data:
             return
-        name, phone, email, id_number, room_type, nights, total_cost = data
-        conn = connect_db()
-        if conn:
-            cursor = conn.cursor()
-            cursor.execute("""UPDATE bookings 
-                              SET name=%s, phone=%s, email=%s, id_number=%s, room_type=%s, nights=%s, total_cost=%s 
-                              WHERE id=%s""",
-                           (name, phone, email, id_number, room_type, nights, total_cost, booking_id))
-            conn.commit()
-            conn.close()
-            messagebox.showinfo("Success", "Booking updated successfully")
-            self.clear_form()
-            self.view_bookings()
+        try:
+            self.availability.check(data[4], data[7], data[5], exclude=booking_id)
+        except ValueError as err:
+            self.modal(messagebox.showerror, "Error", str(err))
+            return
+        if self.journal is not None:
+            self.tasks.submit(self.journal_write, "update", data, booking_id, on_done=self.on_journaled)
+        else:
+            self.tasks.submit(self.save_booking, booking_id, data, on_done=self.on_updated)
+
+    def save_booking(self, booking_id, data):
+        # Worker thread
+        row = self.service.save(booking_id, data)
+        if self.store is not None:
+            self.store.put(row)
+        self.pager.invalidate()
+        return row
+
+    def on_updated(self, row):
+        self.modal(messagebox.showinfo, "Success", "Booking updated successfully")
+        self.clear_form()
+        self.put_row(row)
+        self.show_dashboard()
 
     def delete_booking(self):
-        selected = self.tree.selection()
-        if not selected:
-            messagebox.showerror("Error", "Select a booking to delete")
+        booking_id = self.selected_booking_id("delete")
+        if booking_id is None:
             return
-        booking_id = self.tree.item(selected[0])["values"][0]
-        confirm = messagebox.askyesno("Confirm Delete", "Are you sure you want to delete this booking?")
+        confirm = self.modal(messagebox.askyesno, "Confirm Delete", "Are you sure you want to delete this booking?")
         if confirm:
-            conn = connect_db()
-            if conn:
-                cursor = conn.cursor()
-                cursor.execute("DELETE FROM bookings WHERE id=%s", (booking_id,))
-                conn.commit()
-                conn.close()
-                messagebox.showinfo("Success", "Booking deleted successfully")
-                self.clear_form()
-                self.view_bookings()
+            self.tasks.submit(self.remove_booking, booking_id, on_done=self.on_deleted)
+
+    def remove_booking(self, booking_id):
+        # Worker thread
+        self.service.delete(booking_id)
+        if self.store is not None:
+            self.store.remove(booking_id)
+        self.pager.invalidate()
+        return booking_id
+
+    def on_deleted(self, booking_id):
+        self.modal(messagebox.showinfo, "Success", "Booking deleted successfully")
+        self.clear_form()
+        self.drop_row(booking_id)
+        self.show_dashboard()
+
+    # ---------------- Write-Behind Journal ----------------
+    def journal_write(self, op, data, booking_id):
+        # Worker thread: durable in the local journal, then the flusher takes over
+        entry = self.journal.append(op, data, booking_id)
+        self.hold_pending_stays([entry])
+        if self.flusher is not None:
+            self.flusher.wake()
+        return entry
+
+    def hold_pending_stays(self, entries=None):
+        # Worker thread: journaled bookings count against availability until flushed
+        # (a resync only sees MySQL, so it is re-applied after every resync)
+        if self.journal is None:
+            return
+        for entry in self.journal.pending() if entries is None else entries:
+            key = pending_key(entry) if entry.op == "insert" else entry.booking_id
+            self.availability.add(key, entry.data[4], entry.data[7], entry.data[5])
+
+    def on_journaled(self, entry):
+        self.pending[entry.client_ref] = entry
+        if entry.op == "insert":
+            self.modal(messagebox.showinfo, "Success", f"Room booked! Total cost: {format_money(entry.data[6])}")
+        else:
+            self.modal(messagebox.showinfo, "Success", "Booking updated successfully")
+        self.clear_form()
+        self.put_pending(entry)
+        self.show_journal_status()
+
+    def put_pending(self, entry):
+        # Greyed-out row until the flusher has written the booking to MySQL
+        if entry.op == "insert":
+            self.put_row(("⏳", *entry.data), append=True, iid=pending_key(entry), pending=True)
+        else:
+            self.put_row((entry.booking_id, *entry.data), pending=True)
+
+    def on_journal_flushed(self, results):
+        # Flusher thread: caches the service doesn't own, then the table on the Tk thread
+        rejected = False
+        for entry, result in results:
+            if entry.op == "insert":
+                self.availability.remove(pending_key(entry))
+            if isinstance(result, Exception):
+                rejected = True
+            elif self.store is not None:
+                self.store.put(result)
+        if rejected:
+            # Put back the nights (and store rows) the rejected writes had claimed locally
+            changes = self.service.resync()
+            self.hold_pending_stays()
+            self.load_store()
+            self.tasks.post(self.show_changes, self.take_changes(changes))
+        self.pager.invalidate()
+        self.tasks.post(self.show_journal_flushed, results)
+
+    def show_journal_flushed(self, results):
+        rejected = []
+        for entry, result in results:
+            self.pending.pop(entry.client_ref, None)
+            if isinstance(result, Exception):
+                rejected.append((entry, result))
+                if entry.op == "insert":
+                    self.drop_row(pending_key(entry))
+            elif entry.op == "insert":
+                self.replace_pending_row(entry, result)
+            else:
+                self.put_row(result)
+        self.show_dashboard()
+        self.show_journal_status()
+        if rejected:
+            self.modal(messagebox.showerror, "Booking Not Saved", "These bookings were rejected by the database:\n\n" + "\n".join(
+                f"{entry.data[0]} — {entry.data[4]}, {entry.data[7]}: {error}" for entry, error in rejected))
+            if any(entry.op == "update" for entry, error in rejected):
+                self.reload_table()
+
+    def replace_pending_row(self, entry, row):
+        iid = pending_key(entry)
+        if not self.tree.exists(iid):
+            return
+        index = self.tree.index(iid)
+        self.tree.delete(iid)
+        if not self.tree.exists(str(row[0])):
+            self.tree.insert("", index, iid=str(row[0]), values=self.row_values(row), tags=self.row_tags(index))
+
+    def show_journal_status(self):
+        count = len(self.pending)
+        text = ""
+        if count:
+            text = f"⏳ {count} booking(s) waiting for the database"
+            error = self.flusher.last_error if self.flusher is not None else None
+            if self.flusher is None or isinstance(error, TRANSIENT_ERRORS):
+                text += " (database offline)"
+            elif error is not None:
+                text += f" (saving failed, retrying: {error})"
+        elif self.database_down:
+            text = "Database offline, retrying…"
+        self.journal_label.config(text=text)
+
+    # ---------------- Other Desks' Changes ----------------
+    def schedule_sync(self):
+        # Straight away while catching up on a bulk change (import, repricing)
+        self.root.after(1 if self.feed.behind else CHANGE_POLL_MS, self.sync_changes)
+
+    def sync_changes(self):
+        # Quiet, so polling never shows the busy cursor; if the server is away, try again next time
+        self.tasks.submit(self.fetch_changes, key="changes", quiet=True, on_done=self.on_changes,
+                          on_error=lambda error: self.schedule_sync())
+
+    def on_changes(self, result):
+        # Keep polling even if showing this batch fails (the error is reported by Tk)
+        try:
+            self.show_changes(result)
+        finally:
+            self.schedule_sync()
+
+    def fetch_changes(self):
+        # Worker thread
+        return self.take_changes(self.service.sync())
+
+    def take_changes(self, changes):
+        # Worker thread: -> ({booking id: current row or None}, ids of new bookings)
+        if not changes:
+            return {}, set()
+        rows = latest_rows(changes)
+        if self.store is not None:
+            for booking_id, row in rows.items():
+                if row is None:
+                    self.store.remove(booking_id)
+                else:
+                    self.store.put(row)
+        # A remote write replaces the nights of a booking this desk may still have journaled
+        self.hold_pending_stays()
+        self.pager.invalidate()
+        return rows, {change.booking_id for change in changes if change.op == "I"}
+
+    def show_changes(self, result):
+        rows, inserted = result
+        for booking_id, row in rows.items():
+            iid = str(booking_id)
+            if self.tree.exists(iid) and "pending" in self.tree.item(iid, "tags"):
+                continue           # this desk's journaled update wins once flushed
+            if row is None:
+                self.drop_row(booking_id)
+            else:
+                self.put_row(row, append=booking_id in inserted)
+        if rows:
+            self.show_dashboard()
+            self.status_label.config(text=f"{len(rows)} booking(s) changed at other desks")
+
+    def selected_booking_id(self, action):
+        # The selected booking's id, or None (after telling the user) if nothing
+        # is selected or the row is still waiting in the journal
+        selected = self.tree.selection()
+        if not selected:
+            self.modal(messagebox.showerror, "Error", f"Select a booking to {action}")
+            return None
+        if "pending" in self.tree.item(selected[0], "tags"):
+            self.modal(messagebox.showinfo, "Please Wait", "This booking is still being saved to the database. Try again in a moment.")
+            return None
+        return self.tree.item(selected[0])["values"][0]
 
     def search_booking(self):
         keyword = self.fields["Full Name"].get()
         if not keyword:
-            messagebox.showerror("Error", "Enter a name or ID/Passport to search")
+            self.modal(messagebox.showerror, "Error", "Enter a name or ID/Passport to search")
             return
-        conn = connect_db()
-        if conn:
-            cursor = conn.cursor()
-            cursor.execute("SELECT * FROM bookings WHERE name LIKE %s OR id_number LIKE %s", (f"%{keyword}%", f"%{keyword}%"))
-            rows = cursor.fetchall()
-            conn.close()
-            self.populate_table(rows)
+        # Shares the "table" key with view_bookings: whichever was clicked last wins
+        self.tasks.submit(self.search.search, keyword, key="table", on_done=self.show_search_results)
+
+    def show_search_results(self, rows):
+        self.current_page = None
+        self.populate_table(rows)
+        self.set_page_controls(False, False)
+        self.page_label.config(text=f"{len(rows)} search result(s) — View All to return")
 
     def view_bookings(self):
-        conn = connect_db()
-        if conn:
-            cursor = conn.cursor()
-            cursor.execute("SELECT * FROM bookings")
-            rows = cursor.fetchall()
-            conn.close()
-            self.populate_table(rows)
-            # Also refresh dashboard/cards & chart
-            self.update_dashboard()
+        self.load_bookings(None)
+
+    def reload_table(self):
+        # After bulk changes (imports, an emptied page): re-read the page being viewed and the dashboard
+        self.load_bookings(self.current_page)
+
+    def load_bookings(self, page):
+        self.tasks.submit(self.fetch_bookings, page, key="table", on_done=self.show_bookings)
+
+    def fetch_bookings(self, page):
+        # Worker thread
+        self.pager.invalidate()
+        page = self.pager.refresh(page)
+        if not page.rows and page.has_prev:
+            # The viewed page emptied out (rows deleted): fall back to the tail
+            page = self.pager.last()
+        return page
+
+    def show_bookings(self, page):
+        self.show_page(page, navigating=False)
+        # Also refresh dashboard/cards & chart
+        self.show_dashboard()
+
+    # ---------------- Table Paging ----------------
+    def first_page(self):
+        self.load_page(self.pager.first)
+
+    def last_page(self):
+        self.load_page(self.pager.last)
+
+    def next_page(self):
+        if self.current_page and self.current_page.has_next:
+            self.load_page(self.pager.after, last_id(self.current_page))
+
+    def prev_page(self):
+        if self.current_page and self.current_page.has_prev:
+            self.load_page(self.pager.before, first_id(self.current_page))
+
+    def load_page(self, fetch, *args):
+        self.tasks.submit(fetch, *args, key="table", on_done=self.show_page)
+
+    def show_page(self, page, navigating=True):
+        if navigating and not page.rows and self.current_page and self.current_page.rows:
+            # Walked off either end of the table: stay where we are
+            self.set_page_controls(self.current_page.has_prev and page.has_prev,
+                                   self.current_page.has_next and page.has_next)
+            return
+        self.current_page = page
+        self.populate_table(page.rows)
+        for entry in self.pending.values():
+            self.put_pending(entry)
+        self.set_page_controls(page.has_prev, page.has_next)
+        if page.rows:
+            text = f"Bookings #{first_id(page)} – #{last_id(page)}"
+            if self.store is not None:
+                text += f"  ({self.pager.count():,} listed)"
+            self.page_label.config(text=text)
+        elif self.store is not None and self.pager.filters:
+            self.page_label.config(text="No bookings match the filters.")
+        else:
+            self.page_label.config(text="No bookings yet.")
+        # Warm the neighbouring pages while the user reads this one
+        self.tasks.submit(self.pager.prefetch, page, key="prefetch", quiet=True,
+                          on_error=lambda error: None)
+
+    # ---------------- Sort & Filter (booking store) ----------------
+    def sort_by(self, heading):
+        column = COLUMNS[self.tree["columns"].index(heading)]
+        reverse = self.pager.sort == column and not self.pager.reverse
+        self.pager.set_order(column, reverse)
+        for col in self.tree["columns"]:
+            arrow = (" ▼" if reverse else " ▲") if col == heading else ""
+            self.tree.heading(col, text=col + arrow)
+        self.reset_view()
+
+    def apply_filters(self):
+        try:
+            nights = tuple(self.filter_number(f"nights_{bound}", int) for bound in ("min", "max"))
+            cost = tuple(self.filter_number(f"cost_{bound}", float) for bound in ("min", "max"))
+        except ValueError:
+            self.modal(messagebox.showerror, "Error", "Nights and cost filters must be numbers")
+            return
+        room_type = self.filter_fields["room"].get()
+        self.pager.set_filters(room_type if room_type != "All" else None, nights, cost)
+        self.reset_view()
+
+    def filter_number(self, key, kind):
+        text = self.filter_fields[key].get().strip()
+        return kind(text) if text else None
+
+    def clear_filters(self):
+        self.filter_fields["room"].set("All")
+        for key, field in self.filter_fields.items():
+            if key != "room":
+                field.delete(0, tk.END)
+        self.pager.set_filters()
+        self.reset_view()
+
+    def reset_view(self):
+        # New order or filters: back to the first page, even if it is empty
+        self.tasks.submit(self.pager.first, key="table",
+                          on_done=lambda page: self.show_page(page, navigating=False))
+
+    def set_page_controls(self, has_prev, has_next):
+        for name, enabled in (("first", has_prev), ("prev", has_prev),
+                              ("next", has_next), ("last", has_next)):
+            self.page_buttons[name].state(["!disabled"] if enabled else ["disabled"])
 
     def populate_table(self, rows):
+        # Rows are keyed by booking id (iid), so CRUD can patch them in place
         self.tree.delete(*self.tree.get_children())
         for i, row in enumerate(rows):
-            tag = "evenrow" if i % 2 == 0 else "oddrow"
-            self.tree.insert("", tk.END, values=row, tags=(tag,))
+            self.tree.insert("", tk.END, iid=str(row[0]), values=self.row_values(row), tags=(self.stripe(i),))
+
+    def row_values(self, row):
+        # Bookings made before check-in dates were recorded show a blank date
+        return ["" if v is None else v for v in row]
+
+    def stripe(self, index):
+        return "evenrow" if index % 2 == 0 else "oddrow"
+
+    def row_tags(self, index, pending=False):
+        return (self.stripe(index), "pending") if pending else (self.stripe(index),)
+
+    def put_row(self, row, append=False, iid=None, pending=False):
+        # After a save: patch the booking's row if it is on screen. A new
+        # booking is appended only when the last page is the one being viewed
+        # (ids are ascending, so that is where it belongs). Pending rows are
+        # journaled writes, keyed by pending_key() until they have an id.
+        iid = iid or str(row[0])
+        if self.tree.exists(iid):
+            self.tree.item(iid, values=self.row_values(row), tags=self.row_tags(self.tree.index(iid), pending))
+        elif (append and self.pager.appends_at_end
+              and self.current_page is not None and not self.current_page.has_next):
+            index = len(self.tree.get_children())
+            self.tree.insert("", tk.END, iid=iid, values=self.row_values(row), tags=self.row_tags(index, pending))
+            self.tree.see(iid)
+            if not pending:
+                self.page_label.config(text=f"Bookings #{first_id(self.current_page) or row[0]} – #{row[0]}")
+
+    def drop_row(self, booking_id):
+        iid = str(booking_id)
+        if not self.tree.exists(iid):
+            return
+        index = self.tree.index(iid)
+        self.tree.delete(iid)
+        # Only the rows below the gap change stripe
+        for i, item in enumerate(self.tree.get_children()[index:], start=index):
+            self.tree.item(item, tags=self.row_tags(i, "pending" in self.tree.item(item, "tags")))
+        if not self.tree.get_children() and self.current_page is not None:
+            # Emptied the page: let the pager pick what to show instead
+            self.reload_table()
 
     def on_row_selected(self, event):
         selected = self.tree.selection()
@@ -350,6 +935,8 @@ class HotelBookingApp:
             self.fields["Room Type"].set(values[5])
             self.fields["Nights"].delete(0, tk.END)
             self.fields["Nights"].insert(0, values[6])
+            self.fields["Check-in"].delete(0, tk.END)
+            self.fields["Check-in"].insert(0, values[8])
 
     def get_form_data(self):
         name = self.fields["Full Name"].get()
@@ -358,191 +945,145 @@ class HotelBookingApp:
         id_number = self.fields["ID/Passport No"].get()
         room_type = self.fields["Room Type"].get()
         nights = self.fields["Nights"].get()
-        if not (name and phone and email and id_number and room_type and nights):
-            messagebox.showerror("Error", "All fields are required!")
-            return None
+        check_in = self.fields["Check-in"].get()
         try:
-            nights = int(nights)
-            if nights <= 0:
-                raise ValueError
-        except ValueError:
-            messagebox.showerror("Error", "Nights must be a positive number!")
+            # Shared with bulk import: required fields, nights, dates, price list & VAT
+            return validate_booking(name, phone, email, id_number, room_type, nights, check_in)
+        except ValueError as err:
+            self.modal(messagebox.showerror, "Error", str(err))
             return None
 
-        # Use configured price list
-        rate = PRICES.get(room_type, 0)
-        subtotal = rate * nights
-        tax = round(subtotal * VAT_RATE, 2)
-        grand_total = round(subtotal + tax, 2)
-
-        # Save the grand total to DB (so revenue includes tax)
-        return name, phone, email, id_number, room_type, nights, grand_total
-
     def clear_form(self):
         for field in self.fields.values():
             if isinstance(field, ttk.Combobox):
                 field.set("Single")
             else:
                 field.delete(0, tk.END)
+        self.fields["Check-in"].insert(0, datetime.date.today().isoformat())
 
     # ---------------- BILLING RECEIPT (SMART & PROFESSIONAL) ----------------
     def generate_receipt(self):
-        selected = self.tree.selection()
-        if not selected:
-            messagebox.showerror("Error", "Select a booking to generate receipt")
+        booking_id = self.selected_booking_id("generate receipt")
+        if booking_id is None:
             return
+        self.tasks.submit(self.load_receipt, booking_id, on_done=self.on_receipt_built)
+
+    def load_receipt(self, booking_id):
+        # Worker thread: reprints of an unchanged booking come straight from the cache
+        return self.service.receipt(booking_id)
+
+    def on_receipt_built(self, result):
+        filename, cached = result
+        title = "Receipt Ready" if cached else "Receipt Generated"
+        self.modal(messagebox.showinfo, title, f"Receipt saved as:\n{filename}")
+        open_file(filename)
 
-        values = self.tree.item(selected[0])["values"]
-        booking_id, name, phone, email, id_number, room_type, nights, stored_total = values
-
-        # Derive rate & breakdown smartly
-        rate = PRICES.get(room_type, 0)
-        calculated_subtotal = round(rate * int(nights), 2)
-        calculated_tax = round(calculated_subtotal * VAT_RATE, 2)
-        calculated_grand = round(calculated_subtotal + calculated_tax, 2)
-
-        # If DB total differs (e.g., historical data before tax), show both clearly
-        note_diff = ""
-        if abs(float(stored_total) - calculated_grand) > 0.01:
-            note_diff = "(Note: stored total differs from current tax settings.)"
-
-        # Paths & filename
-        os.makedirs("receipts", exist_ok=True)
-        ref = f"HB-{int(booking_id):06d}" if str(booking_id).isdigit() else f"HB-{booking_id}"
-        today_str = datetime.datetime.now().strftime("%Y-%m-%d")
-        filename = f"receipts/Receipt_{ref}_{today_str}.pdf"
-
-        # Build PDF
-        doc = SimpleDocTemplate(
-            filename,
-            pagesize=letter,
-            rightMargin=36, leftMargin=36, topMargin=36, bottomMargin=36
+    def batch_receipts(self):
+        # Selected rows, or everything currently listed in the table
+        items = self.tree.selection()
+        if not items:
+            items = self.tree.get_children()
+            if not items:
+                self.modal(messagebox.showerror, "Error", "No bookings to generate receipts for")
+                return
+            if not self.modal(messagebox.askyesno, "Batch Receipts", f"Generate receipts for all {len(items)} listed bookings?"):
+                return
+        # Rows still in the journal have no booking id yet
+        ids = [self.tree.item(item)["values"][0] for item in items if "pending" not in self.tree.item(item, "tags")]
+        self.tasks.submit(self.run_batch_receipts, ids, on_done=self.on_batch_done)
+
+    def run_batch_receipts(self, ids):
+        # Worker thread: rows come from the DB (Treeview values lose leading zeros etc.)
+        from receipts import generate_batch, fetch_receipt_rows
+        with connect_db() as conn:
+            rows = fetch_receipt_rows(conn, ids=ids)
+        return generate_batch(
+            rows,
+            progress=lambda done, total: self.tasks.post(self.show_batch_progress, done, total),
+            cache=self.receipt_cache
         )
-        styles = getSampleStyleSheet()
-        styles.add(ParagraphStyle(name="SmallGrey", fontSize=9, textColor=colors.grey))
-        styles.add(ParagraphStyle(name="HeaderBig", fontSize=16, leading=20, spaceAfter=8, textColor=colors.darkblue))
-        styles.add(ParagraphStyle(name="Tag", fontSize=10, textColor=colors.white))
-
-        story = []
-
-        # Header with optional logo
-        header_table_data = []
-        logo_path = "logo.png"
-        if os.path.exists(logo_path):
-            logo_img = Image(logo_path, width=1.1*inch, height=1.1*inch)
-        else:
-            # Placeholder drawing if no logo
-            logo_img = Paragraph("<b>HOTEL</b>", styles["Title"])
-
-        hotel_info = Paragraph(
-            "<b>Lapsa Hotel</b><br/>"
-            "Kahawa Wendani, Nairobi Kenya<br/>"
-            "Tel: +25411108331 <br/>"
-            "Website: https://lapsa.vercel.app<br/>"
-            f"Receipt Date: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M')}",
-            styles["Normal"]
+
+    def show_batch_progress(self, done, total):
+        self.status_label.config(text=f"Generating receipts… {done}/{total}")
+
+    def on_batch_done(self, result):
+        files, failures, hits, rate = result
+        message = f"{len(files)} receipt(s) saved to '{RECEIPTS_DIR}'"
+        if len(files) > hits:
+            message += f" ({len(files) - hits} rendered at {rate:.1f} receipts/s)"
+        if hits:
+            message += f" ({hits} unchanged, from the cache)"
+        message += "."
+        if failures:
+            message += f"\n{len(failures)} failed: " + ", ".join(str(booking_id) for booking_id, err in failures)
+        self.modal(messagebox.showinfo, "Batch Receipts", message)
+        open_file(RECEIPTS_DIR)
+
+    # ---------------- Bulk Import ----------------
+    def import_file(self):
+        path = self.modal(
+            filedialog.askopenfilename,
+            title="Import Bookings",
+            filetypes=[("Bookings", "*.csv *.jsonl *.ndjson"), ("All files", "*.*")]
         )
-        header_table_data.append([logo_img, hotel_info])
-        header_table = Table(header_table_data, colWidths=[1.4*inch, 4.6*inch])
-        header_table.setStyle(TableStyle([
-            ("VALIGN", (0, 0), (-1, -1), "MIDDLE")
-        ]))
-        story.append(header_table)
-        story.append(Spacer(1, 12))
-
-        # Receipt Title & Reference
-        story.append(Paragraph(f"Booking Receipt — <b>{ref}</b>", styles["HeaderBig"]))
-        story.append(Spacer(1, 6))
-
-        # Guest & Stay Info
-        guest_table_data = [
-            ["Guest Name", name],
-            ["Phone", phone],
-            ["Email", email],
-            ["ID/Passport", id_number],
-            ["Room Type", room_type],
-            ["Nights", str(nights)],
-        ]
-        guest_table = Table(guest_table_data, colWidths=[1.5*inch, 4.5*inch])
-        guest_table.setStyle(TableStyle([
-            ("BACKGROUND", (0, 0), (0, -1), colors.HexColor("#ecf0f1")),
-            ("TEXTCOLOR", (0, 0), (0, -1), colors.HexColor("#2c3e50")),
-            ("BOX", (0, 0), (-1, -1), 0.25, colors.grey),
-            ("INNERGRID", (0, 0), (-1, -1), 0.25, colors.grey),
-            ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
-            ("FONTNAME", (0, 0), (-1, -1), "Helvetica")
-        ]))
-        story.append(guest_table)
-        story.append(Spacer(1, 12))
-
-        # Charges Table (smart breakdown)
-        charges_data = [
-            ["Description", "Qty", "Rate", "Amount"],
-            [f"{room_type} Room", str(nights), format_money(rate), format_money(calculated_subtotal)],
-            ["Tax / VAT", "", f"{int(VAT_RATE*100)}%", format_money(calculated_tax)],
-            ["", "", "Grand Total", format_money(calculated_grand)],
-        ]
-        charges_table = Table(charges_data, colWidths=[3.2*inch, 0.8*inch, 1.2*inch, 1.2*inch])
-        charges_table.setStyle(TableStyle([
-            ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#2c3e50")),
-            ("TEXTCOLOR", (0, 0), (-1, 0), colors.white),
-            ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
-            ("ALIGN", (1, 0), (-1, -1), "RIGHT"),
-            ("BOX", (0, 0), (-1, -1), 0.25, colors.grey),
-            ("INNERGRID", (0, 0), (-1, -1), 0.25, colors.grey),
-            ("BACKGROUND", (0, -1), (-1, -1), colors.HexColor("#ecf0f1")),
-            ("FONTNAME", (2, -1), (2, -1), "Helvetica-Bold"),
-            ("FONTNAME", (3, -1), (3, -1), "Helvetica-Bold"),
-        ]))
-        story.append(charges_table)
-        story.append(Spacer(1, 6))
-
-        # Stored total note (if different)
-        if note_diff:
-            story.append(Paragraph(
-                f"<font color='#e67e22'><b>Note:</b> The amount stored in the system for this booking is "
-                f"{format_money(stored_total)}; current calculation shows {format_money(calculated_grand)}. "
-                f"{note_diff}</font>",
-                styles["SmallGrey"]
-            ))
-            story.append(Spacer(1, 6))
-
-        # QR Code (Booking reference + guest + total)
-        qr_text = f"{ref}|{name}|{format_money(calculated_grand)}"
-        qr_code = qr.QrCodeWidget(qr_text)
-        bounds = qr_code.getBounds()
-        size = 1.6 * inch
-        width = bounds[2] - bounds[0]
-        height = bounds[3] - bounds[1]
-        d = Drawing(size, size, transform=[size/width, 0, 0, size/height, 0, 0])
-        d.add(qr_code)
-        # put QR and a small legend in a table for alignment
-        qr_table = Table([[d, Paragraph(
-            "<b>Scan for booking summary</b><br/>"
-            "Use this at check-in for quick lookup.",
-            styles["SmallGrey"]
-        )]], colWidths=[size+12, 3.1*inch])
-        qr_table.setStyle(TableStyle([
-            ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
-        ]))
-        story.append(qr_table)
-        story.append(Spacer(1, 10))
-
-        # Payment / Terms
-        story.append(Paragraph(
-            "<b>Payment Method:</b> Cash / Card on file<br/>"
-            "<b>Terms:</b> Please present a valid ID at check-in. "
-            "Cancellations within 24h may incur charges. Taxes subject to local regulations.",
-            styles["SmallGrey"]
-        ))
-        story.append(Spacer(1, 4))
-        story.append(Paragraph("Thank you for choosing Lapsa Hotel. We wish you a pleasant stay!", styles["Normal"]))
-
-        # Build and save
-        doc.build(story)
-
-        messagebox.showinfo("Receipt Generated", f"Receipt saved as:\n{filename}")
-        open_file(filename)
+        if path:
+            self.tasks.submit(self.run_import, path, key="import", on_done=self.on_import_done)
+
+    def run_import(self, path):
+        # Worker thread: streams the file in chunks, then rebuilds the caches
+        # the per-row handlers would otherwise have kept current
+        report = import_bookings(
+            path,
+            connect=connect_db,
+            progress=lambda report: self.tasks.post(self.show_import_progress, report.read, report.rows_per_second)
+        )
+        if report.imported:
+            self.service.load()
+            self.hold_pending_stays()
+            self.load_store()
+        return report
+
+    def show_import_progress(self, rows, rate):
+        self.status_label.config(text=f"Importing… {rows:,} rows ({rate:,.0f} rows/s)")
+
+    def on_import_done(self, report):
+        self.modal(messagebox.showinfo, "Import Bookings", report.summary())
+        self.show_dashboard()
+        self.reload_table()
+
+    # ---------------- Bulk Export ----------------
+    def export_file(self):
+        # Whole table, streamed; filtered exports go through `python exporter.py`
+        path = self.modal(
+            filedialog.asksaveasfilename,
+            title="Export Bookings",
+            defaultextension=".csv",
+            filetypes=[("CSV", "*.csv"), ("JSON Lines", "*.jsonl"), ("Parquet", "*.parquet"),
+                       ("Arrow IPC", "*.arrow"), ("All files", "*.*")]
+        )
+        if not path:
+            return
+        try:
+            format_for(path)
+        except ValueError as err:
+            self.modal(messagebox.showerror, "Error", str(err))
+            return
+        self.tasks.submit(self.run_export, path, on_done=lambda result: self.on_export_done(path, result))
+
+    def run_export(self, path):
+        # Worker thread
+        return export_bookings(
+            path,
+            connect=connect_db,
+            progress=lambda rows: self.tasks.post(self.show_export_progress, rows)
+        )
+
+    def show_export_progress(self, rows):
+        self.status_label.config(text=f"Exporting… {rows:,} rows")
+
+    def on_export_done(self, path, result):
+        written, elapsed = result
+        self.modal(messagebox.showinfo, "Export Bookings", f"{written:,} bookings exported in {elapsed:.1f}s:\n{path}")
 
 
 if __name__ == "__main__":
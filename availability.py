@@ -0,0 +1,206 @@
+import datetime
+import threading
+from array import array
+
+from config import ROOM_INVENTORY, OCCUPANCY_DAYS, MAX_STAY_NIGHTS
+from db import SQL_AVAILABILITY_STAYS, SQL_OVERLAPPING_STAYS_FOR_UPDATE
+from search import iter_rows
+
+
+# ---------------- AVAILABILITY ----------------
+# Rooms taken per room type per night, as one array of counters per room type
+# indexed by day number. A booking occupies the nights check_in ..
+# check_in + nights - 1; adding or removing it touches only those counters,
+# and "how many Suites are free from D1 to D2" is the inventory minus the
+# max() over a slice. Bookings without a check-in date (made before dates
+# were recorded) hold no nights.
+def to_date(value):
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    if isinstance(value, datetime.date):
+        return value
+    return datetime.date.fromisoformat(str(value))
+
+
+def stay_length(nights):
+    # A stay asked about must cover one to MAX_STAY_NIGHTS nights, so a check
+    # never builds more per-night state than that
+    nights = int(nights)
+    if nights < 1:
+        raise ValueError("Nights must be a positive number!")
+    if nights > MAX_STAY_NIGHTS:
+        raise ValueError(f"Stays are limited to {MAX_STAY_NIGHTS} nights!")
+    return nights
+
+
+def stay_end(check_in, nights):
+    # Check-out date; a stay running past the calendar is a bad request too
+    try:
+        return to_date(check_in) + datetime.timedelta(days=nights)
+    except OverflowError:
+        raise ValueError("Check-out must be before the year 10000!") from None
+
+
+def busiest_night(stays, check_in, nights, held=None):
+    # stays: [(check_in, nights), ...] -> (night, rooms taken) for the fullest
+    # night of [check_in, check_in + nights). Used on rows fetched FOR UPDATE.
+    # held: {night ordinal: rooms} taken on top of those stays.
+    nights = stay_length(nights)
+    stay_end(check_in, nights)
+    start = to_date(check_in).toordinal()
+    taken = [held.get(start + i, 0) for i in range(nights)] if held else [0] * nights
+    for stay_in, stay_nights in stays:
+        first = to_date(stay_in).toordinal() - start
+        for i in range(max(first, 0), min(first + int(stay_nights), nights)):
+            taken[i] += 1
+    peak = max(range(nights), key=taken.__getitem__)
+    return datetime.date.fromordinal(start + peak), taken[peak]
+
+
+class OverbookedError(ValueError):
+    pass
+
+
+def overbooked(room_type, night):
+    return OverbookedError(f"Fully booked: all {ROOM_INVENTORY.get(room_type, 0)} {room_type} rooms "
+                           f"are taken on {night:%a %d %b %Y}")
+
+
+class AvailabilityIndex:
+    def __init__(self, inventory=ROOM_INVENTORY, write_lock=None):
+        self.inventory = dict(inventory)
+        self._origin = datetime.date.today().toordinal()   # day number of index 0
+        self._taken = {}           # room type -> array('H') of rooms taken per night
+        self._length = 0           # shared length of those arrays
+        self._stays = {}           # booking id -> (room type, first night, nights)
+        self._lock = threading.Lock()
+        # Writers hold this around "commit + apply" (shared with the dashboard
+        # aggregates) so a resync never drops a booking committed meanwhile.
+        self.write_lock = write_lock or threading.Lock()
+
+    def resync(self, conn):
+        with self.write_lock:
+            cursor = conn.cursor()
+            cursor.execute(SQL_AVAILABILITY_STAYS)
+            self.load(iter_rows(cursor))
+            cursor.close()
+            conn.rollback()
+
+    def load(self, rows):
+        # rows: iterable of (booking id, room type, check-in date, nights)
+        with self._lock:
+            self._taken.clear()
+            self._stays.clear()
+            self._length = 0
+            for booking_id, room_type, check_in, nights in rows:
+                self._add(booking_id, room_type, check_in, nights)
+
+    def add(self, booking_id, room_type, check_in, nights):
+        # Also used for updates: the booking's previous nights are released first
+        with self._lock:
+            self._remove(booking_id)
+            self._add(booking_id, room_type, check_in, nights)
+
+    def remove(self, booking_id):
+        with self._lock:
+            self._remove(booking_id)
+
+    def free(self, room_type, check_in, nights, exclude=None):
+        # Rooms of this type free on every night of the stay. `exclude` is a
+        # booking being edited, whose own nights don't count against it.
+        nights = stay_length(nights)
+        stay_end(check_in, nights)
+        with self._lock:
+            night, taken = self._busiest(room_type, check_in, nights, exclude)
+        return max(self.inventory.get(room_type, 0) - taken, 0)
+
+    def check(self, room_type, check_in, nights, exclude=None):
+        nights = stay_length(nights)
+        stay_end(check_in, nights)
+        with self._lock:
+            night, taken = self._busiest(room_type, check_in, nights, exclude)
+        if taken >= self.inventory.get(room_type, 0):
+            raise overbooked(room_type, night)
+
+    def free_tonight(self, today=None):
+        day = to_date(today or datetime.date.today()).toordinal()
+        with self._lock:
+            i = day - self._origin
+            return sum(max(total - self._taken_at(room_type, i), 0)
+                       for room_type, total in self.inventory.items())
+
+    def occupancy(self, start=None, days=OCCUPANCY_DAYS):
+        # [(date, rooms taken, rooms in inventory), ...] for each night
+        first = to_date(start or datetime.date.today()).toordinal()
+        capacity = sum(self.inventory.values())
+        with self._lock:
+            offset = first - self._origin
+            taken = [sum(self._taken_at(room_type, offset + i) for room_type in self.inventory)
+                     for i in range(days)]
+        return [(datetime.date.fromordinal(first + i), taken[i], capacity) for i in range(days)]
+
+    # ---- internals (call with the lock held) ----
+    def _busiest(self, room_type, check_in, nights, exclude):
+        start = to_date(check_in).toordinal()
+        lo = start - self._origin
+        taken = [self._taken_at(room_type, i) for i in range(lo, lo + nights)]
+        stay = self._stays.get(exclude)
+        if stay is not None and stay[0] == room_type:
+            for i in range(stay[1] - start, stay[1] - start + stay[2]):
+                if 0 <= i < len(taken):
+                    taken[i] -= 1
+        peak = max(range(len(taken)), key=taken.__getitem__)
+        return datetime.date.fromordinal(start + peak), taken[peak]
+
+    def _taken_at(self, room_type, i):
+        counts = self._taken.get(room_type)
+        return counts[i] if counts is not None and 0 <= i < self._length else 0
+
+    def _add(self, booking_id, room_type, check_in, nights):
+        if check_in is None:
+            return
+        first, nights = to_date(check_in).toordinal(), int(nights)
+        self._reserve(first, first + nights)
+        counts = self._taken.get(room_type)
+        if counts is None:
+            counts = self._taken[room_type] = array("H", bytes(2 * self._length))
+        for i in range(first - self._origin, first - self._origin + nights):
+            counts[i] += 1
+        self._stays[booking_id] = (room_type, first, nights)
+
+    def _remove(self, booking_id):
+        stay = self._stays.pop(booking_id, None)
+        if stay is None:
+            return
+        room_type, first, nights = stay
+        counts = self._taken[room_type]
+        for i in range(first - self._origin, first - self._origin + nights):
+            counts[i] -= 1
+
+    def _reserve(self, first, end):
+        # Grow every array, in either direction, to cover day numbers [first, end)
+        if first < self._origin:
+            pad = bytes(2 * (self._origin - first))
+            for room_type, counts in self._taken.items():
+                self._taken[room_type] = array("H", pad) + counts
+            self._length += self._origin - first
+            self._origin = first
+        if end - self._origin > self._length:
+            grow = bytes(2 * (end - self._origin - self._length))
+            for counts in self._taken.values():
+                counts.frombytes(grow)
+            self._length = end - self._origin
+
+
+def check_stay(conn, room_type, check_in, nights, exclude=None, held=None):
+    # Authoritative check inside the booking's transaction: the overlapping
+    # stays are read FOR UPDATE, so a concurrent booking for the same nights
+    # waits for this one to commit and then sees it. `held` counts rooms
+    # taken by writes of this transaction not yet sent (an import chunk).
+    check_in, nights = to_date(check_in), stay_length(nights)
+    check_out = stay_end(check_in, nights)
+    rows = conn.execute(SQL_OVERLAPPING_STAYS_FOR_UPDATE, (room_type, check_in, check_out)).fetchall()
+    stays = [(stay_in, stay_nights) for booking_id, stay_in, stay_nights in rows if booking_id != exclude]
+    night, taken = busiest_night(stays, check_in, nights, held)
+    if taken >= ROOM_INVENTORY.get(room_type, 0):
+        raise overbooked(room_type, night)
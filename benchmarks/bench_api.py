@@ -0,0 +1,141 @@
+# Load test for the HTTP API: concurrent clients POSTing bookings (then a
+# read mix), reporting bookings/sec and p50/p99 latency. By default the API
+# runs in-process on the SQLite stand-in (benchmarks/standin.py) with the
+# real BookingService and connection pool.
+#
+#   python -m benchmarks.bench_api
+#   python -m benchmarks.bench_api --requests 5000 --concurrency 16
+#   python -m benchmarks.bench_api --url http://127.0.0.1:8080   # a running `python api.py`
+import argparse
+import datetime
+import http.client
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from urllib.parse import urlsplit
+
+from benchmarks import standin
+from benchmarks.synthetic import make_rows, FIRST_NAMES, LAST_NAMES, ROOM_TYPES
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(int(len(sorted_values) * pct / 100), len(sorted_values) - 1)]
+
+
+def start_standin_api(rows, pool_size, tmp):
+    from api import BookingAPIServer
+    from booking_service import BookingService
+    from db import ConnectionPool
+    from search import BookingSearch
+
+    path = os.path.join(tmp, "hotel.sqlite")
+    start = time.perf_counter()
+    standin.create_database(path, (row[1:] for row in make_rows(rows)))
+    db_pool = ConnectionPool(size=pool_size, connect=standin.connector(path))
+    service = BookingService(db_pool.connection, search=BookingSearch(db_pool.connection, engine="trigram"))
+    service.load()
+    server = BookingAPIServer(("127.0.0.1", 0), service, quiet=True)
+    server.start()
+    print(f"SQLite stand-in: {rows:,} bookings, pool of {pool_size}, "
+          f"ready in {time.perf_counter() - start:.1f}s")
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def booking_body(rnd):
+    check_in = datetime.date.today() + datetime.timedelta(days=rnd.randrange(3650))
+    return {
+        "name": f"{rnd.choice(FIRST_NAMES)} {rnd.choice(LAST_NAMES)}",
+        "phone": f"07{rnd.randrange(10**8):08d}",
+        "email": f"load{rnd.randrange(10**9)}@example.com",
+        "id_number": f"L{rnd.randrange(10**7):07d}",
+        "room_type": rnd.choice(ROOM_TYPES),
+        "nights": rnd.randint(1, 4),
+        "check_in": check_in.isoformat(),
+    }
+
+
+def run_load(url, requests, concurrency, make_request):
+    # make_request(rnd) -> (method, path, body); each client keeps one connection open
+    host = urlsplit(url)
+    counter = iter(range(requests))
+    lock = threading.Lock()
+    latencies, statuses = [], {}
+
+    def client(seed):
+        rnd = random.Random(seed)
+        conn = http.client.HTTPConnection(host.hostname, host.port, timeout=60)
+        while True:
+            with lock:
+                if next(counter, None) is None:
+                    break
+            method, path, body = make_request(rnd)
+            payload = json.dumps(body).encode() if body is not None else None
+            headers = {"Content-Type": "application/json"} if payload else {}
+            start = time.perf_counter()
+            conn.request(method, path, body=payload, headers=headers)
+            response = conn.getresponse()
+            response.read()
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                statuses[response.status] = statuses.get(response.status, 0) + 1
+        conn.close()
+
+    threads = [threading.Thread(target=client, args=(seed,)) for seed in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start, sorted(latencies), statuses
+
+
+def report(title, wall, latencies, statuses, success):
+    done = statuses.get(success, 0)
+    print(f"\n{title}")
+    print(f"  {len(latencies):,} requests in {wall:.2f}s: {len(latencies) / wall:,.0f} req/s, "
+          f"{done / wall:,.0f} {'bookings' if success == 201 else 'ok'}/s")
+    print(f"  latency p50 {percentile(latencies, 50) * 1000:.1f} ms, "
+          f"p99 {percentile(latencies, 99) * 1000:.1f} ms, max {latencies[-1] * 1000 if latencies else 0:.1f} ms")
+    print("  status " + ", ".join(f"{status}: {count:,}" for status, count in sorted(statuses.items())))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=10_000, help="bookings seeded into the stand-in")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--pool-size", type=int, default=8)
+    parser.add_argument("--url", help="load an already running API instead of the stand-in")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        server = None
+        url = args.url
+        if url is None:
+            server, url = start_standin_api(args.rows, args.pool_size, tmp)
+
+        wall, latencies, statuses = run_load(
+            url, args.requests, args.concurrency,
+            lambda rnd: ("POST", "/bookings", booking_body(rnd))
+        )
+        report(f"POST /bookings x {args.concurrency} clients (409 = overbooking rejected)",
+               wall, latencies, statuses, 201)
+
+        def read_mix(rnd):
+            if rnd.random() < 0.5:
+                return "GET", f"/bookings/{rnd.randint(1, max(args.rows, 1))}", None
+            check_in = datetime.date.today() + datetime.timedelta(days=rnd.randrange(365))
+            return "GET", f"/availability?room_type={rnd.choice(ROOM_TYPES)}&check_in={check_in}&nights=3", None
+
+        wall, latencies, statuses = run_load(url, args.requests, args.concurrency, read_mix)
+        report(f"GET booking / availability x {args.concurrency} clients", wall, latencies, statuses, 200)
+
+        if server is not None:
+            server.shutdown()
+            server.server_close()
@@ -0,0 +1,118 @@
+# Export throughput and peak memory: the streaming exporter (fetchmany chunks)
+# against the fetchall-then-write pattern, for each output format.
+#
+#   python -m benchmarks.bench_export                   # SQLite stand-in, 200k rows
+#   python -m benchmarks.bench_export --rows 1000000 --chunk-size 10000
+#   python -m benchmarks.bench_export --mysql           # against hotel_db from config.py
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.synthetic import make_rows
+from exporter import export_bookings, export_query, format_for, open_writer, has_pyarrow
+
+
+class SQLiteConn:
+    # Pooled-connection stand-in; sqlite3 cursors already step through results lazily
+    def __init__(self, db):
+        self.db = db
+
+    def cursor(self, buffered=None):
+        return SQLiteCursor(self.db)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class SQLiteCursor:
+    def __init__(self, db):
+        self.cur = db.cursor()
+
+    def execute(self, sql, params=()):
+        self.cur.execute(sql.replace("%s", "?"), params)
+
+    def fetchmany(self, size):
+        return self.cur.fetchmany(size)
+
+    def fetchall(self):
+        return self.cur.fetchall()
+
+    def close(self):
+        self.cur.close()
+
+
+def fetchall_export(connect, path):
+    # The old pattern: whole result set in memory, then written out
+    sql, params = export_query()
+    start = time.perf_counter()
+    with connect() as conn:
+        cursor = conn.cursor()
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+        cursor.close()
+    writer = open_writer(path, format_for(path))
+    writer.write(rows)
+    writer.close()
+    return len(rows), time.perf_counter() - start
+
+
+def measure(fn):
+    tracemalloc.start()
+    rows, elapsed = fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return rows, elapsed, peak
+
+
+def run(connect, chunk_size):
+    extensions = [".csv", ".jsonl"] + ([".parquet", ".arrow"] if has_pyarrow() else [])
+    if not has_pyarrow():
+        print("pyarrow not installed: skipping Parquet / Arrow IPC\n")
+    print(f"{'format':<10}{'mode':<12}{'rows/s':>12}{'peak MB':>10}{'file MB':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for ext in extensions:
+            path = os.path.join(tmp, "bookings" + ext)
+            for mode, fn in [
+                ("fetchall", lambda: fetchall_export(connect, path)),
+                ("streaming", lambda: export_bookings(path, connect=connect, chunk_size=chunk_size)),
+            ]:
+                rows, elapsed, peak = measure(fn)
+                print(f"{ext[1:]:<10}{mode:<12}{rows / elapsed:>12,.0f}"
+                      f"{peak / 2**20:>10.1f}{os.path.getsize(path) / 2**20:>10.1f}")
+
+
+def bench_sqlite(rows, chunk_size):
+    db = sqlite3.connect(":memory:")
+    db.execute("CREATE TABLE bookings (id INTEGER PRIMARY KEY, name TEXT, phone TEXT, email TEXT, "
+               "id_number TEXT, room_type TEXT, nights INTEGER, total_cost REAL, check_in TEXT)")
+    db.executemany("INSERT INTO bookings VALUES (?,?,?,?,?,?,?,?,?)", make_rows(rows))
+    db.commit()
+    print(f"SQLite stand-in: {rows:,} bookings, chunk size {chunk_size:,}\n")
+    run(lambda: SQLiteConn(db), chunk_size)
+
+
+def bench_mysql(chunk_size):
+    from db import pool
+
+    with pool.connection() as conn:
+        total = conn.execute("SELECT COUNT(*) FROM bookings").fetchone()[0]
+    print(f"hotel_db: {total:,} bookings, chunk size {chunk_size:,}\n")
+    run(pool.connection, chunk_size)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    parser.add_argument("--mysql", action="store_true", help="benchmark against the configured MySQL database")
+    args = parser.parse_args()
+    if args.mysql:
+        bench_mysql(args.chunk_size)
+    else:
+        bench_sqlite(args.rows, args.chunk_size)
@@ -0,0 +1,111 @@
+# Guest search benchmark: the old LIKE '%keyword%' query against the indexed
+# search paths. The default engine (SEARCH_ENGINE = "fulltext") runs on
+# MySQL's FULLTEXT indexes, so --mysql is the run that measures it; the
+# SQLite stand-in only has the trigram engine and the id-number prefix path.
+#
+#   python -m benchmarks.bench_search --mysql         # against hotel_db from config.py
+#   python -m benchmarks.bench_search                 # SQLite stand-in, 200k rows
+#   python -m benchmarks.bench_search --rows 1000000
+import argparse
+import sqlite3
+import time
+
+from benchmarks.synthetic import make_rows
+from search import TrigramIndex, fetch_by_ids, like_prefix
+
+
+def timed(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+
+class SQLiteConn:
+    # Just enough of the pooled-connection interface for fetch_by_ids
+    def __init__(self, db):
+        self.db = db
+
+    def cursor(self):
+        return SQLiteCursor(self.db)
+
+
+class SQLiteCursor:
+    def __init__(self, db):
+        self.cur = db.cursor()
+
+    def execute(self, sql, params=()):
+        self.cur.execute(sql.replace("%s", "?"), params)
+
+    def fetchall(self):
+        return self.cur.fetchall()
+
+    def close(self):
+        self.cur.close()
+
+
+def bench_sqlite(rows, repeat):
+    db = sqlite3.connect(":memory:")
+    db.execute("CREATE TABLE bookings (id INTEGER PRIMARY KEY, name TEXT, phone TEXT, email TEXT, "
+               "id_number TEXT, room_type TEXT, nights INTEGER, total_cost REAL, check_in TEXT)")
+    start = time.perf_counter()
+    db.executemany("INSERT INTO bookings VALUES (?,?,?,?,?,?,?,?,?)", make_rows(rows))
+    db.execute("CREATE INDEX idx_bookings_id_number ON bookings (id_number)")
+    db.commit()
+    print(f"Loaded {rows:,} bookings in {time.perf_counter() - start:.1f}s")
+
+    start = time.perf_counter()
+    index = TrigramIndex()
+    index.load(db.execute("SELECT id, name, id_number FROM bookings"))
+    print(f"Built trigram index in {time.perf_counter() - start:.1f}s")
+    print("SQLite stand-in: trigram and id-prefix only; use --mysql to measure the fulltext engine\n")
+
+    sample_passport = db.execute("SELECT id_number FROM bookings WHERE id = ?", (rows // 2,)).fetchone()[0]
+    conn = SQLiteConn(db)
+    print(f"{'keyword':<16}{'LIKE scan':>12}{'trigram':>12}{'id prefix':>12}{'hits':>8}")
+    for keyword in ["Wanjiru", "kamau", "Amina Hass", sample_passport, sample_passport[:5]]:
+        like_ms, like_rows = timed(lambda: db.execute(
+            "SELECT * FROM bookings WHERE name LIKE ? OR id_number LIKE ?",
+            (f"%{keyword}%", f"%{keyword}%")).fetchall(), repeat)
+        tri_ms, _ = timed(lambda: fetch_by_ids(conn, index.search(keyword)), repeat)
+        # SQLite's LIKE is case-insensitive and can't use the index, so the
+        # sargable range form stands in for MySQL's `id_number LIKE 'x%'`
+        prefix = like_prefix(keyword)[:-1]
+        pre_ms, _ = timed(lambda: db.execute(
+            "SELECT * FROM bookings WHERE id_number >= ? AND id_number < ? ORDER BY id DESC LIMIT 200",
+            (prefix, prefix + "\uffff")).fetchall(), repeat)
+        print(f"{keyword:<16}{like_ms:>10.2f}ms{tri_ms:>10.2f}ms{pre_ms:>10.2f}ms{len(like_rows):>8}")
+
+
+def bench_mysql(repeat):
+    from db import pool, SQL_SEARCH_BOOKINGS
+    from search import BookingSearch
+
+    search = BookingSearch(pool.connection, engine="fulltext")
+    with pool.connection() as conn:
+        total = conn.execute("SELECT COUNT(*) FROM bookings").fetchone()[0]
+        sample = conn.execute("SELECT name, id_number FROM bookings ORDER BY id DESC LIMIT 1").fetchone()
+    print(f"hotel_db: {total:,} bookings\n")
+    if not sample:
+        return
+    print(f"{'keyword':<20}{'LIKE scan':>12}{'indexed':>12}")
+    for keyword in [sample[0].split()[0], sample[1], sample[1][:4]]:
+        with pool.connection() as conn:
+            like_ms, _ = timed(lambda: conn.execute(
+                SQL_SEARCH_BOOKINGS, (f"%{keyword}%", f"%{keyword}%")).fetchall(), repeat)
+            idx_ms, _ = timed(lambda: search.search_database(conn, keyword), repeat)
+        print(f"{keyword:<20}{like_ms:>10.2f}ms{idx_ms:>10.2f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--mysql", action="store_true", help="benchmark against the configured MySQL database")
+    args = parser.parse_args()
+    if args.mysql:
+        bench_mysql(args.repeat)
+    else:
+        bench_sqlite(args.rows, args.repeat)
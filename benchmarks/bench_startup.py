@@ -0,0 +1,105 @@
+# Cold-start benchmark: time to first window and time to first table, with
+# FAST_START on and off. Every run is a fresh interpreter, timed from the
+# moment it is spawned; the median of --runs is reported.
+#
+#   python -m benchmarks.bench_startup                # needs a display and hotel_db
+#   python -m benchmarks.bench_startup --runs 10
+#   python -m benchmarks.bench_startup --imports-only # headless: module import cost only
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in the child. argv: spawn time (time.time()), fast start flag, timeout seconds
+CHILD = r"""
+import json, sys, time
+spawned, fast, timeout = float(sys.argv[1]), sys.argv[2] == "1", float(sys.argv[3])
+marks = {"interpreter": time.time() - spawned}
+
+import config
+config.FAST_START = fast
+import tkinter as tk
+import app
+marks["imports"] = time.time() - spawned
+
+populate_table = app.HotelBookingApp.populate_table
+def timed_populate(self, rows):
+    populate_table(self, rows)
+    marks.setdefault("first_table", time.time() - spawned)
+app.HotelBookingApp.populate_table = timed_populate
+
+root = tk.Tk()
+root.bind("<Map>", lambda event: marks.setdefault("first_window", time.time() - spawned), add="+")
+hotel = app.HotelBookingApp(root)
+
+def finish():
+    print(json.dumps(marks))
+    hotel.on_close()
+
+def poll():
+    if "first_table" in marks and "first_window" in marks:
+        root.after_idle(finish)
+    elif time.time() - spawned > timeout:
+        finish()
+    else:
+        root.after(10, poll)
+
+root.after(10, poll)
+root.mainloop()
+"""
+
+# Headless variant: what each import costs without creating a window
+IMPORTS_CHILD = r"""
+import json, sys, time
+spawned = float(sys.argv[1])
+marks = {"interpreter": time.time() - spawned}
+import app
+marks["import_app"] = time.time() - spawned
+start = time.time()
+app.warm_heavy_modules()
+marks["heavy_modules"] = time.time() - start
+print(json.dumps(marks))
+"""
+
+
+def run_child(code, *args):
+    result = subprocess.run(
+        [sys.executable, "-c", code, str(time.time()), *map(str, args)],
+        cwd=ROOT, capture_output=True, text=True
+    )
+    if result.returncode != 0 or not result.stdout.strip():
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "no output")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def summarize(samples):
+    keys = sorted({key for sample in samples for key in sample}, key=lambda k: min(s.get(k, 1e9) for s in samples))
+    return {key: statistics.median(s[key] for s in samples if key in s) for key in keys}
+
+
+def report(title, medians):
+    print(title)
+    for key, seconds in medians.items():
+        print(f"  {key:<16}{seconds * 1000:>9.0f} ms")
+    print()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=30.0, help="seconds to wait for the first table")
+    parser.add_argument("--imports-only", action="store_true", help="skip the GUI; time module imports")
+    args = parser.parse_args()
+
+    if args.imports_only:
+        report(f"Imports (median of {args.runs})",
+               summarize([run_child(IMPORTS_CHILD) for _ in range(args.runs)]))
+    else:
+        for fast in (False, True):
+            samples = [run_child(CHILD, int(fast), args.timeout) for _ in range(args.runs)]
+            report(f"FAST_START = {fast} (median of {args.runs})", summarize(samples))
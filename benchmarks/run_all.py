@@ -0,0 +1,318 @@
+# Benchmark suite: times every hot path of the booking app against one
+# synthetic dataset and writes the results as JSON, so a later run can be
+# compared with an earlier one.
+#
+#   python -m benchmarks.run_all --size 1k
+#   python -m benchmarks.run_all --size 100k --compare benchmarks/results/<earlier>.json
+#   python -m benchmarks.run_all --size 1m --skip generate_receipt
+#
+# Paths timed (by their name in app.py):
+#   view_bookings      first keyset page, and the columnar store load + sorted/filtered view
+#   populate_table     a page into a real Treeview (needs a display)
+#   search_booking     trigram index build and lookups
+#   update_dashboard   aggregates resync, snapshot and 90-day occupancy
+#   update_chart       the dashboard bar chart (needs a display)
+#   book_room          BookingService.insert throughput, overbooking check included
+#   generate_receipt   one receipt PDF (needs ReportLab)
+#
+# The database is the SQLite stand-in (benchmarks/standin.py) unless --mysql
+# is given, in which case the pool from db.py is used as-is and no rows are
+# generated: point config.py at a scratch copy of hotel_db first.
+import argparse
+import datetime
+import importlib.util
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks import standin
+from benchmarks.synthetic import make_rows, parse_size, FIRST_NAMES, LAST_NAMES, ROOM_TYPES
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+SEARCH_KEYWORDS = ["Kamau", "grace", "P12", "Wanjiru Kariuki", "zzz"]
+NOISE_MS = 0.1                     # ms changes smaller than this are never reported
+BENCHMARKS = ["view_bookings", "populate_table", "search_booking", "update_dashboard",
+              "update_chart", "book_room", "generate_receipt"]
+
+
+def best_of(fn, repeat):
+    # Best wall time in ms over `repeat` calls
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def has_display():
+    return bool(os.environ.get("DISPLAY") or os.environ.get("WAYLAND_DISPLAY")) or sys.platform in ("win32", "darwin")
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# ---------------- BENCHMARKS ----------------
+# Each takes the shared context and returns {metric: (value, unit)}; units are
+# "ms" (lower is better) or "ops/s" (higher is better).
+def bench_view_bookings(ctx):
+    from pager import KeysetPager
+    from store import BookingStore
+
+    pager = KeysetPager(ctx["connect"], cache_pages=0)
+    store = BookingStore()
+    start = time.perf_counter()
+    with ctx["connect"]() as conn:
+        store.load(conn)
+    load_ms = (time.perf_counter() - start) * 1000
+    return {
+        "first_page_ms": (best_of(pager.first, 5), "ms"),
+        "last_page_ms": (best_of(pager.last, 5), "ms"),
+        "store_load_ms": (load_ms, "ms"),
+        "store_sort_cold_ms": (best_of(lambda: store.view(sort="name"), 1), "ms"),
+        "store_sort_cached_ms": (best_of(lambda: store.view(sort="name", reverse=True), 5), "ms"),
+        "store_filter_ms": (best_of(lambda: store.view(sort="total_cost", room_type=ROOM_TYPES[0],
+                                                       nights=(2, 7)), 5), "ms"),
+    }
+
+
+def bench_populate_table(ctx):
+    import tkinter as tk
+    from tkinter import ttk
+    from pager import KeysetPager
+
+    rows = KeysetPager(ctx["connect"], cache_pages=0).first().rows
+    root = ctx["tk_root"]
+    tree = ttk.Treeview(root, columns=[str(i) for i in range(len(rows[0]) if rows else 1)], show="headings")
+    tree.pack()
+
+    def populate():
+        # Same work as App.populate_table
+        tree.delete(*tree.get_children())
+        for i, row in enumerate(rows):
+            tree.insert("", tk.END, iid=str(row[0]), values=["" if v is None else v for v in row],
+                        tags=("evenrow" if i % 2 == 0 else "oddrow",))
+        root.update_idletasks()
+
+    elapsed = best_of(populate, 5)
+    tree.destroy()
+    return {"populate_page_ms": (elapsed, "ms")}
+
+
+def bench_search_booking(ctx):
+    from search import BookingSearch
+
+    search = BookingSearch(ctx["connect"], engine="trigram")
+    start = time.perf_counter()
+    search.load()
+    load_ms = (time.perf_counter() - start) * 1000
+    lookup = best_of(lambda: [search.search(keyword) for keyword in SEARCH_KEYWORDS], 5)
+    return {
+        "index_build_ms": (load_ms, "ms"),
+        "search_ms": (lookup / len(SEARCH_KEYWORDS), "ms"),
+    }
+
+
+def bench_update_dashboard(ctx):
+    from aggregates import DashboardAggregates
+    from availability import AvailabilityIndex
+
+    # The stand-in has no trigger-maintained summary table
+    aggregates = DashboardAggregates() if ctx["mysql"] else DashboardAggregates(summary_table=False)
+    availability = AvailabilityIndex(write_lock=aggregates.write_lock)
+
+    def resync():
+        with ctx["connect"]() as conn:
+            aggregates.resync(conn)
+            availability.resync(conn)
+
+    resync_ms = best_of(resync, 3)
+    return {
+        "resync_ms": (resync_ms, "ms"),
+        "snapshot_ms": (best_of(aggregates.snapshot, 100), "ms"),
+        "occupancy_ms": (best_of(availability.occupancy, 100), "ms"),
+        "free_tonight_ms": (best_of(availability.free_tonight, 100), "ms"),
+    }
+
+
+def bench_update_chart(ctx):
+    from charts import RoomTypeChart
+
+    root = ctx["tk_root"]
+    chart = RoomTypeChart(root)
+    chart.widget.pack()
+    rnd = random.Random(1)
+
+    def refresh():
+        chart.update([(room_type, rnd.randrange(1000)) for room_type in ROOM_TYPES])
+        chart.canvas.draw()
+
+    first = best_of(refresh, 1)
+    elapsed = best_of(refresh, 10)
+    chart.widget.destroy()
+    return {"first_draw_ms": (first, "ms"), "redraw_ms": (elapsed, "ms")}
+
+
+def bench_book_room(ctx):
+    from billing import validate_booking
+    from booking_service import BookingService
+    from search import BookingSearch
+
+    service = BookingService(ctx["connect"], search=BookingSearch(ctx["connect"], engine=None))
+    service.resync()
+    rnd = random.Random(3)
+    count = ctx["bookings"]
+    # Far-future dates so the seeded stays don't make most attempts overbooked
+    base = datetime.date.today() + datetime.timedelta(days=3 * 365)
+    forms = [
+        validate_booking(f"{rnd.choice(FIRST_NAMES)} {rnd.choice(LAST_NAMES)}", f"07{rnd.randrange(10**8):08d}",
+                         f"bench{i}@example.com", f"B{rnd.randrange(10**7):07d}", rnd.choice(ROOM_TYPES),
+                         rnd.randint(1, 4), (base + datetime.timedelta(days=rnd.randrange(365))).isoformat())
+        for i in range(count)
+    ]
+    booked = 0
+    start = time.perf_counter()
+    for data in forms:
+        try:
+            service.insert(data)
+            booked += 1
+        except ValueError:         # overbooked: still a full round trip
+            pass
+    elapsed = time.perf_counter() - start
+    return {
+        "bookings_per_s": (count / elapsed, "ops/s"),
+        "booking_ms": (elapsed / count * 1000, "ms"),
+        "booked": (booked, "count"),
+    }
+
+
+def bench_generate_receipt(ctx):
+    from receipts import build_receipt, fetch_receipt_rows
+
+    with ctx["connect"]() as conn:
+        rows = fetch_receipt_rows(conn, ids=[1, 2, 3])
+    out_dir = os.path.join(ctx["tmp"], "receipts")
+    first = best_of(lambda: build_receipt(rows[0], out_dir), 1)
+    warm = best_of(lambda: [build_receipt(row, out_dir) for row in rows], 3) / max(len(rows), 1)
+    return {"first_receipt_ms": (first, "ms"), "receipt_ms": (warm, "ms")}
+
+
+def skip_reason(name, ctx):
+    if name in ("populate_table", "update_chart") and ctx["tk_root"] is None:
+        return "no display"
+    if name == "update_chart" and importlib.util.find_spec("matplotlib") is None:
+        return "matplotlib not installed"
+    if name == "generate_receipt" and importlib.util.find_spec("reportlab") is None:
+        return "ReportLab not installed"
+    return None
+
+
+# ---------------- RESULTS ----------------
+def compare(results, baseline, tolerance):
+    # Prints every metric that moved by more than `tolerance`; returns the regressions
+    regressions = []
+    for bench, metrics in results["benchmarks"].items():
+        for metric, (value, unit) in metrics.items():
+            old = baseline.get("benchmarks", {}).get(bench, {}).get(metric)
+            if not old or unit not in ("ms", "ops/s") or not old[0]:
+                continue
+            if unit == "ms" and abs(value - old[0]) < NOISE_MS:
+                continue
+            change = (value - old[0]) / old[0]
+            worse = change > tolerance if unit == "ms" else change < -tolerance
+            better = change < -tolerance if unit == "ms" else change > tolerance
+            if worse or better:
+                line = f"  {bench}.{metric}: {old[0]:,.3f} -> {value:,.3f} {unit} ({change:+.0%})"
+                print(("REGRESSION" if worse else "improved  ") + line)
+                if worse:
+                    regressions.append(f"{bench}.{metric}")
+    if baseline.get("size") != results["size"]:
+        print(f"note: baseline was run at {baseline.get('size')} rows, this run at {results['size']}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the booking app's hot paths")
+    parser.add_argument("--size", default="1k", help="1k, 100k, 1m or a row count")
+    parser.add_argument("--bookings", type=int, default=500, help="inserts for the book_room benchmark")
+    parser.add_argument("--mysql", action="store_true", help="use the hotel_db pool from config.py")
+    parser.add_argument("--only", nargs="+", choices=BENCHMARKS)
+    parser.add_argument("--skip", nargs="+", choices=BENCHMARKS, default=[])
+    parser.add_argument("--out", help="results file (default benchmarks/results/<time>-<size>.json)")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="relative change reported (default 0.2)")
+    args = parser.parse_args()
+
+    size = parse_size(args.size)
+    results = {
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "git": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "database": "mysql" if args.mysql else "sqlite-standin",
+        "size": size,
+        "benchmarks": {},
+        "skipped": {},
+    }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.mysql:
+            from db import pool as db_pool
+        else:
+            from db import ConnectionPool
+            path = os.path.join(tmp, "hotel.sqlite")
+            start = time.perf_counter()
+            standin.create_database(path, (row[1:] for row in make_rows(size)))
+            print(f"SQLite stand-in: {size:,} bookings in {time.perf_counter() - start:.1f}s")
+            db_pool = ConnectionPool(size=4, connect=standin.connector(path))
+
+        tk_root = None
+        if has_display():
+            import tkinter as tk
+            tk_root = tk.Tk()
+
+        ctx = {"connect": db_pool.connection, "mysql": args.mysql, "tmp": tmp,
+               "tk_root": tk_root, "bookings": args.bookings}
+        for name in args.only or BENCHMARKS:
+            if name in args.skip:
+                continue
+            reason = skip_reason(name, ctx)
+            if reason:
+                results["skipped"][name] = reason
+                print(f"{name:<18} skipped ({reason})")
+                continue
+            metrics = globals()[f"bench_{name}"](ctx)
+            results["benchmarks"][name] = {metric: [round(value, 4), unit] for metric, (value, unit) in metrics.items()}
+            print(f"{name:<18} " + ", ".join(f"{metric} {value:,.3f}" for metric, (value, unit) in metrics.items()))
+
+        if tk_root is not None:
+            tk_root.destroy()
+        if not args.mysql:
+            db_pool.close_all()
+
+    out = args.out or os.path.join(
+        RESULTS_DIR, f"{datetime.datetime.now():%Y%m%d-%H%M%S}-{args.size.lower()}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {out}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            sys.exit(f"{len(regressions)} regression(s) beyond {args.tolerance:.0%}")
+
+
+if __name__ == "__main__":
+    main()
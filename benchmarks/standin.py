@@ -0,0 +1,128 @@
+# SQLite stand-in for hotel_db, for benchmarks that need the real service code
+# without a MySQL server. Raw connections mimic the parts of mysql.connector
+# the app uses, so they plug straight into db.ConnectionPool:
+#
+#   pool = ConnectionPool(size=8, connect=standin.connector(path))
+#
+# Translation is deliberately small: %s placeholders become ?, MySQL's
+# upsert, CURDATE(), NOW() - INTERVAL and the @lapsa_terminal session
+# variable (left NULL) get their SQLite spelling, and SELECT ... FOR UPDATE
+# takes SQLite's write lock (BEGIN IMMEDIATE) instead, which serializes
+# writers the way the row locks would.
+import datetime
+import re
+import sqlite3
+from decimal import Decimal
+
+SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS bookings ("
+    "id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT, phone TEXT, email TEXT, id_number TEXT, "
+    "room_type TEXT, nights INTEGER, total_cost REAL, check_in TEXT, "
+    "check_out TEXT GENERATED ALWAYS AS (date(check_in, '+' || nights || ' days')) STORED, "
+    "client_ref TEXT UNIQUE, created_at TEXT DEFAULT CURRENT_TIMESTAMP)",
+    "CREATE INDEX IF NOT EXISTS idx_bookings_id_number ON bookings (id_number)",
+    "CREATE INDEX IF NOT EXISTS idx_bookings_name ON bookings (name)",
+    "CREATE INDEX IF NOT EXISTS idx_bookings_stay ON bookings (room_type, check_out, check_in)",
+    "CREATE INDEX IF NOT EXISTS idx_bookings_created_at ON bookings (created_at)",
+    # booking_rollups (schema.py 007_booking_rollups), kept by the app's writes
+    "CREATE TABLE IF NOT EXISTS booking_rollups (day TEXT PRIMARY KEY, bookings INTEGER NOT NULL DEFAULT 0, "
+    "revenue REAL NOT NULL DEFAULT 0)",
+    # booking_changes (schema.py 005_change_feed), kept by the app's writes
+    "CREATE TABLE IF NOT EXISTS booking_changes (version INTEGER PRIMARY KEY AUTOINCREMENT, "
+    "booking_id INTEGER NOT NULL, op TEXT NOT NULL, terminal TEXT, room_type TEXT, total_cost REAL, "
+    "old_room_type TEXT, old_total_cost REAL, changed_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP)",
+]
+
+sqlite3.register_adapter(datetime.date, lambda d: d.isoformat())
+sqlite3.register_adapter(Decimal, float)
+
+
+def translate(sql):
+    sql = sql.replace("NOW() - INTERVAL %s DAY", "datetime('now', '-' || %s || ' days')")
+    sql = sql.replace("%s", "?").replace(" FOR UPDATE", "").replace("CURDATE()", "date('now')")
+    sql = sql.replace("@lapsa_terminal", "NULL")
+    sql = sql.replace("ON DUPLICATE KEY UPDATE", "ON CONFLICT DO UPDATE SET")
+    return re.sub(r"VALUES\((\w+)\)", r"excluded.\1", sql)
+
+
+class StandInCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.cur = conn.db.cursor()
+
+    def execute(self, sql, params=()):
+        if sql.rstrip().endswith("FOR UPDATE") and not self.conn.db.in_transaction:
+            self.conn.db.execute("BEGIN IMMEDIATE")
+        self.cur.execute(translate(sql), tuple(params))
+
+    def executemany(self, sql, rows):
+        self.cur.executemany(translate(sql), rows)
+
+    def fetchone(self):
+        return self.cur.fetchone()
+
+    def fetchmany(self, size):
+        return self.cur.fetchmany(size)
+
+    def fetchall(self):
+        return self.cur.fetchall()
+
+    @property
+    def lastrowid(self):
+        return self.cur.lastrowid
+
+    @property
+    def rowcount(self):
+        return self.cur.rowcount
+
+    def close(self):
+        self.cur.close()
+
+
+class StandInConnection:
+    def __init__(self, path):
+        self.db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+
+    @property
+    def in_transaction(self):
+        return self.db.in_transaction
+
+    def cursor(self, prepared=False, buffered=None, **kwargs):
+        return StandInCursor(self)
+
+    def commit(self):
+        self.db.commit()
+
+    def rollback(self):
+        self.db.rollback()
+
+    def ping(self, reconnect=False):
+        self.db.execute("SELECT 1")
+
+    def close(self):
+        self.db.close()
+
+
+def connector(path):
+    return lambda: StandInConnection(path)
+
+
+def create_database(path, rows=()):
+    # rows: (name, phone, email, id_number, room_type, nights, total_cost, check_in)
+    db = sqlite3.connect(path)
+    for sql in SCHEMA:
+        db.execute(sql)
+    db.executemany(
+        "INSERT INTO bookings (name, phone, email, id_number, room_type, nights, total_cost, check_in) "
+        "VALUES (?,?,?,?,?,?,?,?)", rows
+    )
+    db.execute(
+        "INSERT INTO booking_rollups (day, bookings, revenue) "
+        "SELECT COALESCE(date(created_at), check_in) AS booked, COUNT(*), SUM(total_cost) FROM bookings "
+        "WHERE booked IS NOT NULL GROUP BY booked ON CONFLICT DO UPDATE SET "
+        "bookings = excluded.bookings, revenue = excluded.revenue"
+    )
+    db.commit()
+    db.close()
@@ -0,0 +1,50 @@
+# Synthetic bookings for benchmarks: deterministic for a given seed, spread
+# over every room type in PRICES, priced with the real billing rules and
+# dated around today so availability and dashboards see realistic load.
+#
+#   python -m benchmarks.synthetic 100000 bookings.csv   # also writes import files
+import csv
+import datetime
+import random
+import sys
+
+from config import PRICES
+from billing import price_stay
+
+FIRST_NAMES = ["James", "Mary", "John", "Amina", "Wanjiru", "Otieno", "Grace", "Peter",
+               "Fatuma", "Kevin", "Achieng", "Brian", "Mercy", "Hassan", "Njeri", "David"]
+LAST_NAMES = ["Kamau", "Odhiambo", "Mwangi", "Smith", "Hassan", "Wafula", "Kariuki",
+              "Chebet", "Njoroge", "Omondi", "Mutua", "Brown", "Kiptoo", "Atieno"]
+ROOM_TYPES = list(PRICES)
+SIZES = {"1k": 1_000, "100k": 100_000, "1m": 1_000_000}
+
+
+def make_rows(count, seed=7, days_back=730, days_ahead=90):
+    # Yields (id, name, phone, email, id_number, room_type, nights, total_cost, check_in)
+    # in BOOKING_COLUMNS order; check_in is an ISO date string.
+    rnd = random.Random(seed)
+    start = datetime.date.today().toordinal() - days_back
+    totals = {(room_type, nights): price_stay(room_type, nights)[3]
+              for room_type in ROOM_TYPES for nights in range(1, 15)}
+    for i in range(1, count + 1):
+        room_type = rnd.choice(ROOM_TYPES)
+        nights = rnd.randint(1, 14)
+        check_in = datetime.date.fromordinal(start + rnd.randrange(days_back + days_ahead))
+        yield (i, f"{rnd.choice(FIRST_NAMES)} {rnd.choice(LAST_NAMES)}", f"07{rnd.randrange(10**8):08d}",
+               f"guest{i}@example.com", f"P{rnd.randrange(10**7):07d}", room_type, nights,
+               totals[room_type, nights], check_in.isoformat())
+
+
+def parse_size(text):
+    return SIZES.get(text.lower()) or int(text.replace("_", ""))
+
+
+if __name__ == "__main__":
+    count = parse_size(sys.argv[1]) if len(sys.argv) > 1 else 1_000
+    path = sys.argv[2] if len(sys.argv) > 2 else "bookings.csv"
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["name", "phone", "email", "id_number", "room_type", "nights", "check_in"])
+        for row in make_rows(count):
+            writer.writerow(row[1:7] + row[8:])
+    print(f"{count:,} bookings written to {path}")
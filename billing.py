@@ -0,0 +1,49 @@
+import datetime
+
+from config import PRICES, VAT_RATE, MAX_STAY_NIGHTS
+
+
+# ---------------- VALIDATION ----------------
+def validate_booking(name, phone, email, id_number, room_type, nights, check_in):
+    # Same rules as the booking form. Returns the row to insert (total includes
+    # VAT, so revenue does too); raises ValueError with a user-facing message.
+    fields = [str(v).strip() if v is not None else ""
+              for v in (name, phone, email, id_number, room_type, nights, check_in)]
+    name, phone, email, id_number, room_type, nights, check_in = fields
+    if not (name and phone and email and id_number and room_type and nights and check_in):
+        raise ValueError("All fields are required!")
+    try:
+        nights = int(nights)
+        if nights <= 0:
+            raise ValueError
+    except ValueError:
+        raise ValueError("Nights must be a positive number!") from None
+    if nights > MAX_STAY_NIGHTS:
+        raise ValueError(f"Stays are limited to {MAX_STAY_NIGHTS} nights!")
+    try:
+        check_in = datetime.date.fromisoformat(check_in)
+    except ValueError:
+        raise ValueError("Check-in must be a date (YYYY-MM-DD)!") from None
+    if check_in > datetime.date.max - datetime.timedelta(days=nights):
+        raise ValueError("Check-out must be before the year 10000!")
+    if room_type not in PRICES:
+        raise ValueError(f"Unknown room type: {room_type}")
+    grand_total = price_stay(room_type, nights)[3]
+    return name, phone, email, id_number, room_type, nights, grand_total, check_in
+
+
+# ---------------- PRICING ----------------
+def price_stay(room_type, nights):
+    # Returns (nightly rate, subtotal, VAT, grand total) from the configured price list
+    rate = PRICES.get(room_type, 0)
+    subtotal = round(rate * int(nights), 2)
+    tax = round(subtotal * VAT_RATE, 2)
+    grand_total = round(subtotal + tax, 2)
+    return rate, subtotal, tax, grand_total
+
+
+def format_money(value):
+    try:
+        return "${:,.2f}".format(float(value))
+    except Exception:
+        return f"${value}"
@@ -0,0 +1,275 @@
+import datetime
+
+from config import (
+    PAGE_SIZE, PRICES, REVENUE_ROLLUPS, TREND_YEARS, RECEIPT_ARCHIVE,
+)
+from db import (
+    pool,
+    SQL_INSERT_BOOKING, SQL_INSERT_JOURNALED_BOOKING, SQL_BOOKING_ID_BY_CLIENT_REF,
+    SQL_UPDATE_BOOKING, SQL_DELETE_BOOKING, SQL_SELECT_BOOKING,
+    SQL_BOOKING_TOTAL_FOR_UPDATE, SQL_PAGE_FIRST, SQL_PAGE_AFTER, SQL_BOOKING_CREATED_DAY, SQL_ROLLUP_ADD,
+    SQL_CHANGE_ADD, record_write,
+)
+from billing import validate_booking, price_stay
+from aggregates import DashboardAggregates
+from availability import AvailabilityIndex, check_stay, stay_length, to_date
+from search import BookingSearch
+from changefeed import latest_rows, prune
+from rollups import RevenueRollups, write_deltas, trend_start, occupancy_series, PERIODS
+
+
+def rollup_adds(deltas):
+    # write_deltas() as record_write() rollup statements
+    return [(SQL_ROLLUP_ADD, delta) for delta in deltas]
+
+
+# ---------------- BOOKING SERVICE ----------------
+# The booking operations without any Tk: validation and pricing, the CRUD SQL
+# with its overbooking check, and the caches every write has to keep current
+# (dashboard aggregates, availability index, search index). The desktop app
+# and the HTTP API (api.py) are both thin callers of this class.
+#
+# With a change feed (changefeed.py), sync() applies other desks' writes to
+# the same caches.
+#
+# Methods block on the database; call them from worker threads.
+class BookingService:
+    def __init__(self, connect=pool.connection, search=None, receipt_cache=None, feed=None):
+        self.connect = connect
+        self.receipt_cache = receipt_cache
+        self.feed = feed
+        self.aggregates = DashboardAggregates()
+        self.availability = AvailabilityIndex(write_lock=self.aggregates.write_lock)
+        self.rollups = RevenueRollups(write_lock=self.aggregates.write_lock) if REVENUE_ROLLUPS else None
+        self.search = search or BookingSearch(connect)
+
+    def load(self):
+        # Build the in-memory caches (schema migrations are the caller's job)
+        if self.feed is not None:
+            with self.connect() as conn:
+                prune(conn)
+        self.resync()
+        self.search.load()
+
+    def resync(self):
+        # Pick up changes made elsewhere (other desks, imports, manual SQL).
+        # Returns the change feed's changes that hadn't been polled yet
+        # ([changefeed.Change], oldest first): the recount includes them, the
+        # UI's table rows don't.
+        changes = []
+        with self.connect() as conn:
+            before = None
+            if self.feed is not None:
+                def before(conn):
+                    changes.extend(self.feed.catch_up(conn))
+            self.aggregates.resync(conn, before=before)
+            self.availability.resync(conn)
+            if self.rollups is not None:
+                self.rollups.resync(conn)
+        self.search_changes(changes)
+        return changes
+
+    def sync(self):
+        # Apply the changes other desks made since the last sync to the caches
+        # and return them ([changefeed.Change], oldest first) for the UI.
+        # Dashboard deltas come from the changelog's before/after values; the
+        # availability and search indexes take each booking's current row.
+        if self.feed is None:
+            return []
+        with self.connect() as conn:
+            # Under the write lock, so a concurrent resync can't count a change twice
+            with self.aggregates.write_lock:
+                changes = self.feed.poll(conn)
+                for change in changes:
+                    if change.op == "I":
+                        self.aggregates.apply_insert(change.room_type, change.total_cost)
+                    elif change.op == "U":
+                        self.aggregates.apply_update(change.old_room_type, change.old_total_cost,
+                                                     change.room_type, change.total_cost)
+                    else:
+                        self.aggregates.apply_delete(change.old_room_type, change.old_total_cost)
+                for booking_id, row in latest_rows(changes).items():
+                    if row is not None and row[8] is not None:
+                        self.availability.add(booking_id, row[5], row[8], row[6])
+                    else:
+                        self.availability.remove(booking_id)
+            if changes and self.rollups is not None:
+                # The changelog doesn't carry booking days; the rollups are one row per day to re-read
+                self.rollups.resync(conn)
+        self.search_changes(changes)
+        return changes
+
+    def search_changes(self, changes):
+        for booking_id, row in latest_rows(changes).items():
+            if row is None:
+                self.search.on_deleted(booking_id)
+            else:
+                self.search.on_saved(booking_id, row[1], row[4])
+
+    # ---- writes ----
+    def book(self, name, phone, email, id_number, room_type, nights, check_in):
+        return self.insert(validate_booking(name, phone, email, id_number, room_type, nights, check_in))
+
+    def insert(self, data):
+        # data: a row from validate_booking. Returns the stored row.
+        return self.write_group([("insert", None, data, None)])[0]
+
+    def update(self, booking_id, name, phone, email, id_number, room_type, nights, check_in):
+        return self.save(booking_id, validate_booking(name, phone, email, id_number, room_type, nights, check_in))
+
+    def save(self, booking_id, data):
+        return self.write_group([("update", booking_id, data, None)])[0]
+
+    def write_group(self, writes, keep_going=False):
+        # writes: [(op, booking id, data, client_ref)] with op "insert" or
+        # "update", all committed in one transaction. Each write still gets
+        # its own overbooking check, and sees the earlier writes of the group.
+        # Returns the stored rows in order. With keep_going a write that is
+        # overbooked or whose booking is gone gets its exception in place of a
+        # row and the rest of the group goes ahead (the journal flusher);
+        # otherwise the first such error is raised and nothing is committed.
+        results = []
+        applied = []               # (booking id, data, old room type & total or None)
+        with self.connect() as conn:
+            for op, booking_id, data, client_ref in writes:
+                room_type, nights, total_cost, check_in = data[4:8]
+                try:
+                    if op == "insert":
+                        found = client_ref and conn.execute(SQL_BOOKING_ID_BY_CLIENT_REF, (client_ref,)).fetchone()
+                        if found:
+                            # Committed by an earlier flush that died before the journal heard back
+                            results.append(found[0])
+                            continue
+                        check_stay(conn, room_type, check_in, nights)
+                        if client_ref:
+                            booking_id = conn.execute(SQL_INSERT_JOURNALED_BOOKING, (*data, client_ref)).lastrowid
+                        else:
+                            booking_id = conn.execute(SQL_INSERT_BOOKING, data).lastrowid
+                        old = None
+                        record_write(conn, rollup_adds(write_deltas(None, total_cost)),
+                                     [(SQL_CHANGE_ADD, (booking_id, "I", room_type, total_cost, None, None))])
+                    else:
+                        old = conn.execute(SQL_BOOKING_TOTAL_FOR_UPDATE, (booking_id,)).fetchone()
+                        if not old:
+                            raise LookupError(f"Booking {booking_id} no longer exists")
+                        check_stay(conn, room_type, check_in, nights, exclude=booking_id)
+                        conn.execute(SQL_UPDATE_BOOKING, (*data, booking_id))
+                        record_write(conn, rollup_adds(write_deltas(old, total_cost, check_in)),
+                                     [(SQL_CHANGE_ADD, (booking_id, "U", room_type, total_cost, old[0], old[1]))])
+                except (ValueError, LookupError) as err:
+                    if not keep_going:
+                        raise
+                    results.append(err)
+                    continue
+                applied.append((booking_id, data, old))
+                results.append(booking_id)
+            with self.aggregates.write_lock:
+                conn.commit()
+                for booking_id, data, old in applied:
+                    room_type, nights, total_cost, check_in = data[4:8]
+                    if old is None:
+                        self.aggregates.apply_insert(room_type, total_cost)
+                    else:
+                        self.aggregates.apply_update(old[0], old[1], room_type, total_cost)
+                    self.availability.add(booking_id, room_type, check_in, nights)
+                    if self.rollups is not None:
+                        self.apply_rollups(write_deltas(old, total_cost, check_in))
+            # The rows exactly as stored (id, rounding, dates)
+            for i, result in enumerate(results):
+                if not isinstance(result, Exception):
+                    results[i] = conn.execute(SQL_SELECT_BOOKING, (result,)).fetchone()
+        for booking_id, data, old in applied:
+            self.search.on_saved(booking_id, data[0], data[3])
+        return results
+
+    def delete(self, booking_id):
+        with self.connect() as conn:
+            old = conn.execute(SQL_BOOKING_TOTAL_FOR_UPDATE, (booking_id,)).fetchone()
+            if not old:
+                raise LookupError(f"Booking {booking_id} no longer exists")
+            conn.execute(SQL_DELETE_BOOKING, (booking_id,))
+            record_write(conn, rollup_adds(write_deltas(old)),
+                         [(SQL_CHANGE_ADD, (booking_id, "D", None, None, old[0], old[1]))])
+            with self.aggregates.write_lock:
+                conn.commit()
+                self.aggregates.apply_delete(old[0], old[1])
+                self.availability.remove(booking_id)
+                if self.rollups is not None:
+                    self.apply_rollups(write_deltas(old))
+        self.search.on_deleted(booking_id)
+
+    def apply_rollups(self, deltas):
+        # An insert is dated "now" by the server; the desk's date stands in
+        for day, count, revenue in deltas:
+            self.rollups.apply(day or datetime.date.today(), count, revenue)
+
+    # ---- reads ----
+    def get(self, booking_id):
+        with self.connect() as conn:
+            row = conn.execute(SQL_SELECT_BOOKING, (booking_id,)).fetchone()
+        if not row:
+            raise LookupError(f"Booking {booking_id} not found")
+        return row
+
+    def list(self, after_id=None, limit=PAGE_SIZE):
+        # Keyset page in id order: pass the last id of one page to get the next
+        with self.connect() as conn:
+            if after_id is None:
+                return conn.execute(SQL_PAGE_FIRST, (limit,)).fetchall()
+            return conn.execute(SQL_PAGE_AFTER, (after_id, limit)).fetchall()
+
+    def find(self, keyword):
+        return self.search.search(keyword)
+
+    def quote(self, room_type, nights):
+        if room_type not in PRICES:
+            raise ValueError(f"Unknown room type: {room_type}")
+        nights = stay_length(nights)
+        rate, subtotal, tax, grand_total = price_stay(room_type, nights)
+        return {"room_type": room_type, "nights": nights, "rate": rate,
+                "subtotal": subtotal, "vat": tax, "total": grand_total}
+
+    def free_rooms(self, room_type, check_in, nights):
+        return self.availability.free(room_type, to_date(check_in), int(nights))
+
+    def dashboard(self):
+        total, revenue, per_room_type = self.aggregates.snapshot()
+        nights = self.availability.occupancy()
+        capacity = sum(row[2] for row in nights)
+        return {
+            "total_bookings": total,
+            "revenue": revenue,
+            "bookings_by_room_type": dict(per_room_type),
+            "available_tonight": self.availability.free_tonight(),
+            "occupancy": sum(row[1] for row in nights) / capacity if capacity else None,
+            "as_of": datetime.date.today(),
+        }
+
+    def trend(self, period="month", years=TREND_YEARS):
+        # [(period start, bookings, revenue, occupancy)] over the last `years`,
+        # from the rollups and the availability index only
+        if self.rollups is None:
+            raise LookupError("Revenue rollups are turned off (REVENUE_ROLLUPS)")
+        if period not in PERIODS:
+            raise ValueError(f"Unknown period: {period} (use {', '.join(PERIODS)})")
+        end = datetime.date.today()
+        start = trend_start(end, period, years)
+        occupancy = dict(occupancy_series(self.availability, period, start, end))
+        return [(first, count, revenue, occupancy.get(first, 0.0))
+                for first, count, revenue in self.rollups.series(period, start, end)]
+
+    def receipt(self, booking_id):
+        # (path, cached) of the booking's receipt PDF, built or reused on demand
+        from receipts import get_receipt, fetch_receipt_rows
+        with self.connect() as conn:
+            rows = fetch_receipt_rows(conn, ids=[booking_id])
+            day = conn.execute(SQL_BOOKING_CREATED_DAY, (booking_id,)).fetchone() if RECEIPT_ARCHIVE else None
+        if not rows:
+            raise LookupError(f"Booking {booking_id} no longer exists")
+        if day and day[0]:
+            # Already in the daily archive (receipt_archive.py): cut it out instead of rendering
+            from receipt_archive import archived_receipt
+            path = archived_receipt(rows[0], to_date(day[0]))
+            if path:
+                return path, True
+        return get_receipt(rows[0], self.receipt_cache)
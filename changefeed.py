@@ -0,0 +1,149 @@
+import os
+import socket
+import threading
+import time
+from collections import namedtuple
+
+from mysql.connector import errors
+
+from config import CHANGE_BATCH, CHANGE_GAP_S, CHANGE_KEEP_DAYS, CHANGE_POLL_MS, TERMINAL_ID
+from db import (
+    SQL_SET_TERMINAL, SQL_CHANGES_HIGH_WATER, SQL_CHANGES_VERSIONS, SQL_CHANGES_SINCE, SQL_CHANGES_MISSING,
+    SQL_CHANGES_PRUNE,
+)
+
+
+# ---------------- CHANGE FEED ----------------
+# Every insert, update and delete on bookings is appended to booking_changes
+# with an ever-increasing version, by the write itself or by triggers
+# (schema.py). Each desk tags
+# its connections with a terminal name, remembers the last version it has
+# seen, and polls for the newer ones: one indexed range read joined to the
+# bookings' current rows, instead of reloading the table.
+#
+# Versions are handed out when a row is written, not when its transaction
+# commits, so a poll can see version 12 before 11 exists. A missing version
+# is re-asked for by number until it shows up or is CHANGE_GAP_S old (rolled
+# back), while each poll carries on past the newest version seen.
+Change = namedtuple("Change", "version booking_id op room_type total_cost old_room_type old_total_cost row")
+
+
+def terminal_id():
+    return TERMINAL_ID or f"{socket.gethostname()}-{os.getpid()}"[:64]
+
+
+def tag_connection(conn, terminal):
+    # pool.on_connect: @lapsa_terminal is recorded with each change
+    conn.execute(SQL_SET_TERMINAL, (terminal,))
+
+
+class ChangeFeed:
+    def __init__(self, terminal=None, batch=CHANGE_BATCH, gap_s=CHANGE_GAP_S):
+        self.terminal = terminal or terminal_id()
+        self.batch = batch
+        self.gap_s = gap_s
+        self.version = None        # highest version seen; None until mark()
+        self.behind = False        # the last poll was cut off at batch: poll again straight away
+        self._seen = set()         # versions above floor already handled
+        self._gaps = {}            # missing version -> when it was first missed
+
+    @property
+    def floor(self):
+        # Everything up to here has been handled (or given up on)
+        return min(self._gaps) - 1 if self._gaps else self.version
+
+    def mark(self, conn):
+        # Start from what conn's read snapshot shows: called in the same
+        # transaction as the full load, so no change is applied twice or lost
+        high = conn.execute(SQL_CHANGES_HIGH_WATER).fetchone()[0]
+        low = max(high - self.batch, 0)
+        present = {row[0] for row in conn.execute(SQL_CHANGES_VERSIONS, (low,)).fetchall()}
+        now = time.monotonic()
+        self.version = high
+        self._seen = present
+        self._gaps = {version: now for version in range(low + 1, high + 1) if version not in present}
+
+    def catch_up(self, conn):
+        # Before a full reload in conn's read snapshot: the changes not polled
+        # yet, read in that same snapshot, then mark() there. The reload counts
+        # them already; callers apply them to what it doesn't rebuild (the
+        # table rows on screen, the search index).
+        changes = []
+        if self.version is not None:
+            changes.extend(self.poll(conn, end_snapshot=False))
+            while self.behind:
+                changes.extend(self.poll(conn, end_snapshot=False))
+        self.mark(conn)
+        return changes
+
+    def poll(self, conn, end_snapshot=True):
+        # -> [Change] made by other terminals since the last poll, oldest first
+        if self.version is None:
+            return []
+        rows = self._missing(conn) if self._gaps else []
+        fresh = conn.execute(SQL_CHANGES_SINCE, (self.version, self.batch)).fetchall()
+        if end_snapshot:
+            conn.rollback()
+        self.behind = len(fresh) == self.batch
+        rows.extend(fresh)
+        now = time.monotonic()
+        changes = []
+        for row in rows:
+            version = row[0]
+            if version in self._seen:
+                continue
+            self._seen.add(version)
+            self._gaps.pop(version, None)
+            if version > self.version:
+                for missing in range(max(self.version + 1, version - self.batch), version):
+                    if missing not in self._seen:
+                        self._gaps[missing] = now
+                self.version = version
+            if row[3] != self.terminal:
+                booking = row[8:] if row[8] is not None else None
+                changes.append(Change(version, row[1], row[2], *row[4:8], booking))
+        for missing, since in list(self._gaps.items()):
+            if now - since > self.gap_s:
+                del self._gaps[missing]
+        floor = self.floor
+        self._seen = {version for version in self._seen if version > floor}
+        return changes
+
+    def _missing(self, conn):
+        # The gaps that have committed since the last poll (older than version)
+        missing = sorted(self._gaps)
+        cursor = conn.cursor()
+        cursor.execute(SQL_CHANGES_MISSING.format(",".join(["%s"] * len(missing))), tuple(missing))
+        rows = cursor.fetchall()
+        cursor.close()
+        return rows
+
+
+def latest_rows(changes):
+    # booking id -> current row (None once deleted), one per booking
+    return {change.booking_id: change.row for change in changes}
+
+
+def prune(conn, keep_days=CHANGE_KEEP_DAYS):
+    cursor = conn.cursor()
+    cursor.execute(SQL_CHANGES_PRUNE, (keep_days,))
+    cursor.close()
+    conn.commit()
+
+
+def follow(feed, sync, interval_ms=CHANGE_POLL_MS):
+    # Headless callers (api.py): call sync() every interval on a daemon thread,
+    # back to back while catching up. A database outage just means trying
+    # again next time.
+    stop = threading.Event()
+
+    def run():
+        while not stop.wait(interval_ms / 1000):
+            try:
+                sync()
+                while feed.behind and not stop.is_set():
+                    sync()
+            except errors.Error:
+                pass
+    threading.Thread(target=run, name="lapsa-changes", daemon=True).start()
+    return stop
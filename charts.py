@@ -0,0 +1,110 @@
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+
+
+# ---------------- DASHBOARD CHART ----------------
+# One Figure/canvas for the lifetime of the window. Refreshes move the existing
+# bars and count labels and ask Tk for an idle redraw; the bar set is only
+# rebuilt when the room types themselves change. A plain Figure (not pyplot)
+# is used so nothing is kept alive in pyplot's global figure registry.
+class RoomTypeChart:
+    def __init__(self, master):
+        self.figure = Figure(figsize=(6.5, 3.2))
+        self.ax = self.figure.add_subplot()
+        self.canvas = FigureCanvasTkAgg(self.figure, master=master)
+        self.widget = self.canvas.get_tk_widget()
+        self._room_types = None
+        self._bars = []
+        self._labels = []
+        self._last = None
+
+    def update(self, data):
+        # data: [(room type, bookings), ...]. Returns False when unchanged.
+        data = tuple((room_type, int(count)) for room_type, count in data)
+        if data == self._last:
+            return False
+        self._last = data
+
+        room_types = [row[0] for row in data]
+        counts = [row[1] for row in data]
+        if room_types != self._room_types:
+            self._build(room_types)
+        for bar, label, count in zip(self._bars, self._labels, counts):
+            bar.set_height(count)
+            label.set_text(str(count))
+            label.set_y(count)
+        self.ax.set_ylim(0, max(counts, default=0) * 1.15 or 1)
+        self.canvas.draw_idle()
+        return True
+
+    def _build(self, room_types):
+        ax = self.ax
+        ax.clear()
+        self._room_types = room_types
+        self._bars = list(ax.bar(room_types, [0] * len(room_types)))
+        self._labels = [
+            ax.text(bar.get_x() + bar.get_width() / 2, 0, "", ha="center", va="bottom", fontsize=9)
+            for bar in self._bars
+        ]
+        ax.set_title("Bookings per Room Type")
+        ax.set_ylabel("Number of Bookings")
+        ax.set_xlabel("Room Type")
+        ax.grid(axis="y", linestyle="--", alpha=0.3)
+
+
+# ---------------- TREND CHART ----------------
+# Revenue per day/week/month as bars and occupancy as a line on a second axis,
+# from BookingService.trend(). Same one-Figure approach as above: a refresh
+# with the same period moves the bars and line; a new period (a different
+# number of points) rebuilds them.
+TREND_TITLES = {"day": "Daily", "week": "Weekly", "month": "Monthly"}
+TREND_BAR_WIDTH = {"day": 1.0, "week": 6.0, "month": 25.0}     # in days
+
+
+class TrendChart:
+    def __init__(self, master):
+        self.figure = Figure(figsize=(6.5, 3.2))
+        self.ax = self.figure.add_subplot()
+        self.occupancy_ax = self.ax.twinx()
+        self.canvas = FigureCanvasTkAgg(self.figure, master=master)
+        self.widget = self.canvas.get_tk_widget()
+        self._key = None           # (period, first period start, number of points)
+        self._bars = []
+        self._line = None
+        self._last = None
+
+    def update(self, period, trend):
+        # trend: [(period start, bookings, revenue, occupancy)]. Returns False when unchanged.
+        data = (period, tuple(trend))
+        if data == self._last:
+            return False
+        self._last = data
+
+        starts = [row[0] for row in trend]
+        revenue = [float(row[2]) for row in trend]
+        occupancy = [row[3] * 100 for row in trend]
+        key = (period, starts[0] if starts else None, len(starts))
+        if key != self._key:
+            self._build(period, starts)
+            self._key = key
+        for bar, value in zip(self._bars, revenue):
+            bar.set_height(value)
+        self._line.set_ydata(occupancy)
+        self.ax.set_ylim(0, max(revenue, default=0) * 1.15 or 1)
+        self.canvas.draw_idle()
+        return True
+
+    def _build(self, period, starts):
+        ax, occupancy_ax = self.ax, self.occupancy_ax
+        ax.clear()
+        occupancy_ax.clear()
+        self._bars = list(ax.bar(starts, [0] * len(starts), width=TREND_BAR_WIDTH[period],
+                                 align="edge", color="#e67e22", alpha=0.8, label="Revenue"))
+        self._line, = occupancy_ax.plot(starts, [0] * len(starts), color="#8e44ad", linewidth=1.4,
+                                        label="Occupancy")
+        ax.set_title(f"{TREND_TITLES[period]} Revenue & Occupancy")
+        ax.set_ylabel("Revenue")
+        occupancy_ax.set_ylabel("Occupancy %")
+        occupancy_ax.set_ylim(0, 105)
+        ax.grid(axis="y", linestyle="--", alpha=0.3)
+        self.figure.autofmt_xdate()
@@ -0,0 +1,107 @@
+# ---------------- CONFIG ----------------
+ROOM_INVENTORY = {"Single": 12, "Double": 12, "Suite": 6}   # rooms of each type
+TOTAL_ROOM_INVENTORY = sum(ROOM_INVENTORY.values())
+PRICES = {"Single": 50, "Double": 80, "Suite": 120}
+OCCUPANCY_DAYS = 90                # occupancy window shown on the dashboard
+MAX_STAY_NIGHTS = 365              # longest stay that can be booked or checked
+VAT_RATE = 0.16                    # 16% VAT (change to your region)
+
+
+# ---------------- DATABASE ----------------
+DB_CONFIG = {
+    "host": "localhost",
+    "user": "root",
+    "password": "",
+    "database": "hotel_db",
+}
+DB_POOL_SIZE = 5                   # open connections kept per desk terminal
+DB_POOL_TIMEOUT = 10               # seconds to wait for a free connection
+DB_HEALTHCHECK_IDLE = 30           # ping connections idle longer than this (seconds)
+
+
+# ---------------- STARTUP ----------------
+FAST_START = True                  # show the window first; load matplotlib/ReportLab on first use or in the background
+FAST_START_WARM_MS = 1500          # delay before the background warm-up, so it doesn't compete with the first table
+STARTUP_RETRY_S = 5                # MySQL unreachable at start-up: first retry after this, doubling each time
+STARTUP_RETRY_MAX_S = 60           # longest wait between start-up retries
+
+
+# ---------------- BACKGROUND TASKS ----------------
+TASK_WORKERS = 4                   # worker threads for DB queries & receipt builds
+TASK_POLL_MS = 30                  # how often the Tk loop collects finished tasks
+
+
+# ---------------- BOOKING TABLE ----------------
+PAGE_SIZE = 100                    # rows shown per table page
+PAGE_PREFETCH = 1                  # pages loaded ahead/behind the visible one
+PAGE_CACHE_PAGES = 8               # pages kept in the cached row window
+BOOKING_STORE = True               # hold all bookings in memory: sortable headings & filters (False = page from MySQL)
+
+
+# ---------------- SEARCH ----------------
+SEARCH_ENGINE = "fulltext"         # "fulltext" (MySQL indexes) or "trigram" (local in-memory index)
+SEARCH_LIMIT = 200                 # max results shown for one search
+SEARCH_NGRAM_PARSER = False        # MySQL 5.7+: build the FULLTEXT index with the ngram parser
+
+
+# ---------------- DASHBOARD ----------------
+# The trigger options need the TRIGGER privilege, and with binary logging on
+# also SUPER or log_bin_trust_function_creators=1.
+DASHBOARD_SUMMARY_TABLE = False    # keep per-room-type totals in MySQL via triggers
+REVENUE_ROLLUPS = True             # per-day bookings & revenue in MySQL (booking_rollups), for the trend charts
+ROLLUP_TRIGGERS = False            # keep booking_rollups by triggers (counts manual SQL too) instead of by the app
+TREND_YEARS = 3                    # history shown in the trend charts
+
+
+# ---------------- RECEIPTS ----------------
+RECEIPTS_DIR = "receipts"
+LOGO_PATH = "logo.png"
+RECEIPT_WORKERS = None             # batch receipt processes (None = one per CPU core)
+RECEIPT_CACHE_MAX_FILES = 5000     # cached receipts kept in RECEIPTS_DIR
+RECEIPT_CACHE_MAX_MB = 500
+RECEIPT_CACHE_MAX_AGE_DAYS = 90
+RECEIPT_ARCHIVE = True             # reprints are pulled from the daily archive PDFs when the day has one
+RECEIPT_ARCHIVE_DIR = "receipts/archive"   # one multi-page PDF and JSON page index per day
+
+
+# ---------------- BULK IMPORT ----------------
+IMPORT_CHUNK_SIZE = 5000           # rows per executemany batch / commit
+
+
+# ---------------- BULK EXPORT ----------------
+EXPORT_CHUNK_SIZE = 5000           # rows fetched from the server per chunk
+
+
+# ---------------- REPRICING ----------------
+REPRICE_BATCH_SIZE = 50000         # bookings read (and repriced) per keyset batch / commit
+
+
+# ---------------- INSTRUMENTATION ----------------
+METRICS_ENABLED = True             # time SQL, actions and Tk event-loop lag (⏱ Performance window)
+METRICS_WINDOW_S = 300             # rolling window shown in the Performance window (seconds)
+SLOW_OP_MS = 500                   # SQL statements, tasks and actions slower than this go to the slow log
+SLOW_LAG_MS = 150                  # event-loop stalls longer than this go to the slow log
+LAG_PROBE_MS = 250                 # how often the event-loop lag probe fires
+SLOW_LOG_PATH = "logs/slow_ops.log"
+PROFILE_DIR = "logs/profiles"      # cProfile captures from "Profile next action"
+
+
+# ---------------- WRITE-BEHIND JOURNAL ----------------
+JOURNAL_ENABLED = True             # Book/Update answer from a local journal; a background flusher writes to MySQL
+JOURNAL_PATH = "journal.sqlite3"
+JOURNAL_GROUP_MS = 50              # gather bookings this long before each group commit
+JOURNAL_GROUP_SIZE = 200           # most journaled writes per MySQL transaction
+JOURNAL_RETRY_S = 5                # wait between flush attempts while MySQL is unreachable
+JOURNAL_KEEP_DAYS = 7              # flushed entries kept in the journal for reference
+
+
+# ---------------- MULTI-TERMINAL SYNC ----------------
+# The triggers need the TRIGGER privilege, and with binary logging on also
+# SUPER or log_bin_trust_function_creators=1.
+CHANGE_FEED = True                 # changelog of booking writes (booking_changes); desks poll it for other desks' writes
+CHANGE_FEED_TRIGGERS = False       # record the changelog by triggers (counts manual SQL too) instead of by the app
+CHANGE_POLL_MS = 2000              # how often a desk asks for other desks' changes
+CHANGE_BATCH = 1000                # most changes read per poll
+CHANGE_GAP_S = 30                  # wait this long for a skipped version (a transaction still open) to commit
+CHANGE_KEEP_DAYS = 2               # changelog rows older than this are pruned at start-up
+TERMINAL_ID = None                 # name recorded with this desk's changes (None = host name and process id)
@@ -0,0 +1,374 @@
+import queue
+import threading
+import time
+
+import mysql.connector
+from mysql.connector import errors
+
+from config import (
+    DB_CONFIG, DB_POOL_SIZE, DB_POOL_TIMEOUT, DB_HEALTHCHECK_IDLE, REVENUE_ROLLUPS, ROLLUP_TRIGGERS, CHANGE_FEED,
+    CHANGE_FEED_TRIGGERS,
+)
+
+
+# ---------------- SQL STATEMENTS ----------------
+# Fixed statements are kept as module constants: the prepared cursor cache
+# below is keyed on these exact objects, so each one is prepared only once
+# per pooled connection.
+BOOKING_COLUMNS = "id, name, phone, email, id_number, room_type, nights, total_cost, check_in"
+
+SQL_INSERT_BOOKING = (
+    "INSERT INTO bookings (name, phone, email, id_number, room_type, nights, total_cost, check_in) "
+    "VALUES (%s,%s,%s,%s,%s,%s,%s,%s)"
+)
+# client_ref: a journaled booking's reference, or an imported row's (chunk tag + row number)
+SQL_INSERT_JOURNALED_BOOKING = (
+    "INSERT INTO bookings (name, phone, email, id_number, room_type, nights, total_cost, check_in, client_ref) "
+    "VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s)"
+)
+SQL_BOOKING_ID_BY_CLIENT_REF = "SELECT id FROM bookings WHERE client_ref=%s"
+SQL_UPDATE_BOOKING = (
+    "UPDATE bookings "
+    "SET name=%s, phone=%s, email=%s, id_number=%s, room_type=%s, nights=%s, total_cost=%s, check_in=%s "
+    "WHERE id=%s"
+)
+SQL_DELETE_BOOKING = "DELETE FROM bookings WHERE id=%s"
+SQL_SELECT_BOOKINGS = f"SELECT {BOOKING_COLUMNS} FROM bookings"
+SQL_SELECT_BOOKING = f"SELECT {BOOKING_COLUMNS} FROM bookings WHERE id=%s"
+SQL_SEARCH_BOOKINGS = f"SELECT {BOOKING_COLUMNS} FROM bookings WHERE name LIKE %s OR id_number LIKE %s"
+SQL_SEARCH_ID_PREFIX = f"SELECT {BOOKING_COLUMNS} FROM bookings WHERE id_number LIKE %s ORDER BY id DESC LIMIT %s"
+SQL_SEARCH_NAME_PREFIX = f"SELECT {BOOKING_COLUMNS} FROM bookings WHERE name LIKE %s ORDER BY id DESC LIMIT %s"
+SQL_SEARCH_NAME_FULLTEXT = (
+    f"SELECT {BOOKING_COLUMNS} FROM bookings "
+    "WHERE MATCH(name) AGAINST (%s IN BOOLEAN MODE) "
+    "ORDER BY MATCH(name) AGAINST (%s IN BOOLEAN MODE) DESC, id DESC LIMIT %s"
+)
+SQL_SEARCH_KEYS = "SELECT id, name, id_number FROM bookings"
+SQL_PAGE_FIRST = f"SELECT {BOOKING_COLUMNS} FROM bookings ORDER BY id LIMIT %s"
+SQL_PAGE_LAST = f"SELECT {BOOKING_COLUMNS} FROM bookings ORDER BY id DESC LIMIT %s"
+SQL_PAGE_AFTER = f"SELECT {BOOKING_COLUMNS} FROM bookings WHERE id > %s ORDER BY id LIMIT %s"
+SQL_PAGE_BEFORE = f"SELECT {BOOKING_COLUMNS} FROM bookings WHERE id < %s ORDER BY id DESC LIMIT %s"
+# The booking's dashboard/rollup values, locked for the write that changes them
+SQL_BOOKING_TOTAL_FOR_UPDATE = (
+    "SELECT room_type, total_cost, DATE(created_at), check_in FROM bookings WHERE id=%s FOR UPDATE"
+)
+SQL_AVAILABILITY_STAYS = "SELECT id, room_type, check_in, nights FROM bookings WHERE check_in IS NOT NULL"
+# Stays of one room type overlapping [check_in, check_out), locked so two desks
+# can't both take the last room; served by idx_bookings_stay
+SQL_OVERLAPPING_STAYS_FOR_UPDATE = (
+    "SELECT id, check_in, nights FROM bookings "
+    "WHERE room_type = %s AND check_out > %s AND check_in < %s FOR UPDATE"
+)
+# Repricing (reprice.py): keyset batches of just the priced columns, and one
+# set-based UPDATE per (room type, nights) within a batch's id range
+SQL_REPRICE_BATCH = "SELECT id, room_type, nights, total_cost FROM bookings WHERE id > %s ORDER BY id LIMIT %s"
+SQL_REPRICE_BATCH_ROOM = (
+    "SELECT id, room_type, nights, total_cost FROM bookings "
+    "WHERE room_type = %s AND id > %s ORDER BY id LIMIT %s"
+)
+SQL_REPRICE_UPDATE = (
+    "UPDATE bookings SET total_cost = %s "
+    "WHERE room_type = %s AND nights = %s AND id BETWEEN %s AND %s AND total_cost <> %s"
+)
+SQL_DASHBOARD_BY_ROOM_TYPE = "SELECT room_type, COUNT(*), COALESCE(SUM(total_cost), 0) FROM bookings GROUP BY room_type"
+SQL_DASHBOARD_SUMMARY = "SELECT room_type, bookings, revenue FROM booking_summary"
+SQL_BOOKING_ROLLUPS = "SELECT day, bookings, revenue FROM booking_rollups WHERE bookings <> 0"
+# Rollup deltas written by the app (no ROLLUP_TRIGGERS): a NULL day is a new
+# booking, dated by the server like its created_at
+SQL_ROLLUP_ADD = (
+    "INSERT INTO booking_rollups (day, bookings, revenue) VALUES (COALESCE(%s, CURDATE()), %s, %s) "
+    "ON DUPLICATE KEY UPDATE bookings = bookings + VALUES(bookings), revenue = revenue + VALUES(revenue)"
+)
+# The revenue change of one SQL_REPRICE_UPDATE, per booking day, run just before it
+SQL_ROLLUP_REPRICE = (
+    "INSERT INTO booking_rollups (day, bookings, revenue) "
+    "SELECT COALESCE(DATE(created_at), check_in) AS booked, 0, SUM(%s - total_cost) FROM bookings "
+    "WHERE room_type = %s AND nights = %s AND id BETWEEN %s AND %s AND total_cost <> %s "
+    "AND COALESCE(DATE(created_at), check_in) IS NOT NULL GROUP BY booked "
+    "ON DUPLICATE KEY UPDATE revenue = revenue + VALUES(revenue)"
+)
+# Daily receipt archive (receipt_archive.py): the bookings made on one day
+SQL_BOOKINGS_CREATED_BETWEEN = (
+    f"SELECT {BOOKING_COLUMNS} FROM bookings WHERE created_at >= %s AND created_at < %s ORDER BY id"
+)
+SQL_BOOKING_CREATED_DAY = "SELECT DATE(created_at) FROM bookings WHERE id=%s"
+# Change feed (changefeed.py): the booking_changes rows of every write,
+# each joined to the booking as it is now (all NULL once it is deleted)
+SQL_SET_TERMINAL = "SET @lapsa_terminal = %s"
+SQL_CHANGES_HIGH_WATER = "SELECT COALESCE(MAX(version), 0) FROM booking_changes"
+SQL_CHANGES_VERSIONS = "SELECT version FROM booking_changes WHERE version > %s"
+SQL_CHANGES_SELECT = (
+    "SELECT c.version, c.booking_id, c.op, c.terminal, c.room_type, c.total_cost, "
+    "c.old_room_type, c.old_total_cost, "
+    + ", ".join("b." + column for column in BOOKING_COLUMNS.split(", "))
+    + " FROM booking_changes c LEFT JOIN bookings b ON b.id = c.booking_id "
+)
+SQL_CHANGES_SINCE = SQL_CHANGES_SELECT + "WHERE c.version > %s ORDER BY c.version LIMIT %s"
+SQL_CHANGES_MISSING = SQL_CHANGES_SELECT + "WHERE c.version IN ({}) ORDER BY c.version"   # one %s per version
+SQL_CHANGES_PRUNE = "DELETE FROM booking_changes WHERE changed_at < NOW() - INTERVAL %s DAY"
+# Changelog rows written by the app (no CHANGE_FEED_TRIGGERS), tagged with the
+# writer like the triggers' rows
+SQL_CHANGE_ADD = (
+    "INSERT INTO booking_changes (booking_id, op, terminal, room_type, total_cost, old_room_type, old_total_cost) "
+    "VALUES (%s, %s, @lapsa_terminal, %s, %s, %s, %s)"
+)
+# The changes of one imported chunk, found by its client_ref tag (ids of a
+# multi-row INSERT need not be consecutive)
+SQL_CHANGES_IMPORTED = (
+    "INSERT INTO booking_changes (booking_id, op, terminal, room_type, total_cost) "
+    "SELECT id, 'I', @lapsa_terminal, room_type, total_cost FROM bookings WHERE client_ref LIKE %s"
+)
+# The changes of one SQL_REPRICE_UPDATE, run just before it
+SQL_CHANGES_REPRICE = (
+    "INSERT INTO booking_changes (booking_id, op, terminal, room_type, total_cost, old_room_type, old_total_cost) "
+    "SELECT id, 'U', @lapsa_terminal, room_type, %s, room_type, total_cost FROM bookings "
+    "WHERE room_type = %s AND nights = %s AND id BETWEEN %s AND %s AND total_cost <> %s"
+)
+
+
+# ---------------- DERIVED ROWS ----------------
+# booking_rollups and booking_changes are kept by the app's own writes unless
+# triggers keep them (ROLLUP_TRIGGERS, CHANGE_FEED_TRIGGERS) or they are off.
+APP_WRITES_ROLLUPS = REVENUE_ROLLUPS and not ROLLUP_TRIGGERS
+APP_WRITES_CHANGES = CHANGE_FEED and not CHANGE_FEED_TRIGGERS
+
+
+def record_write(conn, rollups=(), changes=()):
+    # The rollup and changelog rows of a booking write, in its own transaction:
+    # (sql, params) pairs, each group skipped unless the app keeps that table
+    if APP_WRITES_ROLLUPS:
+        for sql, params in rollups:
+            conn.execute(sql, params)
+    if APP_WRITES_CHANGES:
+        for sql, params in changes:
+            conn.execute(sql, params)
+
+
+# ---------------- QUERY TIMING ----------------
+# With pool.metrics set, every cursor handed out is wrapped so each statement
+# is recorded once (SQL text, rows, time spent in the driver) from execute
+# until its rows have been read, or the connection goes back to the pool.
+class TimedCursor:
+    def __init__(self, cursor, metrics):
+        self.cursor = cursor
+        self.metrics = metrics
+        self._sql = None
+        self._ms = 0.0
+        self._rows = None
+
+    def execute(self, sql, params=()):
+        self.finish()
+        start = time.perf_counter()
+        self._sql = sql
+        try:
+            self.cursor.execute(sql, params)
+        finally:
+            self._ms = (time.perf_counter() - start) * 1000
+
+    def executemany(self, sql, rows):
+        self.finish()
+        start = time.perf_counter()
+        self._sql = sql
+        try:
+            self.cursor.executemany(sql, rows)
+        finally:
+            self._ms = (time.perf_counter() - start) * 1000
+            self.finish()
+
+    def fetchone(self):
+        row = self._fetch(self.cursor.fetchone)
+        if row is None:
+            self.finish()
+        else:
+            self._rows = (self._rows or 0) + 1
+        return row
+
+    def fetchmany(self, size=1):
+        rows = self._fetch(self.cursor.fetchmany, size)
+        self._rows = (self._rows or 0) + len(rows)
+        if not rows:
+            self.finish()
+        return rows
+
+    def fetchall(self):
+        rows = self._fetch(self.cursor.fetchall)
+        self._rows = (self._rows or 0) + len(rows)
+        self.finish()
+        return rows
+
+    def finish(self):
+        if self._sql is None:
+            return
+        rows = self._rows
+        if rows is None:           # not a SELECT, or never read: affected rows
+            rows = self.cursor.rowcount if self.cursor.rowcount >= 0 else None
+        self.metrics.record("sql", self._sql, self._ms, rows)
+        self._sql, self._ms, self._rows = None, 0.0, None
+
+    def close(self):
+        self.finish()
+        self.cursor.close()
+
+    def _fetch(self, fn, *args):
+        start = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            self._ms += (time.perf_counter() - start) * 1000
+
+    def __getattr__(self, name):
+        # lastrowid, rowcount, ...
+        return getattr(self.cursor, name)
+
+
+# ---------------- CONNECTION POOL ----------------
+class PooledConnection:
+    def __init__(self, pool, raw):
+        self._pool = pool
+        self.raw = raw
+        self.last_used = time.monotonic()
+        self._statements = {}
+        self._timed = []           # plain TimedCursors still open (metrics only)
+
+    def statement(self, sql):
+        # One prepared cursor per statement, reused for the life of the connection
+        cursor = self._statements.get(sql)
+        if cursor is None:
+            cursor = self.raw.cursor(prepared=True)
+            if self._pool.metrics is not None:
+                cursor = TimedCursor(cursor, self._pool.metrics)
+            self._statements[sql] = cursor
+        return cursor
+
+    def execute(self, sql, params=()):
+        cursor = self.statement(sql)
+        cursor.execute(sql, params)
+        return cursor
+
+    def cursor(self, *args, **kwargs):
+        cursor = self.raw.cursor(*args, **kwargs)
+        if self._pool.metrics is not None:
+            cursor = TimedCursor(cursor, self._pool.metrics)
+            self._timed.append(cursor)
+        return cursor
+
+    def finish_statements(self):
+        # Record statements whose rows were never read to the end
+        if self._pool.metrics is None:
+            return
+        for cursor in (*self._statements.values(), *self._timed):
+            if isinstance(cursor, TimedCursor):
+                cursor.finish()
+        self._timed.clear()
+
+    def commit(self):
+        self.raw.commit()
+
+    def rollback(self):
+        self.raw.rollback()
+
+    def close(self):
+        # Hand the connection back to the pool instead of closing the socket
+        self._pool.release(self)
+
+    def discard(self):
+        self._statements.clear()
+        try:
+            self.raw.close()
+        except Exception:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        broken = isinstance(exc, (errors.OperationalError, errors.InterfaceError))
+        if exc_type is not None and not broken:
+            try:
+                self.raw.rollback()
+            except errors.Error:
+                broken = True
+        self._pool.release(self, discard=broken)
+        return False
+
+
+class ConnectionPool:
+    def __init__(self, size=DB_POOL_SIZE, connect=None,
+                 timeout=DB_POOL_TIMEOUT, healthcheck_idle=DB_HEALTHCHECK_IDLE, metrics=None):
+        self.size = size
+        self.timeout = timeout
+        self.healthcheck_idle = healthcheck_idle
+        self.metrics = metrics             # metrics.Metrics: time every statement (set before first use)
+        self.on_connect = None             # on_connect(conn) for each new connection, e.g. session variables
+        self._connect = connect or (lambda: mysql.connector.connect(**DB_CONFIG))
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    def acquire(self):
+        if not self._slots.acquire(timeout=self.timeout):
+            raise errors.PoolError("No free database connection (pool exhausted)")
+        try:
+            while True:
+                try:
+                    conn = self._idle.get_nowait()
+                except queue.Empty:
+                    return self._open()
+                if self._is_healthy(conn):
+                    return conn
+                conn.discard()
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def release(self, conn, discard=False):
+        try:
+            conn.finish_statements()
+            if not discard and conn.raw.in_transaction:
+                # End the read snapshot left open by a plain SELECT (autocommit is
+                # off), otherwise the next borrower would see stale rows.
+                try:
+                    conn.raw.rollback()
+                except errors.Error:
+                    discard = True
+            if discard:
+                conn.discard()
+            else:
+                conn.last_used = time.monotonic()
+                self._idle.put(conn)
+        finally:
+            self._slots.release()
+
+    def connection(self):
+        # Usage: with pool.connection() as conn: ...
+        return self.acquire()
+
+    def close_all(self):
+        while True:
+            try:
+                self._idle.get_nowait().discard()
+            except queue.Empty:
+                break
+
+    def _open(self):
+        conn = PooledConnection(self, self._connect())
+        if self.on_connect is not None:
+            try:
+                self.on_connect(conn)
+            except BaseException:
+                conn.discard()
+                raise
+        return conn
+
+    def _is_healthy(self, conn):
+        # Only ping connections that sat idle long enough to have been dropped
+        # by the server (wait_timeout) or a flaky network.
+        if time.monotonic() - conn.last_used < self.healthcheck_idle:
+            return True
+        try:
+            conn.raw.ping(reconnect=False)
+            return True
+        except errors.Error:
+            return False
+
+
+pool = ConnectionPool()
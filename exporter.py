@@ -0,0 +1,193 @@
+import argparse
+import contextlib
+import csv
+import importlib.util
+import json
+import os
+import time
+
+from mysql.connector import errors
+
+from config import EXPORT_CHUNK_SIZE
+from db import BOOKING_COLUMNS, pool
+
+
+# ---------------- BULK EXPORT ----------------
+# Streams bookings for accounting straight from an unbuffered cursor: rows are
+# pulled from the server EXPORT_CHUNK_SIZE at a time with fetchmany and
+# written out before the next chunk is read, so memory stays bounded by the
+# chunk size however large the table is. CSV and JSONL need nothing extra;
+# Parquet and Arrow IPC (.arrow/.feather) need pyarrow, which is only
+# imported when one of those is written (it is slow to import).
+HEADER = [column.strip() for column in BOOKING_COLUMNS.split(",")]
+FORMATS = {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl", ".parquet": "parquet",
+           ".arrow": "arrow", ".feather": "arrow"}
+
+
+def export_query(room_type=None, min_id=None, max_id=None):
+    clauses, params = [], []
+    if room_type:
+        clauses.append("room_type = %s")
+        params.append(room_type)
+    if min_id is not None:
+        clauses.append("id >= %s")
+        params.append(min_id)
+    if max_id is not None:
+        clauses.append("id <= %s")
+        params.append(max_id)
+    where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+    return f"SELECT {BOOKING_COLUMNS} FROM bookings{where} ORDER BY id", tuple(params)
+
+
+def iter_chunks(conn, sql, params, chunk_size):
+    # Unbuffered: the result set stays on the server and is read as we go.
+    # The cursor must be drained before the connection is used again.
+    cursor = conn.cursor(buffered=False)
+    try:
+        cursor.execute(sql, params)
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield rows
+    except BaseException:
+        # Stopped early (the consumer is done or a writer raised): read out the
+        # rest, or the connection's next statement fails with "Unread result
+        # found". A failure here (the connection is gone) must not hide the
+        # original error.
+        try:
+            while cursor.fetchmany(chunk_size):
+                pass
+            cursor.close()
+        except errors.Error:
+            pass
+        raise
+    cursor.close()
+
+
+def has_pyarrow():
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+def format_for(path):
+    fmt = FORMATS.get(os.path.splitext(path)[1].lower())
+    if fmt is None:
+        raise ValueError(f"Unsupported export format: {path} (use {', '.join(sorted(FORMATS))})")
+    if fmt in ("parquet", "arrow") and not has_pyarrow():
+        raise ValueError(f"Exporting {fmt} files requires pyarrow (pip install pyarrow)")
+    return fmt
+
+
+# ---- writers: write(rows) once per chunk, then close() ----
+class CsvWriter:
+    def __init__(self, path):
+        self.file = open(path, "w", newline="", encoding="utf-8")
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(HEADER)
+
+    def write(self, rows):
+        self.writer.writerows(rows)
+
+    def close(self):
+        self.file.close()
+
+
+class JsonlWriter:
+    def __init__(self, path):
+        self.file = open(path, "w", encoding="utf-8")
+
+    def write(self, rows):
+        self.file.write("".join(
+            json.dumps(dict(zip(HEADER, row)), default=str) + "\n" for row in rows
+        ))
+
+    def close(self):
+        self.file.close()
+
+
+def arrow_schema(pa):
+    return pa.schema([
+        ("id", pa.int64()), ("name", pa.string()), ("phone", pa.string()), ("email", pa.string()),
+        ("id_number", pa.string()), ("room_type", pa.string()), ("nights", pa.int32()),
+        ("total_cost", pa.decimal128(12, 2)), ("check_in", pa.date32()),
+    ])
+
+
+class ArrowWriter:
+    # One record batch / row group per chunk
+    def __init__(self, path, fmt):
+        import pyarrow as pa
+        import pyarrow.ipc
+        import pyarrow.parquet
+
+        self.pa = pa
+        self.schema = arrow_schema(pa)
+        if fmt == "parquet":
+            self.sink = pyarrow.parquet.ParquetWriter(path, self.schema)
+        else:
+            self.sink = pyarrow.ipc.new_file(path, self.schema)
+
+    def write(self, rows):
+        pa = self.pa
+        columns = [list(column) for column in zip(*rows)]
+        self.sink.write_batch(pa.RecordBatch.from_arrays(
+            [pa.array(values, type=field.type) for values, field in zip(columns, self.schema)],
+            schema=self.schema
+        ))
+
+    def close(self):
+        self.sink.close()
+
+
+def open_writer(path, fmt):
+    if fmt == "csv":
+        return CsvWriter(path)
+    if fmt == "jsonl":
+        return JsonlWriter(path)
+    return ArrowWriter(path, fmt)
+
+
+def export_bookings(path, connect=pool.connection, room_type=None, min_id=None, max_id=None,
+                    chunk_size=EXPORT_CHUNK_SIZE, progress=None):
+    # Returns (rows written, seconds). progress(rows) is called after each chunk.
+    fmt = format_for(path)
+    sql, params = export_query(room_type, min_id, max_id)
+    start = time.perf_counter()
+    written = 0
+    writer = open_writer(path, fmt)
+    try:
+        with connect() as conn, contextlib.closing(iter_chunks(conn, sql, params, chunk_size)) as chunks:
+            # closing(): the cursor is drained before the connection goes back
+            for rows in chunks:
+                writer.write(rows)
+                written += len(rows)
+                if progress:
+                    progress(written)
+    finally:
+        writer.close()
+    return written, time.perf_counter() - start
+
+
+def main():
+    #   python exporter.py bookings.csv
+    #   python exporter.py suites.parquet --room-type Suite
+    #   python exporter.py q3.jsonl --min-id 120000 --max-id 180000
+    parser = argparse.ArgumentParser(description="Export bookings to CSV, JSONL, Parquet or Arrow IPC")
+    parser.add_argument("path", help="output file; the format follows the extension")
+    parser.add_argument("--room-type")
+    parser.add_argument("--min-id", type=int)
+    parser.add_argument("--max-id", type=int)
+    parser.add_argument("--chunk-size", type=int, default=EXPORT_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    written, elapsed = export_bookings(
+        args.path, room_type=args.room_type, min_id=args.min_id, max_id=args.max_id,
+        chunk_size=args.chunk_size,
+        progress=lambda rows: print(f"\r{rows:,} rows", end="", flush=True)
+    )
+    rate = written / elapsed if elapsed > 0 else 0
+    print(f"\n{written:,} bookings written to {args.path} in {elapsed:.1f}s ({rate:,.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
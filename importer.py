@@ -0,0 +1,251 @@
+import argparse
+import contextlib
+import csv
+import json
+import os
+import time
+import uuid
+from collections import Counter
+
+from mysql.connector import errors
+
+from config import IMPORT_CHUNK_SIZE, ROOM_INVENTORY
+from billing import validate_booking
+from db import (
+    SQL_INSERT_JOURNALED_BOOKING, SQL_OVERLAPPING_STAYS_FOR_UPDATE, SQL_ROLLUP_ADD, SQL_CHANGES_IMPORTED, pool, record_write,
+)
+from availability import busiest_night, overbooked, stay_end, to_date
+
+
+# ---------------- BULK IMPORT ----------------
+# Streams bookings from CSV or JSONL (OTA exports, the old PMS), validates and
+# prices every row exactly like the booking form, and inserts them in
+# executemany batches with one commit per chunk. Only one chunk is ever held
+# in memory, so file size doesn't matter. Rejected rows go to
+# <file>.errors.csv with their line number and reason.
+#
+# Each row also gets the booking form's overbooking check, counting the
+# earlier rows of the file too, so it can't book more rooms than the hotel
+# has. Per chunk and room type the overlapping stays are read once FOR UPDATE
+# (check_chunk) and the rows are checked in memory, so the locks are held
+# only from that read to the chunk's commit.
+FIELDS = ("name", "phone", "email", "id_number", "room_type", "nights", "check_in")
+
+# Accepted header spellings -> canonical field
+ALIASES = {
+    "full name": "name", "full_name": "name", "guest": "name", "guest_name": "name",
+    "phone number": "phone", "tel": "phone",
+    "e-mail": "email",
+    "id/passport no": "id_number", "id no": "id_number", "passport": "id_number",
+    "room type": "room_type", "room": "room_type",
+    "night": "nights",
+    "check in": "check_in", "check-in": "check_in", "checkin": "check_in", "arrival": "check_in",
+    "arrival_date": "check_in",
+}
+
+
+def canonical(record):
+    row = {}
+    for key, value in record.items():
+        if key is None:
+            continue
+        key = key.strip().lower()
+        row[ALIASES.get(key, key)] = value
+    return row
+
+
+def read_records(path):
+    # Yields (line number, dict) lazily from a .csv or .jsonl/.ndjson file
+    ext = os.path.splitext(path)[1].lower()
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        if ext in (".jsonl", ".ndjson", ".json"):
+            for line_no, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError as err:
+                    yield line_no, {"_error": f"Invalid JSON: {err}", "_raw": line.strip()}
+                    continue
+                if not isinstance(record, dict):
+                    yield line_no, {"_error": "Expected a JSON object", "_raw": line.strip()}
+                    continue
+                yield line_no, canonical(record)
+        else:
+            reader = csv.DictReader(f)
+            for record in reader:
+                yield reader.line_num, canonical(record)
+
+
+class ImportReport:
+    def __init__(self, dry_run=False):
+        self.dry_run = dry_run
+        self.read = 0
+        self.imported = 0
+        self.valid = 0             # rows that passed validation (what a dry run would import)
+        self.rejected = 0
+        self.checked_availability = True
+        self.elapsed = 0.0
+        self.errors_path = None
+
+    @property
+    def rows_per_second(self):
+        return self.read / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def outcome(self):
+        return f"{self.valid:,} would be imported" if self.dry_run else f"{self.imported:,} imported"
+
+    def summary(self):
+        text = (f"{self.outcome}, {self.rejected:,} rejected of {self.read:,} rows "
+                f"in {self.elapsed:.1f}s ({self.rows_per_second:,.0f} rows/s)")
+        if not self.checked_availability:
+            text += "\nDatabase unreachable: rows were validated but not checked for overbooking"
+        if self.errors_path:
+            text += f"\nRejected rows: {self.errors_path}"
+        return text
+
+
+def open_connection(connect, dry_run):
+    # A dry run also works offline, without the availability pass
+    try:
+        return connect()
+    except errors.Error:
+        if not dry_run:
+            raise
+        return None
+
+
+def hold_stay(held, room_type, check_in, nights):
+    # held: room type -> {night ordinal: rooms taken}
+    rooms = held.setdefault(room_type, Counter())
+    first = to_date(check_in).toordinal()
+    for night in range(first, first + nights):
+        rooms[night] += 1
+
+
+def check_chunk(conn, rows, held):
+    # rows: [(line number, record, data)] -> (rows that fit, [(line number,
+    # record, OverbookedError)]). held: nights taken by earlier rows the
+    # database can't see yet (a dry run's earlier chunks); the rows that fit
+    # are added to it.
+    ranges = {}                    # room type -> (first night, check-out) of the chunk's rows
+    for line_no, record, data in rows:
+        room_type, nights, check_in = data[4], data[5], data[7]
+        first, end = ranges.get(room_type, (check_in, check_in))
+        ranges[room_type] = (min(first, check_in), max(end, stay_end(check_in, nights)))
+    taken = {room_type: Counter(held.get(room_type, ())) for room_type in ranges}
+    for room_type, (first, end) in ranges.items():
+        stays = conn.execute(SQL_OVERLAPPING_STAYS_FOR_UPDATE, (room_type, first, end)).fetchall()
+        for booking_id, stay_in, stay_nights in stays:
+            hold_stay(taken, room_type, stay_in, int(stay_nights))
+    fits, overbooked_rows = [], []
+    for line_no, record, data in rows:
+        room_type, nights, check_in = data[4], data[5], data[7]
+        night, rooms = busiest_night((), check_in, nights, held=taken[room_type])
+        if rooms >= ROOM_INVENTORY.get(room_type, 0):
+            overbooked_rows.append((line_no, record, overbooked(room_type, night)))
+            continue
+        hold_stay(taken, room_type, check_in, nights)
+        hold_stay(held, room_type, check_in, nights)
+        fits.append((line_no, record, data))
+    return fits, overbooked_rows
+
+
+def import_bookings(path, connect=pool.connection, chunk_size=IMPORT_CHUNK_SIZE,
+                    progress=None, dry_run=False):
+    # progress(report) is called after every committed chunk
+    report = ImportReport(dry_run)
+    start = time.perf_counter()
+    errors_file = None
+    errors_writer = None
+    rows = []                      # (line number, record, data) of the chunk
+    held = {}                      # dry run: room type -> {night: rooms} of the rows that fit so far
+
+    def reject(line_no, record, err):
+        nonlocal errors_file, errors_writer
+        report.rejected += 1
+        if errors_writer is None:
+            report.errors_path = path + ".errors.csv"
+            errors_file = open(report.errors_path, "w", newline="", encoding="utf-8")
+            errors_writer = csv.writer(errors_file)
+            errors_writer.writerow(["line", "error", *FIELDS])
+        errors_writer.writerow([line_no, str(err),
+                                *(record.get(field, record.get("_raw", "")) for field in FIELDS)])
+
+    def flush(conn):
+        fits = rows
+        if conn is not None and rows:
+            # Same overbooking check as the booking form
+            fits, overbooked_rows = check_chunk(conn, rows, held if dry_run else {})
+            for line_no, record, err in overbooked_rows:
+                reject(line_no, record, err)
+        chunk = [data for line_no, record, data in fits]
+        if conn is not None and dry_run:
+            conn.rollback()        # release the availability locks
+        elif chunk and not dry_run:
+            # A plain cursor lets mysql.connector fold the batch into one
+            # multi-row INSERT instead of one round trip per row.
+            # Each row carries the chunk's tag in client_ref, so the chunk's
+            # rows can be found again without relying on their ids.
+            tag = uuid.uuid4().hex[:24]
+            cursor = conn.cursor()
+            cursor.executemany(SQL_INSERT_JOURNALED_BOOKING,
+                               [(*data, f"{tag}{i:08x}") for i, data in enumerate(chunk)])
+            cursor.close()
+            # The whole chunk is booked today (created_at)
+            record_write(conn, [(SQL_ROLLUP_ADD, (None, len(chunk), sum(data[6] for data in chunk)))],
+                         [(SQL_CHANGES_IMPORTED, (tag + "%",))])
+            conn.commit()
+            report.imported += len(chunk)
+        elif not dry_run:
+            conn.rollback()        # every row overbooked: release the locks
+        report.valid += len(chunk)
+        rows.clear()
+        report.elapsed = time.perf_counter() - start
+        if progress:
+            progress(report)
+
+    try:
+        with open_connection(connect, dry_run) or contextlib.nullcontext() as conn:
+            report.checked_availability = conn is not None
+            for line_no, record in read_records(path):
+                report.read += 1
+                try:
+                    if "_error" in record:
+                        raise ValueError(record["_error"])
+                    data = validate_booking(*(record.get(field) for field in FIELDS))
+                except ValueError as err:
+                    reject(line_no, record, err)
+                    continue
+                rows.append((line_no, record, data))
+                if len(rows) >= chunk_size:
+                    flush(conn)
+            flush(conn)
+    finally:
+        if errors_file:
+            errors_file.close()
+    report.elapsed = time.perf_counter() - start
+    return report
+
+
+def main():
+    #   python importer.py bookings.csv
+    #   python importer.py ota_export.jsonl --chunk-size 10000
+    #   python importer.py old_pms.csv --dry-run      (validate only)
+    parser = argparse.ArgumentParser(description="Bulk import bookings from CSV or JSONL")
+    parser.add_argument("path")
+    parser.add_argument("--chunk-size", type=int, default=IMPORT_CHUNK_SIZE)
+    parser.add_argument("--dry-run", action="store_true", help="validate and price rows without inserting")
+    args = parser.parse_args()
+
+    def progress(report):
+        print(f"\r{report.read:,} rows read, {report.outcome}, "
+              f"{report.rejected:,} rejected ({report.rows_per_second:,.0f} rows/s)", end="", flush=True)
+
+    report = import_bookings(args.path, chunk_size=args.chunk_size, progress=progress, dry_run=args.dry_run)
+    print("\n" + report.summary())
+
+
+if __name__ == "__main__":
+    main()
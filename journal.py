@@ -0,0 +1,210 @@
+import datetime
+import json
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from collections import namedtuple
+
+from mysql.connector import errors
+
+from config import (
+    JOURNAL_PATH, JOURNAL_GROUP_MS, JOURNAL_GROUP_SIZE, JOURNAL_RETRY_S, JOURNAL_KEEP_DAYS,
+)
+
+
+# ---------------- WRITE-BEHIND JOURNAL ----------------
+# Book and Update are acknowledged as soon as the booking is safely in a local
+# SQLite journal (synchronous=FULL, so it survives a crash or power cut); the
+# desk doesn't wait for MySQL. A flusher thread replays journaled writes to
+# MySQL in groups, one transaction per group, and keeps retrying while the
+# server is unreachable, so the desk can work through short outages.
+#
+# The price is that the authoritative overbooking check happens at flush time:
+# a journaled booking can still be rejected if another desk took the last room
+# first. Rejected entries stay in the journal with the reason.
+#
+# Each insert carries a client_ref (stored in bookings.client_ref, unique), so
+# a replay after a crash between the MySQL commit and the journal update finds
+# the booking instead of inserting it twice.
+Entry = namedtuple("Entry", "seq client_ref op booking_id data created")
+
+JOURNAL_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS journal ("
+    "seq INTEGER PRIMARY KEY AUTOINCREMENT, "
+    "client_ref TEXT NOT NULL UNIQUE, "
+    "op TEXT NOT NULL, "                   # insert | update
+    "booking_id INTEGER, "                 # updates; inserts once flushed
+    "data TEXT NOT NULL, "                 # validate_booking row as JSON
+    "status TEXT NOT NULL DEFAULT 'pending', "   # pending | done | rejected
+    "error TEXT, "
+    "created REAL NOT NULL, "
+    "flushed REAL)"
+)
+# Errors that mean "MySQL is unreachable right now": keep the writes, retry later
+TRANSIENT_ERRORS = (errors.OperationalError, errors.InterfaceError, errors.PoolError)
+
+log = logging.getLogger("lapsa.journal")
+
+
+def pending_key(entry):
+    # Stands in for the booking id of a journaled insert (table row, availability)
+    return f"pending-{entry.client_ref}"
+
+
+def encode(data):
+    return json.dumps([value.isoformat() if isinstance(value, datetime.date) else value for value in data])
+
+
+def decode(text):
+    data = json.loads(text)
+    data[7] = datetime.date.fromisoformat(data[7])
+    return tuple(data)
+
+
+class BookingJournal:
+    def __init__(self, path=JOURNAL_PATH):
+        self.path = path
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=FULL")
+        self._db.execute(JOURNAL_SCHEMA)
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_journal_status ON journal (status, seq)")
+        self._lock = threading.Lock()
+
+    def append(self, op, data, booking_id=None):
+        # Durable once this returns
+        entry = Entry(None, uuid.uuid4().hex, op, booking_id, data, time.time())
+        with self._lock:
+            seq = self._db.execute(
+                "INSERT INTO journal (client_ref, op, booking_id, data, created) VALUES (?,?,?,?,?)",
+                (entry.client_ref, op, booking_id, encode(data), entry.created)
+            ).lastrowid
+        return entry._replace(seq=seq)
+
+    def pending(self, limit=-1):
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT seq, client_ref, op, booking_id, data, created FROM journal "
+                "WHERE status = 'pending' ORDER BY seq LIMIT ?", (limit,)
+            ).fetchall()
+        return [Entry(seq, ref, op, booking_id, decode(data), created)
+                for seq, ref, op, booking_id, data, created in rows]
+
+    def count_pending(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM journal WHERE status = 'pending'").fetchone()[0]
+
+    def mark(self, results):
+        # results: [(entry, stored row or exception)] from one flush, in one journal transaction
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN")
+            for entry, result in results:
+                if isinstance(result, Exception):
+                    self._db.execute("UPDATE journal SET status = 'rejected', error = ?, flushed = ? WHERE seq = ?",
+                                     (str(result), now, entry.seq))
+                else:
+                    self._db.execute("UPDATE journal SET status = 'done', booking_id = ?, flushed = ? WHERE seq = ?",
+                                     (result[0], now, entry.seq))
+            self._db.execute("COMMIT")
+
+    def prune(self, keep_days=JOURNAL_KEEP_DAYS):
+        with self._lock:
+            self._db.execute("DELETE FROM journal WHERE status = 'done' AND flushed < ?",
+                             (time.time() - keep_days * 86400,))
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+# ---------------- FLUSHER ----------------
+class JournalFlusher:
+    # on_flushed([(entry, row or exception)]) and on_status(pending, error or
+    # None) are called from the flusher thread.
+    def __init__(self, journal, service, on_flushed=None, on_status=None, group_ms=JOURNAL_GROUP_MS,
+                 group_size=JOURNAL_GROUP_SIZE, retry_s=JOURNAL_RETRY_S):
+        self.journal = journal
+        self.service = service
+        self.on_flushed = on_flushed
+        self.on_status = on_status
+        self.group_ms = group_ms
+        self.group_size = group_size
+        self.retry_s = retry_s
+        self.last_error = None
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self.journal.prune()
+        self._thread = threading.Thread(target=self._run, name="lapsa-journal", daemon=True)
+        self._thread.start()
+
+    def wake(self):
+        # A new entry was journaled
+        self._wake.set()
+
+    def stop(self, timeout=5):
+        # Lets the group in flight finish; anything left is flushed next start.
+        # Returns False if the thread is still busy after timeout.
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            return not self._thread.is_alive()
+        return True
+
+    def _run(self):
+        while not self._stop.is_set():
+            # Short pause so a rush of bookings shares one commit
+            time.sleep(self.group_ms / 1000)
+            try:
+                while not self._stop.is_set() and self.flush():
+                    pass
+                error = None
+            except TRANSIENT_ERRORS as err:
+                error = err
+            except Exception as err:
+                # Anything else (a locked journal, a bug in a callback) must not
+                # end the thread: the writes stay journaled, try again later
+                log.exception("Journal flush failed")
+                error = err
+            self.last_error = error
+            if self.on_status:
+                try:
+                    self.on_status(self.journal.count_pending(), error)
+                except Exception:
+                    log.exception("Journal status update failed")
+            self._wake.wait(self.retry_s if error else 1.0)
+            self._wake.clear()
+
+    def flush(self):
+        # One group; returns whether there may be more
+        entries = self.journal.pending(self.group_size)
+        if not entries:
+            return False
+        try:
+            results = self.write(entries)
+        except TRANSIENT_ERRORS:
+            raise
+        except errors.Error:
+            # One bad write (data too long, ...) fails the whole group: find it
+            results = []
+            for entry in entries:
+                try:
+                    results.extend(self.write([entry]))
+                except TRANSIENT_ERRORS:
+                    raise
+                except errors.Error as err:
+                    results.append((entry, err))
+        self.journal.mark(results)
+        if self.on_flushed:
+            self.on_flushed(results)
+        return len(entries) == self.group_size
+
+    def write(self, entries):
+        writes = [(entry.op, entry.booking_id, entry.data, entry.client_ref) for entry in entries]
+        return list(zip(entries, self.service.write_group(writes, keep_going=True)))
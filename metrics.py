@@ -0,0 +1,276 @@
+import cProfile
+import datetime
+import logging
+import logging.handlers
+import os
+import pstats
+import re
+import threading
+import time
+from collections import deque, namedtuple
+from contextlib import contextmanager
+
+from config import (
+    METRICS_WINDOW_S, SLOW_OP_MS, SLOW_LAG_MS, LAG_PROBE_MS, SLOW_LOG_PATH, PROFILE_DIR,
+)
+
+
+# ---------------- METRICS ----------------
+# Rolling window of timings for SQL statements (timed by the pool's cursors),
+# UI actions, background tasks and Tk event-loop lag. Anything over the
+# threshold is also appended to the slow-operation log, so "it was slow this
+# morning" can be looked up afterwards.
+#
+# Kinds: "sql", "action" (a button's Tk-thread part), "task" (submit until the
+# result is ready), "ui" (a task's callback on the Tk thread) and "lag". Time
+# a clerk spends in a dialog opened through Metrics.dialog is left out of
+# actions, callbacks and profiles.
+Sample = namedtuple("Sample", "at kind name ms rows detail")
+Stat = namedtuple("Stat", "kind name count p50 p95 max rows")
+
+MAX_SAMPLES = 50_000               # hard cap on the window, whatever the rate
+IN_LIST = re.compile(r"IN \((?:%s,\s*)*%s\)")
+PROFILERS = {}                     # thread id -> profiler of a ProfileCapture.run() in progress
+
+
+def percentile(sorted_values, pct):
+    return sorted_values[min(int(len(sorted_values) * pct / 100), len(sorted_values) - 1)]
+
+
+def sql_name(sql):
+    # One name per statement shape: whitespace folded, IN lists of any length alike
+    return IN_LIST.sub("IN (…)", " ".join(sql.split()))
+
+
+def slow_logger(path):
+    logger = logging.getLogger("lapsa.slow")
+    if not logger.handlers:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        handler = logging.handlers.RotatingFileHandler(path, maxBytes=1_000_000, backupCount=3, encoding="utf-8")
+        handler.setFormatter(logging.Formatter("%(asctime)s %(threadName)s %(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+    return logger
+
+
+class Metrics:
+    def __init__(self, window_s=METRICS_WINDOW_S, slow_ms=SLOW_OP_MS, slow_lag_ms=SLOW_LAG_MS,
+                 log_path=SLOW_LOG_PATH, profile_dir=PROFILE_DIR):
+        self.window_s = window_s
+        self.slow_ms = slow_ms
+        self.slow_lag_ms = slow_lag_ms
+        self.profile_dir = profile_dir
+        self.profile_next = False          # set by the UI: profile the next action
+        self.slow = slow_logger(log_path) if log_path else None
+        self.log_path = log_path
+        self._samples = deque(maxlen=MAX_SAMPLES)
+        self._names = {}                   # raw SQL text -> sql_name()
+        self.dialog_ms = 0.0               # Tk thread: total time spent in dialog()
+        self._lock = threading.Lock()
+
+    def record(self, kind, name, ms, rows=None, detail=""):
+        # Safe from any thread
+        if kind == "sql":
+            name = self._names.get(name) or self._names.setdefault(name, sql_name(name))
+        now = time.time()
+        sample = Sample(now, kind, name, ms, rows, detail)
+        with self._lock:
+            self._samples.append(sample)
+            cutoff = now - self.window_s
+            while self._samples[0].at < cutoff:
+                self._samples.popleft()
+        if self.slow is not None and ms >= (self.slow_lag_ms if kind == "lag" else self.slow_ms):
+            rows_text = f" rows={rows}" if rows is not None else ""
+            self.slow.info("%s %.1f ms%s %s%s", kind, ms, rows_text, name,
+                           f" ({detail})" if detail else "")
+
+    @contextmanager
+    def timed(self, kind, name, detail=""):
+        # Tk thread: dialogs opened meanwhile don't count
+        start, dialogs = time.perf_counter(), self.dialog_ms
+        try:
+            yield
+        finally:
+            ms = (time.perf_counter() - start) * 1000 - (self.dialog_ms - dialogs)
+            self.record(kind, name, ms, detail=detail)
+
+    def dialog(self, fn, *args, **kwargs):
+        # Tk thread: a file, confirm or message dialog. Waiting on the user is
+        # neither UI latency nor part of a profile running on this thread.
+        profiler = PROFILERS.get(threading.get_ident())
+        if profiler is not None:
+            profiler.disable()
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            self.dialog_ms += (time.perf_counter() - start) * 1000
+            if profiler is not None:
+                profiler.enable()
+
+    def summary(self, kinds=None):
+        # [Stat] per (kind, name) over the window, slowest p95 first
+        cutoff = time.time() - self.window_s
+        with self._lock:
+            samples = [s for s in self._samples if s.at >= cutoff and (kinds is None or s.kind in kinds)]
+        groups = {}
+        for sample in samples:
+            groups.setdefault((sample.kind, sample.name), []).append(sample)
+        stats = []
+        for (kind, name), group in groups.items():
+            times = sorted(s.ms for s in group)
+            rows = [s.rows for s in group if s.rows is not None]
+            stats.append(Stat(kind, name, len(times), percentile(times, 50), percentile(times, 95),
+                              times[-1], sum(rows) if rows else None))
+        stats.sort(key=lambda stat: stat.p95, reverse=True)
+        return stats
+
+    def latest(self, kind):
+        with self._lock:
+            for sample in reversed(self._samples):
+                if sample.kind == kind:
+                    return sample
+        return None
+
+    def capture(self, name, on_saved=None):
+        # A ProfileCapture if "profile next action" is armed, else None
+        if not self.profile_next:
+            return None
+        self.profile_next = False
+        return ProfileCapture(name, self.profile_dir, on_saved)
+
+
+# ---------------- BACKGROUND TASK TIMING ----------------
+class TaskTrace:
+    # One TaskRunner submission: queued -> ran on a worker -> delivered to Tk
+    def __init__(self, metrics, name, capture=None):
+        self.metrics = metrics
+        self.name = name
+        self.capture = capture
+        self.queued = time.perf_counter()
+        self.started = self.finished = None
+        if capture is not None:
+            capture.task_started()
+
+    def run(self, fn, *args):
+        # Worker thread
+        self.started = time.perf_counter()
+        try:
+            if self.capture is not None:
+                return self.capture.run(fn, *args)
+            return fn(*args)
+        finally:
+            self.finished = time.perf_counter()
+
+    def deliver(self, callback, *args):
+        # Tk thread: the task's on_done / on_error callback
+        name = getattr(callback, "__name__", type(callback).__name__)
+        with self.metrics.timed("ui", name, detail=f"after {self.name}"):
+            if self.capture is not None:
+                return self.capture.run(callback, *args)
+            return callback(*args)
+
+    def done(self):
+        # Tk thread, once per submission (also when superseded or cancelled)
+        if self.finished is not None:
+            self.metrics.record(
+                "task", self.name, (self.finished - self.queued) * 1000,
+                detail=f"queued {(self.started - self.queued) * 1000:.0f} ms, "
+                       f"ran {(self.finished - self.started) * 1000:.0f} ms"
+            )
+        if self.capture is not None:
+            self.capture.task_done()
+
+
+# ---------------- EVENT-LOOP LAG ----------------
+class LagProbe:
+    # Asks Tk to call back every interval; how late the call comes is the
+    # time the event loop was busy (long callbacks, table fills, redraws).
+    def __init__(self, root, metrics, interval_ms=LAG_PROBE_MS):
+        self.root = root
+        self.metrics = metrics
+        self.interval_ms = interval_ms
+        self._due = None
+        self._after_id = None
+        self.start()
+
+    def start(self):
+        self._due = time.perf_counter() + self.interval_ms / 1000
+        self._after_id = self.root.after(self.interval_ms, self._tick)
+
+    def stop(self):
+        if self._after_id is not None:
+            try:
+                self.root.after_cancel(self._after_id)
+            except Exception:
+                pass
+            self._after_id = None
+
+    def _tick(self):
+        lag = max(time.perf_counter() - self._due, 0.0) * 1000
+        self.metrics.record("lag", "event loop", lag)
+        self.start()
+
+
+# ---------------- PROFILING ----------------
+class ProfileCapture:
+    # cProfile of one UI action: the button handler, the tasks it submits and
+    # their callbacks, merged into one .prof (for snakeviz etc.) plus a text
+    # summary. Python 3.12+ allows one active profiler per process, so a part
+    # that overlaps another is simply left out.
+    def __init__(self, name, out_dir=PROFILE_DIR, on_saved=None):
+        self.name = name
+        self.out_dir = out_dir
+        self.on_saved = on_saved
+        self._profiles = []
+        self._pending = 0
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def run(self, fn, *args):
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            return fn(*args)
+        PROFILERS[threading.get_ident()] = profiler
+        try:
+            return fn(*args)
+        finally:
+            profiler.disable()
+            del PROFILERS[threading.get_ident()]
+            with self._lock:
+                self._profiles.append(profiler)
+
+
+    def task_started(self):
+        with self._lock:
+            self._pending += 1
+
+    def task_done(self):
+        with self._lock:
+            self._pending -= 1
+        self._maybe_save()
+
+    def close(self):
+        # The handler has returned; save once its tasks are done too
+        self._closed = True
+        self._maybe_save()
+
+    def _maybe_save(self):
+        with self._lock:
+            if not self._closed or self._pending or not self._profiles:
+                return
+            profiles, self._profiles = self._profiles, []
+        os.makedirs(self.out_dir, exist_ok=True)
+        base = os.path.join(self.out_dir, f"{datetime.datetime.now():%Y%m%d-%H%M%S}-{self.name}")
+        stats = pstats.Stats(profiles[0])
+        for profiler in profiles[1:]:
+            stats.add(profiler)
+        stats.dump_stats(base + ".prof")
+        with open(base + ".txt", "w", encoding="utf-8") as f:
+            stats.stream = f
+            stats.sort_stats("cumulative").print_stats(40)
+        if self.on_saved:
+            self.on_saved(base + ".txt")
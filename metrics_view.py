@@ -0,0 +1,78 @@
+import os
+import tkinter as tk
+from tkinter import ttk
+
+
+# ---------------- PERFORMANCE WINDOW ----------------
+# Live view of the rolling metrics window: one line per SQL statement shape,
+# action, task and UI callback with count and p50/p95/max times, plus the
+# current event-loop lag. Refreshes itself once a second while open.
+REFRESH_MS = 1000
+KIND_LABELS = {"sql": "SQL", "action": "Action", "task": "Task", "ui": "UI callback", "lag": "Event loop"}
+
+
+class MetricsWindow:
+    def __init__(self, master, metrics, on_profile=None, open_path=None):
+        self.metrics = metrics
+        self.open_path = open_path
+        self.window = tk.Toplevel(master)
+        self.window.title("⏱ Performance")
+        self.window.geometry("980x460")
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+
+        bar = tk.Frame(self.window)
+        bar.pack(fill="x", padx=10, pady=8)
+        self.summary_label = tk.Label(bar, text="", font=("Segoe UI", 10), anchor="w")
+        self.summary_label.pack(side="left")
+        if open_path and metrics.log_path:
+            ttk.Button(bar, text="Open Slow Log", command=self.open_slow_log).pack(side="right", padx=3)
+        if on_profile:
+            ttk.Button(bar, text="Profile Next Action", command=on_profile).pack(side="right", padx=3)
+
+        columns = ("Kind", "Operation", "Count", "p50 ms", "p95 ms", "Max ms", "Rows")
+        self.tree = ttk.Treeview(self.window, columns=columns, show="headings")
+        for col in columns:
+            self.tree.heading(col, text=col)
+            self.tree.column(col, anchor="e", width=80, stretch=False)
+        self.tree.column("Kind", anchor="w", width=90)
+        self.tree.column("Operation", anchor="w", width=520, stretch=True)
+        self.tree.pack(fill="both", expand=True, padx=10, pady=(0, 10))
+
+        self._after_id = None
+        self.refresh()
+
+    def refresh(self):
+        stats = self.metrics.summary()
+        self.tree.delete(*self.tree.get_children())
+        for stat in stats:
+            self.tree.insert("", tk.END, values=(
+                KIND_LABELS.get(stat.kind, stat.kind), stat.name, f"{stat.count:,}",
+                f"{stat.p50:,.1f}", f"{stat.p95:,.1f}", f"{stat.max:,.1f}",
+                "" if stat.rows is None else f"{stat.rows:,}",
+            ))
+        lag = self.metrics.latest("lag")
+        text = f"Last {self.metrics.window_s // 60} min · slow log above {self.metrics.slow_ms} ms"
+        if lag is not None:
+            text += f" · event-loop lag {lag.ms:.0f} ms"
+        if self.metrics.profile_next:
+            text += " · profiling the next action…"
+        self.summary_label.config(text=text)
+        self._after_id = self.window.after(REFRESH_MS, self.refresh)
+
+    def open_slow_log(self):
+        if os.path.exists(self.metrics.log_path):
+            self.open_path(self.metrics.log_path)
+
+    def lift(self):
+        self.window.deiconify()
+        self.window.lift()
+
+    def close(self):
+        if self._after_id is not None:
+            self.window.after_cancel(self._after_id)
+        self.window.destroy()
+        self.window = None
+
+    @property
+    def is_open(self):
+        return self.window is not None
@@ -0,0 +1,106 @@
+import threading
+from collections import OrderedDict, namedtuple
+
+from config import PAGE_SIZE, PAGE_PREFETCH, PAGE_CACHE_PAGES
+from db import SQL_PAGE_FIRST, SQL_PAGE_LAST, SQL_PAGE_AFTER, SQL_PAGE_BEFORE
+
+
+# ---------------- KEYSET PAGER ----------------
+# Pages through `bookings` by primary key (WHERE id > last_seen ORDER BY id
+# LIMIT n) instead of loading the whole table, so each fetch touches only one
+# index range no matter how many historical bookings exist. Recently used
+# pages are kept in a small LRU window and neighbours are prefetched.
+Page = namedtuple("Page", "rows has_prev has_next")
+
+
+def first_id(page):
+    return page.rows[0][0] if page.rows else None
+
+
+def last_id(page):
+    return page.rows[-1][0] if page.rows else None
+
+
+class KeysetPager:
+    appends_at_end = True          # id order: a new booking belongs after the last row
+
+    def __init__(self, connect, page_size=PAGE_SIZE, prefetch=PAGE_PREFETCH,
+                 cache_pages=PAGE_CACHE_PAGES):
+        self.connect = connect
+        self.page_size = page_size
+        self.prefetch_pages = prefetch
+        self.cache_pages = cache_pages
+        self._cache = OrderedDict()        # (direction, anchor id) -> Page
+        self._lock = threading.Lock()
+
+    # ---- navigation (safe to call from worker threads) ----
+    def first(self):
+        return self._load("first", None)
+
+    def last(self):
+        return self._load("last", None)
+
+    def after(self, booking_id):
+        return self._load("after", booking_id)
+
+    def before(self, booking_id):
+        return self._load("before", booking_id)
+
+    def refresh(self, page):
+        # Reload the page that starts at the same row as `page`. The first
+        # page is reloaded as the first page: an "after" fetch always reports
+        # a page before it.
+        if page is None or not page.rows or not page.has_prev:
+            return self.first()
+        return self.after(first_id(page) - 1)
+
+    def prefetch(self, page):
+        # Warm the cache with the pages around `page`
+        forward, backward = page, page
+        for _ in range(self.prefetch_pages):
+            if forward.has_next:
+                forward = self.after(last_id(forward))
+            if backward.has_prev:
+                backward = self.before(first_id(backward))
+
+    def invalidate(self):
+        with self._lock:
+            self._cache.clear()
+
+    # ---- internals ----
+    def _load(self, direction, anchor):
+        key = (direction, anchor)
+        with self._lock:
+            page = self._cache.get(key)
+            if page is not None:
+                self._cache.move_to_end(key)
+                return page
+
+        page = self._fetch(direction, anchor)
+
+        with self._lock:
+            self._cache[key] = page
+            while len(self._cache) > self.cache_pages:
+                self._cache.popitem(last=False)
+        return page
+
+    def _fetch(self, direction, anchor):
+        # One extra row tells us whether another page exists past this one
+        limit = self.page_size + 1
+        with self.connect() as conn:
+            if direction == "first":
+                rows = conn.execute(SQL_PAGE_FIRST, (limit,)).fetchall()
+            elif direction == "last":
+                rows = conn.execute(SQL_PAGE_LAST, (limit,)).fetchall()
+            elif direction == "after":
+                rows = conn.execute(SQL_PAGE_AFTER, (anchor, limit)).fetchall()
+            else:
+                rows = conn.execute(SQL_PAGE_BEFORE, (anchor, limit)).fetchall()
+
+        more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if direction in ("first", "after"):
+            return Page(rows, direction == "after", more)
+        # Backward fetches come back newest-first
+        rows.reverse()
+        return Page(rows, more, direction == "before")
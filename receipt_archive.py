@@ -0,0 +1,214 @@
+import argparse
+import datetime
+import importlib.util
+import json
+import os
+import time
+
+from reportlab.lib.pagesizes import letter
+from reportlab.platypus import SimpleDocTemplate, PageBreak, Flowable
+
+from config import RECEIPTS_DIR, RECEIPT_ARCHIVE_DIR
+from db import SQL_BOOKINGS_CREATED_BETWEEN, pool
+from receipts import receipt_story, booking_ref, get_template
+from receipt_cache import ReceiptCache, receipt_key
+
+
+# ---------------- DAILY RECEIPT ARCHIVE ----------------
+# All receipts of the bookings made on one day, laid out as one multi-page PDF
+# (receipts/archive/2026-10-15.pdf). ReportLab writes an image that is drawn
+# again as a reference to the first copy, so the logo is stored once per day
+# instead of once per receipt (the fonts are PDF built-ins and never
+# embedded). Each receipt starts on a new page with a bookmark named after
+# its reference; the JSON index next to the PDF maps reference -> first page,
+# page count and receipt_key, so one receipt can be cut out (with pypdf, if
+# installed) without reading the rest of the archive.
+#
+# The index also tells when an archived receipt is stale: a booking changed
+# after its day was archived has a different receipt_key and is rendered
+# fresh instead.
+def archive_paths(day, directory=RECEIPT_ARCHIVE_DIR):
+    base = os.path.join(directory, day.isoformat())
+    return base + ".pdf", base + ".json"
+
+
+def has_pypdf():
+    return importlib.util.find_spec("pypdf") is not None
+
+
+class ReceiptMark(Flowable):
+    # Zero-size flowable at the top of each receipt: notes the page it lands
+    # on and adds the receipt to the PDF outline
+    def __init__(self, ref, marks, progress=None, total=0):
+        super().__init__()
+        self.ref = ref
+        self.marks = marks
+        self.progress = progress
+        self.total = total
+
+    def wrap(self, available_width, available_height):
+        return 0, 0
+
+    def draw(self):
+        self.marks.append((self.ref, self.canv.getPageNumber()))
+        self.canv.bookmarkPage(self.ref)
+        self.canv.addOutlineEntry(self.ref, self.ref, level=0)
+        if self.progress:
+            self.progress(len(self.marks), self.total)
+
+
+def build_archive(day, rows, directory=RECEIPT_ARCHIVE_DIR, progress=None):
+    # rows: the day's booking rows. Writes the PDF and its index (replacing an
+    # earlier build of the same day) and returns the index.
+    os.makedirs(directory, exist_ok=True)
+    pdf_path, index_path = archive_paths(day, directory)
+    template = get_template()
+    story, marks = [], []
+    for i, row in enumerate(rows):
+        if i:
+            story.append(PageBreak())
+        story.append(ReceiptMark(booking_ref(row[0]), marks, progress, len(rows)))
+        story.extend(receipt_story(row, template))
+
+    tmp_path = pdf_path + ".tmp"
+    doc = SimpleDocTemplate(
+        tmp_path,
+        pagesize=letter,
+        rightMargin=36, leftMargin=36, topMargin=36, bottomMargin=36,
+        title=f"Lapsa Hotel receipts {day.isoformat()}",
+    )
+    doc.build(story, onFirstPage=lambda canv, doc: canv.showOutline())
+    os.replace(tmp_path, pdf_path)
+
+    # A receipt runs from its mark's page to the page before the next one
+    total_pages = doc.page
+    next_pages = [page for ref, page in marks[1:]] + [total_pages + 1]
+    index = {"day": day.isoformat(), "pages": total_pages, "built": time.time(), "receipts": {}}
+    for row, (ref, page), next_page in zip(rows, marks, next_pages):
+        index["receipts"][ref] = {
+            "booking_id": row[0],
+            "page": page,
+            "pages": next_page - page,
+            "key": receipt_key(row),
+        }
+    with open(index_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(index, f)
+    os.replace(index_path + ".tmp", index_path)
+    return index
+
+
+def load_index(day, directory=RECEIPT_ARCHIVE_DIR):
+    try:
+        with open(archive_paths(day, directory)[1], encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def find_receipt(values, day, directory=RECEIPT_ARCHIVE_DIR):
+    # (archive PDF, index entry) holding this booking's current receipt, or None
+    index = load_index(day, directory) if day else None
+    if index is None:
+        return None
+    entry = index["receipts"].get(booking_ref(values[0]))
+    if entry is None or entry["key"] != receipt_key(values):
+        return None
+    return archive_paths(day, directory)[0], entry
+
+
+def extract_pages(pdf_path, entry, out_path):
+    # Copies the receipt's pages into their own PDF (needs pypdf)
+    from pypdf import PdfReader, PdfWriter
+
+    reader = PdfReader(pdf_path)
+    writer = PdfWriter()
+    for number in range(entry["page"] - 1, entry["page"] - 1 + entry["pages"]):
+        writer.add_page(reader.pages[number])
+    os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+    with open(out_path, "wb") as f:
+        writer.write(f)
+    return out_path
+
+
+def archived_receipt(values, day, directory=RECEIPT_ARCHIVE_DIR):
+    # Path of a single-receipt PDF cut from the day's archive, or None (no
+    # archive, stale entry, or no pypdf: the caller renders it as usual)
+    found = find_receipt(values, day, directory)
+    if found is None or not has_pypdf():
+        return None
+    pdf_path, entry = found
+    return extract_pages(pdf_path, entry, os.path.join(directory, "extracted", f"{booking_ref(values[0])}.pdf"))
+
+
+def fetch_day_rows(conn, day):
+    cursor = conn.cursor()
+    cursor.execute(SQL_BOOKINGS_CREATED_BETWEEN, (day, day + datetime.timedelta(days=1)))
+    rows = cursor.fetchall()
+    cursor.close()
+    return rows
+
+
+def archive_day(day, connect=pool.connection, directory=RECEIPT_ARCHIVE_DIR, cache=None, progress=None):
+    # End of day: the day's receipts into one archive. Their single-file copies
+    # in the receipt cache are deleted, along with receipts extracted earlier.
+    with connect() as conn:
+        rows = fetch_day_rows(conn, day)
+    if not rows:
+        return None
+    index = build_archive(day, rows, directory, progress)
+    if cache is not None:
+        for row in rows:
+            cache.discard(row, save=False)
+        cache.flush()
+    extracted = os.path.join(directory, "extracted")
+    if os.path.isdir(extracted):
+        for name in os.listdir(extracted):
+            try:
+                os.remove(os.path.join(extracted, name))
+            except OSError:
+                pass
+    return index
+
+
+def main():
+    # Nightly, e.g. from cron / Task Scheduler:
+    #   python receipt_archive.py                              (yesterday)
+    #   python receipt_archive.py --day 2026-10-15
+    #   python receipt_archive.py --day 2026-10-15 --extract HB-000123 --out HB-000123.pdf
+    parser = argparse.ArgumentParser(description="Archive a day's receipts into one PDF with a page index")
+    parser.add_argument("--day", type=datetime.date.fromisoformat,
+                        default=datetime.date.today() - datetime.timedelta(days=1))
+    parser.add_argument("--dir", default=RECEIPT_ARCHIVE_DIR)
+    parser.add_argument("--keep-files", action="store_true", help="keep the single receipt files of the day")
+    parser.add_argument("--extract", metavar="REF", help="cut one receipt out of the day's archive instead")
+    parser.add_argument("--out", help="file for --extract (default: <REF>.pdf)")
+    args = parser.parse_args()
+
+    if args.extract:
+        index = load_index(args.day, args.dir)
+        entry = index and index["receipts"].get(args.extract)
+        if not entry:
+            parser.error(f"{args.extract} is not in the archive of {args.day}")
+        pdf_path = archive_paths(args.day, args.dir)[0]
+        if not has_pypdf():
+            print(f"pypdf is not installed; {args.extract} is on page {entry['page']} of {pdf_path}")
+            return
+        print(extract_pages(pdf_path, entry, args.out or f"{args.extract}.pdf"))
+        return
+
+    def progress(done, total):
+        print(f"\r{done}/{total} receipts", end="", flush=True)
+
+    start = time.perf_counter()
+    cache = None if args.keep_files else ReceiptCache(RECEIPTS_DIR)
+    index = archive_day(args.day, directory=args.dir, cache=cache, progress=progress)
+    if index is None:
+        print(f"No bookings were made on {args.day}")
+        return
+    pdf_path = archive_paths(args.day, args.dir)[0]
+    print(f"\n{len(index['receipts'])} receipts, {index['pages']} pages -> {pdf_path} "
+          f"({os.path.getsize(pdf_path) / 1024:,.0f} KB, {time.perf_counter() - start:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
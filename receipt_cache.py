@@ -0,0 +1,139 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+from config import (
+    PRICES, VAT_RATE, RECEIPTS_DIR, LOGO_PATH,
+    RECEIPT_CACHE_MAX_FILES, RECEIPT_CACHE_MAX_MB, RECEIPT_CACHE_MAX_AGE_DAYS,
+)
+
+
+# ---------------- RECEIPT CACHE ----------------
+# Receipts are keyed by a hash of everything that goes into them: the booking
+# row, the price list, the VAT rate and the logo file. A reprint of an
+# unchanged booking serves the PDF already on disk instead of rendering again.
+# Only files the cache itself recorded are ever evicted.
+RECEIPT_LAYOUT_VERSION = 1         # bump when the layout in receipts.py changes
+INDEX_NAME = ".receipt_cache.json"
+
+
+def receipt_key(values, logo_path=LOGO_PATH):
+    booking_id, name, phone, email, id_number, room_type, nights, total_cost = values[:8]
+    try:
+        logo_mtime = os.path.getmtime(logo_path)
+    except OSError:
+        logo_mtime = None
+    payload = json.dumps([
+        RECEIPT_LAYOUT_VERSION,
+        [str(booking_id), str(name), str(phone), str(email), str(id_number),
+         str(room_type), int(nights), format(float(total_cost), ".2f")],
+        sorted(PRICES.items()),
+        VAT_RATE,
+        logo_mtime,
+    ])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ReceiptCache:
+    def __init__(self, directory=RECEIPTS_DIR, max_files=RECEIPT_CACHE_MAX_FILES,
+                 max_mb=RECEIPT_CACHE_MAX_MB, max_age_days=RECEIPT_CACHE_MAX_AGE_DAYS):
+        self.directory = directory
+        self.index_path = os.path.join(directory, INDEX_NAME)
+        self.max_files = max_files
+        self.max_bytes = max_mb * 1024 * 1024
+        self.max_age = max_age_days * 86400
+        self._entries = {}         # key -> {"path", "size", "created", "used"}
+        self._dirty = False        # lookups only bump "used"; written on the next save
+        self._lock = threading.Lock()
+        self._load()
+
+    def lookup(self, values):
+        key = receipt_key(values)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            try:
+                if os.path.getsize(entry["path"]) != entry["size"]:
+                    raise OSError("changed on disk")
+            except OSError:
+                del self._entries[key]
+                self._dirty = True
+                return None
+            entry["used"] = time.time()
+            self._dirty = True
+            return entry["path"]
+
+    def store(self, values, path, save=True):
+        key = receipt_key(values)
+        now = time.time()
+        with self._lock:
+            # The same file name may have held an older version of this receipt
+            for old_key in [k for k, e in self._entries.items() if e["path"] == path]:
+                del self._entries[old_key]
+            self._entries[key] = {"path": path, "size": os.path.getsize(path), "created": now, "used": now}
+            self._evict(now)
+            if save:
+                self._save()
+            else:
+                self._dirty = True
+
+    def discard(self, values, save=True):
+        # Forget the booking's cached receipt and delete the file (now in a daily archive)
+        key = receipt_key(values)
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+                self._dirty = True
+            if save and self._dirty:
+                self._save()
+
+    def evict(self):
+        with self._lock:
+            self._evict(time.time())
+            self._save()
+
+    def flush(self):
+        with self._lock:
+            if self._dirty:
+                self._save()
+
+    def __len__(self):
+        return len(self._entries)
+
+    # ---- internals (call with the lock held) ----
+    def _evict(self, now):
+        # Too old first, then least recently used until under the count/size caps
+        expired = [k for k, e in self._entries.items() if now - e["created"] > self.max_age]
+        for key in expired:
+            self._drop(key)
+        by_use = sorted(self._entries, key=lambda k: self._entries[k]["used"])
+        total = sum(e["size"] for e in self._entries.values())
+        while by_use and (len(self._entries) > self.max_files or total > self.max_bytes):
+            key = by_use.pop(0)
+            total -= self._entries[key]["size"]
+            self._drop(key)
+
+    def _drop(self, key):
+        entry = self._entries.pop(key)
+        try:
+            os.remove(entry["path"])
+        except OSError:
+            pass
+
+    def _load(self):
+        try:
+            with open(self.index_path, encoding="utf-8") as f:
+                self._entries = json.load(f)
+        except (OSError, ValueError):
+            self._entries = {}
+
+    def _save(self):
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._entries, f)
+        os.replace(tmp_path, self.index_path)
+        self._dirty = False
@@ -0,0 +1,337 @@
+import argparse
+import datetime
+import io
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# ReportLab (PDF)
+from reportlab import rl_config
+from reportlab.lib.pagesizes import letter
+from reportlab.lib import colors
+from reportlab.lib.units import inch
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.platypus import (
+    SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image
+)
+from reportlab.graphics.barcode import qr
+from reportlab.graphics.shapes import Drawing
+
+from config import VAT_RATE, RECEIPTS_DIR, LOGO_PATH, RECEIPT_WORKERS
+from billing import price_stay, format_money
+from db import BOOKING_COLUMNS, pool
+from receipt_cache import ReceiptCache
+
+# Write image streams as binary instead of ASCII85 text: the pure-Python
+# encoder was most of the per-receipt build time, and the files get smaller.
+# ReportLab only has this as a process-wide setting, read at several points
+# during a build, so it can't be scoped to one canvas. It is set here because
+# the only PDFs this application writes are receipts (this module and
+# receipt_archive.py, which imports it), and binary streams are standard PDF
+# that every viewer and pypdf read.
+rl_config.useA85 = 0
+
+
+# ---------------- RECEIPT TEMPLATE ----------------
+# Everything that is the same on every receipt (style sheet, logo bytes, hotel
+# address block) is built once per process and reused for each PDF.
+HOTEL_INFO = (
+    "<b>Lapsa Hotel</b><br/>"
+    "Kahawa Wendani, Nairobi Kenya<br/>"
+    "Tel: +25411108331 <br/>"
+    "Website: https://lapsa.vercel.app<br/>"
+)
+
+
+class ReceiptTemplate:
+    def __init__(self, logo_path=LOGO_PATH):
+        self.styles = getSampleStyleSheet()
+        self.styles.add(ParagraphStyle(name="SmallGrey", fontSize=9, textColor=colors.grey))
+        self.styles.add(ParagraphStyle(name="HeaderBig", fontSize=16, leading=20, spaceAfter=8, textColor=colors.darkblue))
+        self.styles.add(ParagraphStyle(name="Tag", fontSize=10, textColor=colors.white))
+
+        # Read the logo once; each receipt wraps the cached bytes
+        self.logo_bytes = None
+        if os.path.exists(logo_path):
+            with open(logo_path, "rb") as f:
+                self.logo_bytes = f.read()
+
+    def logo(self):
+        if self.logo_bytes:
+            return Image(io.BytesIO(self.logo_bytes), width=1.1*inch, height=1.1*inch)
+        # Placeholder if no logo
+        return Paragraph("<b>HOTEL</b>", self.styles["Title"])
+
+    def header(self, printed_at):
+        hotel_info = Paragraph(
+            HOTEL_INFO + f"Receipt Date: {printed_at.strftime('%Y-%m-%d %H:%M')}",
+            self.styles["Normal"]
+        )
+        header_table = Table([[self.logo(), hotel_info]], colWidths=[1.4*inch, 4.6*inch])
+        header_table.setStyle(TableStyle([
+            ("VALIGN", (0, 0), (-1, -1), "MIDDLE")
+        ]))
+        return header_table
+
+
+_template = None
+
+
+def get_template():
+    # Per-process cache (each batch worker builds its own once)
+    global _template
+    if _template is None:
+        _template = ReceiptTemplate()
+    return _template
+
+
+# ---------------- SINGLE RECEIPT ----------------
+def booking_ref(booking_id):
+    return f"HB-{int(booking_id):06d}" if str(booking_id).isdigit() else f"HB-{booking_id}"
+
+
+def receipt_path(booking_id, out_dir=RECEIPTS_DIR, day=None):
+    day = day or datetime.date.today()
+    return os.path.join(out_dir, f"Receipt_{booking_ref(booking_id)}_{day.strftime('%Y-%m-%d')}.pdf")
+
+
+def receipt_story(values, template=None):
+    # Flowables for one receipt; values is a bookings row
+    template = template or get_template()
+    styles = template.styles
+    booking_id, name, phone, email, id_number, room_type, nights, stored_total = values[:8]
+
+    # Derive rate & breakdown smartly
+    rate, calculated_subtotal, calculated_tax, calculated_grand = price_stay(room_type, nights)
+
+    # If DB total differs (e.g., historical data before tax), show both clearly
+    note_diff = ""
+    if abs(float(stored_total) - calculated_grand) > 0.01:
+        note_diff = "(Note: stored total differs from current tax settings.)"
+
+    ref = booking_ref(booking_id)
+    story = []
+
+    # Header with optional logo
+    story.append(template.header(datetime.datetime.now()))
+    story.append(Spacer(1, 12))
+
+    # Receipt Title & Reference
+    story.append(Paragraph(f"Booking Receipt — <b>{ref}</b>", styles["HeaderBig"]))
+    story.append(Spacer(1, 6))
+
+    # Guest & Stay Info
+    guest_table_data = [
+        ["Guest Name", name],
+        ["Phone", phone],
+        ["Email", email],
+        ["ID/Passport", id_number],
+        ["Room Type", room_type],
+        ["Nights", str(nights)],
+    ]
+    guest_table = Table(guest_table_data, colWidths=[1.5*inch, 4.5*inch])
+    guest_table.setStyle(TableStyle([
+        ("BACKGROUND", (0, 0), (0, -1), colors.HexColor("#ecf0f1")),
+        ("TEXTCOLOR", (0, 0), (0, -1), colors.HexColor("#2c3e50")),
+        ("BOX", (0, 0), (-1, -1), 0.25, colors.grey),
+        ("INNERGRID", (0, 0), (-1, -1), 0.25, colors.grey),
+        ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+        ("FONTNAME", (0, 0), (-1, -1), "Helvetica")
+    ]))
+    story.append(guest_table)
+    story.append(Spacer(1, 12))
+
+    # Charges Table (smart breakdown)
+    charges_data = [
+        ["Description", "Qty", "Rate", "Amount"],
+        [f"{room_type} Room", str(nights), format_money(rate), format_money(calculated_subtotal)],
+        ["Tax / VAT", "", f"{int(VAT_RATE*100)}%", format_money(calculated_tax)],
+        ["", "", "Grand Total", format_money(calculated_grand)],
+    ]
+    charges_table = Table(charges_data, colWidths=[3.2*inch, 0.8*inch, 1.2*inch, 1.2*inch])
+    charges_table.setStyle(TableStyle([
+        ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#2c3e50")),
+        ("TEXTCOLOR", (0, 0), (-1, 0), colors.white),
+        ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+        ("ALIGN", (1, 0), (-1, -1), "RIGHT"),
+        ("BOX", (0, 0), (-1, -1), 0.25, colors.grey),
+        ("INNERGRID", (0, 0), (-1, -1), 0.25, colors.grey),
+        ("BACKGROUND", (0, -1), (-1, -1), colors.HexColor("#ecf0f1")),
+        ("FONTNAME", (2, -1), (2, -1), "Helvetica-Bold"),
+        ("FONTNAME", (3, -1), (3, -1), "Helvetica-Bold"),
+    ]))
+    story.append(charges_table)
+    story.append(Spacer(1, 6))
+
+    # Stored total note (if different)
+    if note_diff:
+        story.append(Paragraph(
+            f"<font color='#e67e22'><b>Note:</b> The amount stored in the system for this booking is "
+            f"{format_money(stored_total)}; current calculation shows {format_money(calculated_grand)}. "
+            f"{note_diff}</font>",
+            styles["SmallGrey"]
+        ))
+        story.append(Spacer(1, 6))
+
+    # QR Code (Booking reference + guest + total)
+    qr_text = f"{ref}|{name}|{format_money(calculated_grand)}"
+    qr_code = qr.QrCodeWidget(qr_text)
+    bounds = qr_code.getBounds()
+    size = 1.6 * inch
+    width = bounds[2] - bounds[0]
+    height = bounds[3] - bounds[1]
+    d = Drawing(size, size, transform=[size/width, 0, 0, size/height, 0, 0])
+    d.add(qr_code)
+    # put QR and a small legend in a table for alignment
+    qr_table = Table([[d, Paragraph(
+        "<b>Scan for booking summary</b><br/>"
+        "Use this at check-in for quick lookup.",
+        styles["SmallGrey"]
+    )]], colWidths=[size+12, 3.1*inch])
+    qr_table.setStyle(TableStyle([
+        ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+    ]))
+    story.append(qr_table)
+    story.append(Spacer(1, 10))
+
+    # Payment / Terms
+    story.append(Paragraph(
+        "<b>Payment Method:</b> Cash / Card on file<br/>"
+        "<b>Terms:</b> Please present a valid ID at check-in. "
+        "Cancellations within 24h may incur charges. Taxes subject to local regulations.",
+        styles["SmallGrey"]
+    ))
+    story.append(Spacer(1, 4))
+    story.append(Paragraph("Thank you for choosing Lapsa Hotel. We wish you a pleasant stay!", styles["Normal"]))
+    return story
+
+
+def build_receipt(values, out_dir=RECEIPTS_DIR):
+    # Lays out and writes one PDF, returns its path
+    os.makedirs(out_dir, exist_ok=True)
+    filename = receipt_path(values[0], out_dir)
+    doc = SimpleDocTemplate(
+        filename,
+        pagesize=letter,
+        rightMargin=36, leftMargin=36, topMargin=36, bottomMargin=36
+    )
+    doc.build(receipt_story(values))
+    return filename
+
+
+# ---------------- BATCH RECEIPTS ----------------
+def warm_worker():
+    # Process-pool initializer: build the shared template before the first job
+    get_template()
+
+
+def get_receipt(values, cache, out_dir=RECEIPTS_DIR):
+    # Returns (path, served from cache?)
+    path = cache.lookup(values)
+    if path:
+        return path, True
+    path = build_receipt(values, out_dir)
+    cache.store(values, path)
+    return path, False
+
+
+def generate_batch(bookings, out_dir=RECEIPTS_DIR, workers=RECEIPT_WORKERS, progress=None, cache=None):
+    # Renders every booking row in a process pool. Rows already in the receipt
+    # cache are served from disk and never reach the pool. progress(done, total)
+    # is called from the calling thread as receipts finish. Returns
+    # (list of paths, list of (booking id, error), cache hits, receipts
+    # rendered per second); the rate leaves cache hits out.
+    bookings = list(bookings)
+    total = len(bookings)
+    files, failures, pending = [], [], []
+    for row in bookings:
+        path = cache.lookup(row) if cache is not None else None
+        if path:
+            files.append(path)
+        else:
+            pending.append(row)
+    hits = len(files)
+    if progress and hits:
+        progress(hits, total)
+
+    start = time.perf_counter()
+    if pending:
+        os.makedirs(out_dir, exist_ok=True)
+        # "spawn" so workers never inherit a forked copy of the Tk/threaded parent
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                 initializer=warm_worker) as executor:
+            futures = {executor.submit(build_receipt, tuple(row), out_dir): row for row in pending}
+            for future in as_completed(futures):
+                row = futures[future]
+                try:
+                    path = future.result()
+                    files.append(path)
+                    if cache is not None:
+                        cache.store(row, path, save=False)
+                except Exception as err:
+                    failures.append((row[0], err))
+                if progress:
+                    progress(len(files) + len(failures), total)
+    elapsed = time.perf_counter() - start
+    rendered = len(files) - hits
+    rate = rendered / elapsed if elapsed > 0 else 0.0
+    if cache is not None:
+        cache.flush()
+    return files, failures, hits, rate
+
+
+def fetch_receipt_rows(conn, ids=None, room_type=None):
+    # Bookings for a batch, either by explicit IDs or by room type filter
+    sql = f"SELECT {BOOKING_COLUMNS} FROM bookings"
+    params = []
+    clauses = []
+    if ids:
+        clauses.append("id IN ({})".format(",".join(["%s"] * len(ids))))
+        params.extend(ids)
+    if room_type:
+        clauses.append("room_type = %s")
+        params.append(room_type)
+    if clauses:
+        sql += " WHERE " + " AND ".join(clauses)
+    cursor = conn.cursor()
+    cursor.execute(sql + " ORDER BY id", tuple(params))
+    rows = cursor.fetchall()
+    cursor.close()
+    return rows
+
+
+def main():
+    # End-of-day billing from the command line:
+    #   python receipts.py --ids 12,13,20
+    #   python receipts.py --room-type Suite --workers 8
+    #   python receipts.py --all
+    parser = argparse.ArgumentParser(description="Generate booking receipts in bulk")
+    parser.add_argument("--ids", help="comma-separated booking IDs")
+    parser.add_argument("--room-type", help="only bookings of this room type")
+    parser.add_argument("--all", action="store_true", help="every booking")
+    parser.add_argument("--workers", type=int, default=RECEIPT_WORKERS)
+    parser.add_argument("--out", default=RECEIPTS_DIR)
+    parser.add_argument("--no-cache", action="store_true", help="re-render receipts even if unchanged")
+    args = parser.parse_args()
+    if not (args.ids or args.room_type or args.all):
+        parser.error("give --ids, --room-type or --all")
+
+    ids = [int(i) for i in args.ids.split(",")] if args.ids else None
+    with pool.connection() as conn:
+        rows = fetch_receipt_rows(conn, ids=ids, room_type=args.room_type)
+
+    def progress(done, total):
+        print(f"\r{done}/{total} receipts", end="", flush=True)
+
+    cache = None if args.no_cache else ReceiptCache(args.out)
+    files, failures, hits, rate = generate_batch(rows, args.out, args.workers, progress, cache)
+    print(f"\nWrote {len(files) - hits} receipts to {args.out}/ ({rate:.1f} receipts/s)"
+          + (f", {hits} unchanged from the cache" if hits else ""))
+    for booking_id, err in failures:
+        print(f"  booking {booking_id}: {err}")
+
+
+if __name__ == "__main__":
+    main()
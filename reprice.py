@@ -0,0 +1,226 @@
+import argparse
+import csv
+import importlib.util
+import time
+from decimal import Decimal
+
+from config import PRICES, VAT_RATE, REPRICE_BATCH_SIZE, CHANGE_FEED
+from billing import price_stay
+from db import (
+    SQL_REPRICE_BATCH, SQL_REPRICE_BATCH_ROOM, SQL_REPRICE_UPDATE, SQL_ROLLUP_REPRICE, SQL_CHANGES_REPRICE, pool,
+    record_write,
+)
+
+
+# ---------------- REPRICING & TAX RECONCILIATION ----------------
+# Audits every booking's stored total against the current PRICES and VAT_RATE
+# and, with apply=True, corrects the ones that differ. Bookings are read in
+# keyset batches of four columns (id, room type, nights, total) and checked a
+# whole batch at a time: there are only a few hundred distinct (room type,
+# nights) pairs, so each is priced once with billing.price_stay (same rounding
+# as the booking form) and the expected totals are gathered and compared as
+# NumPy arrays. Without NumPy the same check runs as a plain loop.
+#
+# Corrections are set-based: one UPDATE per (room type, nights) pair within the
+# batch's id range, guarded by "total_cost <> expected", one commit per batch.
+# Bookings with a room type that is no longer in PRICES are counted, never
+# repriced (they would become free).
+MISMATCH_HEADER = ["id", "room_type", "nights", "stored_total", "subtotal", "vat", "expected_total", "difference"]
+
+
+def has_numpy():
+    return importlib.util.find_spec("numpy") is not None
+
+
+def to_cents(value):
+    return round(float(value) * 100)
+
+
+def from_cents(cents):
+    return Decimal(int(cents)).scaleb(-2)
+
+
+class PriceList:
+    # (room type, nights) -> (subtotal, VAT, total) in cents, priced once each
+    def __init__(self, prices=PRICES):
+        self.prices = prices
+        self._quotes = {}
+
+    def quote(self, room_type, nights):
+        key = (room_type, nights)
+        quote = self._quotes.get(key)
+        if quote is None and key not in self._quotes:
+            if room_type in self.prices and nights > 0:
+                rate, subtotal, tax, total = price_stay(room_type, nights)
+                quote = (to_cents(subtotal), to_cents(tax), to_cents(total))
+            self._quotes[key] = quote
+        return quote
+
+
+# ---- batch checks: rows -> ([(id, room type, nights, stored cents, quote)], unpriced count) ----
+def check_batch_numpy(rows, prices):
+    import numpy as np
+
+    ids, room_types, nights, totals = zip(*rows)
+    nights = np.fromiter(nights, dtype=np.int64, count=len(rows))
+    stored = np.rint(np.array(totals, dtype=np.float64) * 100).astype(np.int64)
+    names, room_codes = np.unique(np.array(room_types, dtype=str), return_inverse=True)
+    # nights <= 0 has no price (as in check_batch_python) and would break the
+    # room type * base + nights encoding: leave those rows out, as unpriced
+    valid = np.flatnonzero(nights > 0)
+    if not valid.size:
+        return [], len(rows)
+    base = int(nights[valid].max()) + 1
+    pairs, pair_index = np.unique(room_codes[valid] * base + nights[valid], return_inverse=True)
+
+    quotes = [prices.quote(str(names[pair // base]), int(pair % base)) for pair in pairs]
+    expected = np.array([quote[2] if quote else -1 for quote in quotes], dtype=np.int64)
+    per_row = expected[pair_index]
+    priced = per_row >= 0
+    bad = np.flatnonzero(priced & (per_row != stored[valid]))
+    mismatches = [(ids[valid[i]], room_types[valid[i]], int(nights[valid[i]]), int(stored[valid[i]]),
+                   quotes[pair_index[i]]) for i in bad]
+    return mismatches, int(len(rows) - priced.sum())
+
+
+def check_batch_python(rows, prices):
+    mismatches, unpriced = [], 0
+    for booking_id, room_type, nights, total in rows:
+        quote = prices.quote(room_type, nights)
+        if quote is None:
+            unpriced += 1
+            continue
+        stored = to_cents(total)
+        if stored != quote[2]:
+            mismatches.append((booking_id, room_type, nights, stored, quote))
+    return mismatches, unpriced
+
+
+class RepriceReport:
+    def __init__(self, applied):
+        self.applied = applied
+        self.scanned = 0
+        self.mismatched = 0
+        self.unpriced = 0
+        self.updated = 0
+        self.difference = 0        # cents, expected minus stored, over the mismatches
+        self.by_room_type = {}     # room type -> mismatches
+        self.elapsed = 0.0
+        self.engine = None
+        self.mismatches_path = None
+
+    @property
+    def rows_per_second(self):
+        return self.scanned / self.elapsed if self.elapsed > 0 else 0.0
+
+    def summary(self):
+        text = (f"{self.scanned:,} bookings checked against VAT {VAT_RATE:.0%} in {self.elapsed:.1f}s "
+                f"({self.rows_per_second:,.0f} rows/s, {self.engine}): {self.mismatched:,} mismatched")
+        if self.mismatched:
+            text += (f", net difference {from_cents(self.difference):+,.2f} ("
+                     + ", ".join(f"{room_type}: {count:,}" for room_type, count in sorted(self.by_room_type.items()))
+                     + ")")
+        if self.unpriced:
+            text += f"\n{self.unpriced:,} bookings have a room type missing from PRICES (left unchanged)"
+        if self.applied:
+            text += f"\n{self.updated:,} bookings repriced"
+        if self.mismatches_path:
+            text += f"\nMismatches: {self.mismatches_path}"
+        return text
+
+
+def reprice_bookings(connect=pool.connection, apply=False, room_type=None, batch_size=REPRICE_BATCH_SIZE,
+                     mismatches_path=None, progress=None, use_numpy=None):
+    # progress(report) is called after every batch
+    report = RepriceReport(apply)
+    if use_numpy is None:
+        use_numpy = has_numpy()
+    report.engine = "numpy" if use_numpy else "python"
+    check_batch = check_batch_numpy if use_numpy else check_batch_python
+    prices = PriceList()
+    start = time.perf_counter()
+    out = writer = None
+    last_id = 0
+    try:
+        with connect() as conn:
+            while True:
+                if room_type:
+                    rows = conn.execute(SQL_REPRICE_BATCH_ROOM, (room_type, last_id, batch_size)).fetchall()
+                else:
+                    rows = conn.execute(SQL_REPRICE_BATCH, (last_id, batch_size)).fetchall()
+                if not rows:
+                    break
+                first_id, last_id = rows[0][0], rows[-1][0]
+                mismatches, unpriced = check_batch(rows, prices)
+                report.scanned += len(rows)
+                report.unpriced += unpriced
+                report.mismatched += len(mismatches)
+
+                corrections = {}   # (room type, nights) -> expected total (cents)
+                for booking_id, rt, nights, stored, quote in mismatches:
+                    report.difference += quote[2] - stored
+                    report.by_room_type[rt] = report.by_room_type.get(rt, 0) + 1
+                    corrections[rt, nights] = quote[2]
+                if mismatches and mismatches_path:
+                    if writer is None:
+                        out = open(mismatches_path, "w", newline="", encoding="utf-8")
+                        writer = csv.writer(out)
+                        writer.writerow(MISMATCH_HEADER)
+                        report.mismatches_path = mismatches_path
+                    writer.writerows(
+                        (booking_id, rt, nights, from_cents(stored), from_cents(quote[0]), from_cents(quote[1]),
+                         from_cents(quote[2]), from_cents(quote[2] - stored))
+                        for booking_id, rt, nights, stored, quote in mismatches
+                    )
+
+                if apply and corrections:
+                    for (rt, nights), total in corrections.items():
+                        total = from_cents(total)
+                        params = (total, rt, nights, first_id, last_id, total)
+                        record_write(conn, [(SQL_ROLLUP_REPRICE, params)], [(SQL_CHANGES_REPRICE, params)])
+                        report.updated += conn.execute(SQL_REPRICE_UPDATE, params).rowcount
+                    conn.commit()
+                else:
+                    conn.rollback()        # end the read snapshot between batches
+                report.elapsed = time.perf_counter() - start
+                if progress:
+                    progress(report)
+                if len(rows) < batch_size:
+                    break
+    finally:
+        if out:
+            out.close()
+    report.elapsed = time.perf_counter() - start
+    return report
+
+
+def main():
+    #   python reprice.py                         (audit: report + reprice_mismatches.csv)
+    #   python reprice.py --apply                 (correct every mismatched total)
+    #   python reprice.py --room-type Suite --apply --batch-size 100000
+    parser = argparse.ArgumentParser(description="Reconcile stored booking totals with the current prices and VAT")
+    parser.add_argument("--apply", action="store_true", help="update mismatched totals (default: report only)")
+    parser.add_argument("--room-type", help="only bookings of this room type")
+    parser.add_argument("--batch-size", type=int, default=REPRICE_BATCH_SIZE)
+    parser.add_argument("--out", default="reprice_mismatches.csv", help="CSV of every mismatch ('' for none)")
+    parser.add_argument("--no-numpy", action="store_true", help="use the plain Python check")
+    args = parser.parse_args()
+
+    def progress(report):
+        print(f"\r{report.scanned:,} checked, {report.mismatched:,} mismatched"
+              + (f", {report.updated:,} repriced" if report.applied else "")
+              + f" ({report.rows_per_second:,.0f} rows/s)", end="", flush=True)
+
+    report = reprice_bookings(apply=args.apply, room_type=args.room_type, batch_size=args.batch_size,
+                              mismatches_path=args.out or None, progress=progress,
+                              use_numpy=False if args.no_numpy else None)
+    print("\n" + report.summary())
+    if args.apply and report.updated:
+        if CHANGE_FEED:
+            print("Open desks pick up the new totals through the change feed within a few seconds.")
+        else:
+            print("Open desks pick up the new totals with ⟲ Refresh Dashboard.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+import datetime
+import threading
+from decimal import Decimal
+
+from config import TREND_YEARS
+from db import SQL_BOOKING_ROLLUPS
+from aggregates import to_decimal
+from availability import to_date
+
+
+# ---------------- REVENUE & OCCUPANCY TRENDS ----------------
+# Bookings and revenue per booking day live in booking_rollups, kept by the
+# writes themselves or by triggers (schema.py). The desk holds a copy in
+# memory: one entry per day, so
+# three years is about 1,100 entries however many bookings there are. It is
+# loaded with the dashboard, then kept current by this desk's writes and
+# reloaded when the change feed brings other desks' writes. Occupancy per
+# night comes from the availability index. Trends bucket both by day, week
+# (Monday) or month, so a chart costs the same at 10k or 10M bookings.
+PERIODS = ("day", "week", "month")
+
+
+def period_start(day, period):
+    if period == "week":
+        return day - datetime.timedelta(days=day.weekday())
+    if period == "month":
+        return day.replace(day=1)
+    return day
+
+
+def trend_start(today, period, years=TREND_YEARS):
+    # First day shown: `years` back from today, on a period boundary
+    try:
+        start = today.replace(year=today.year - years)
+    except ValueError:         # 29 February
+        start = today.replace(year=today.year - years, day=28)
+    return period_start(start + datetime.timedelta(days=1), period)
+
+
+def booked_day(created, check_in):
+    # Same rule as the triggers: the day the booking was made, else its check-in
+    day = created if created is not None else check_in
+    return to_date(day) if day is not None else None
+
+
+def write_deltas(old, total_cost=None, check_in=None):
+    # [(day, bookings, revenue)] of one write. old: the booking's (room type,
+    # total, created day, check-in) before an update or delete, None for an
+    # insert, whose day is None (made today, dated by the server). A delete
+    # passes no total_cost.
+    if old is None:
+        return [(None, 1, total_cost)]
+    deltas = []
+    old_day = booked_day(old[2], old[3])
+    if old_day is not None:
+        deltas.append((old_day, -1, -to_decimal(old[1])))
+    new_day = booked_day(old[2], check_in) if total_cost is not None else None
+    if new_day is not None:
+        deltas.append((new_day, 1, total_cost))
+    return deltas
+
+
+class RevenueRollups:
+    def __init__(self, write_lock=None):
+        self._days = {}            # date -> [bookings, revenue]
+        self._lock = threading.Lock()
+        # Shared with the dashboard aggregates, like the availability index
+        self.write_lock = write_lock or threading.Lock()
+
+    def resync(self, conn):
+        with self.write_lock:
+            rows = conn.execute(SQL_BOOKING_ROLLUPS).fetchall()
+            conn.rollback()
+        with self._lock:
+            self._days = {to_date(day): [int(count), to_decimal(revenue)] for day, count, revenue in rows}
+
+    def apply(self, day, count, revenue):
+        if day is None:
+            return
+        with self._lock:
+            totals = self._days.setdefault(to_date(day), [0, Decimal(0)])
+            totals[0] += count
+            totals[1] += to_decimal(revenue)
+
+    def series(self, period, start, end):
+        # [(period start, bookings, revenue)] for every period from start to
+        # end, empty ones included
+        buckets = {}
+        day = start
+        one_day = datetime.timedelta(days=1)
+        with self._lock:
+            while day <= end:
+                totals = self._days.get(day)
+                bucket = buckets.setdefault(period_start(day, period), [0, Decimal(0)])
+                if totals is not None:
+                    bucket[0] += totals[0]
+                    bucket[1] += totals[1]
+                day += one_day
+        return [(first, count, revenue) for first, (count, revenue) in buckets.items()]
+
+
+def occupancy_series(availability, period, start, end):
+    # [(period start, occupancy 0..1)] over the nights start .. end
+    buckets = {}
+    for night, taken, capacity in availability.occupancy(start, (end - start).days + 1):
+        bucket = buckets.setdefault(period_start(night, period), [0, 0])
+        bucket[0] += taken
+        bucket[1] += capacity
+    return [(first, taken / capacity if capacity else 0.0) for first, (taken, capacity) in buckets.items()]
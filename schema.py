@@ -0,0 +1,179 @@
+from mysql.connector import errors
+
+from config import (
+    SEARCH_NGRAM_PARSER, DASHBOARD_SUMMARY_TABLE, CHANGE_FEED, CHANGE_FEED_TRIGGERS, REVENUE_ROLLUPS, ROLLUP_TRIGGERS,
+)
+
+
+# ---------------- SCHEMA MIGRATIONS ----------------
+# Each migration runs once per database and is recorded in schema_migrations.
+# Statements are idempotent-tolerant: an index or column that already exists
+# (e.g. created by hand, or by a run interrupted halfway) is skipped.
+FULLTEXT_PARSER = " WITH PARSER ngram" if SEARCH_NGRAM_PARSER else ""
+
+# Optional: per-room-type dashboard totals maintained by triggers, so every
+# writer (other desks, imports, manual SQL) keeps them current.
+BOOKING_SUMMARY = [
+    "CREATE TABLE booking_summary ("
+    "room_type VARCHAR(50) PRIMARY KEY, "
+    "bookings INT NOT NULL DEFAULT 0, "
+    "revenue DECIMAL(14,2) NOT NULL DEFAULT 0)",
+    "CREATE TRIGGER trg_bookings_summary_insert AFTER INSERT ON bookings FOR EACH ROW "
+    "INSERT INTO booking_summary (room_type, bookings, revenue) VALUES (NEW.room_type, 1, NEW.total_cost) "
+    "ON DUPLICATE KEY UPDATE bookings = bookings + 1, revenue = revenue + NEW.total_cost",
+    "CREATE TRIGGER trg_bookings_summary_update AFTER UPDATE ON bookings FOR EACH ROW BEGIN "
+    "UPDATE booking_summary SET bookings = bookings - 1, revenue = revenue - OLD.total_cost "
+    "WHERE room_type = OLD.room_type; "
+    "INSERT INTO booking_summary (room_type, bookings, revenue) VALUES (NEW.room_type, 1, NEW.total_cost) "
+    "ON DUPLICATE KEY UPDATE bookings = bookings + 1, revenue = revenue + NEW.total_cost; "
+    "END",
+    "CREATE TRIGGER trg_bookings_summary_delete AFTER DELETE ON bookings FOR EACH ROW "
+    "UPDATE booking_summary SET bookings = bookings - 1, revenue = revenue - OLD.total_cost "
+    "WHERE room_type = OLD.room_type",
+    # Backfill after the triggers exist; overwriting makes it safe to re-run
+    "INSERT INTO booking_summary (room_type, bookings, revenue) "
+    "SELECT room_type, COUNT(*), COALESCE(SUM(total_cost), 0) FROM bookings GROUP BY room_type "
+    "ON DUPLICATE KEY UPDATE bookings = VALUES(bookings), revenue = VALUES(revenue)",
+]
+
+# A changelog of every booking write, so desks can pick up each other's
+# changes incrementally (changefeed.py). Each row records the writer from the
+# @lapsa_terminal session variable (a desk's terminal id, api-<terminal id>
+# for the REST API, NULL for scripts such as imports and repricing), and the
+# room type and total before and after, so dashboard deltas need no local
+# state. The app's own writes add their rows in the same transaction
+# (db.record_write); with CHANGE_FEED_TRIGGERS, triggers do it instead and
+# manual SQL is recorded too.
+CHANGE_FEED_TABLE = [
+    "CREATE TABLE booking_changes ("
+    "version BIGINT AUTO_INCREMENT PRIMARY KEY, "
+    "booking_id INT NOT NULL, "
+    "op CHAR(1) NOT NULL, "
+    "terminal VARCHAR(64) NULL, "
+    "room_type VARCHAR(50) NULL, "
+    "total_cost DECIMAL(12,2) NULL, "
+    "old_room_type VARCHAR(50) NULL, "
+    "old_total_cost DECIMAL(12,2) NULL, "
+    "changed_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP, "
+    "INDEX idx_booking_changes_changed_at (changed_at))",
+]
+CHANGE_FEED_TRIGGER_STATEMENTS = [
+    "CREATE TRIGGER trg_bookings_changes_insert AFTER INSERT ON bookings FOR EACH ROW "
+    "INSERT INTO booking_changes (booking_id, op, terminal, room_type, total_cost) "
+    "VALUES (NEW.id, 'I', @lapsa_terminal, NEW.room_type, NEW.total_cost)",
+    "CREATE TRIGGER trg_bookings_changes_update AFTER UPDATE ON bookings FOR EACH ROW "
+    "INSERT INTO booking_changes (booking_id, op, terminal, room_type, total_cost, old_room_type, old_total_cost) "
+    "VALUES (NEW.id, 'U', @lapsa_terminal, NEW.room_type, NEW.total_cost, OLD.room_type, OLD.total_cost)",
+    "CREATE TRIGGER trg_bookings_changes_delete AFTER DELETE ON bookings FOR EACH ROW "
+    "INSERT INTO booking_changes (booking_id, op, terminal, old_room_type, old_total_cost) "
+    "VALUES (OLD.id, 'D', @lapsa_terminal, OLD.room_type, OLD.total_cost)",
+]
+
+# Bookings and revenue per booking day, so the trend charts read one row per
+# day instead of scanning bookings. A booking's day is the day it was made;
+# bookings from before created_at existed are dated by their check-in, and
+# ones with neither are left out. The app's own writes keep it current in the
+# same transaction (db.record_write); with ROLLUP_TRIGGERS, triggers do it
+# instead and manual SQL is counted too.
+BOOKED_DAY = "COALESCE(DATE({row}.created_at), {row}.check_in)"
+ROLLUP_TABLE = [
+    "CREATE TABLE booking_rollups ("
+    "day DATE PRIMARY KEY, "
+    "bookings INT NOT NULL DEFAULT 0, "
+    "revenue DECIMAL(14,2) NOT NULL DEFAULT 0)",
+]
+ROLLUP_TRIGGER_STATEMENTS = [
+    "CREATE TRIGGER trg_bookings_rollup_insert AFTER INSERT ON bookings FOR EACH ROW "
+    f"IF {BOOKED_DAY.format(row='NEW')} IS NOT NULL THEN "
+    "INSERT INTO booking_rollups (day, bookings, revenue) "
+    f"VALUES ({BOOKED_DAY.format(row='NEW')}, 1, NEW.total_cost) "
+    "ON DUPLICATE KEY UPDATE bookings = bookings + 1, revenue = revenue + NEW.total_cost; "
+    "END IF",
+    "CREATE TRIGGER trg_bookings_rollup_update AFTER UPDATE ON bookings FOR EACH ROW BEGIN "
+    "UPDATE booking_rollups SET bookings = bookings - 1, revenue = revenue - OLD.total_cost "
+    f"WHERE day = {BOOKED_DAY.format(row='OLD')}; "
+    f"IF {BOOKED_DAY.format(row='NEW')} IS NOT NULL THEN "
+    "INSERT INTO booking_rollups (day, bookings, revenue) "
+    f"VALUES ({BOOKED_DAY.format(row='NEW')}, 1, NEW.total_cost) "
+    "ON DUPLICATE KEY UPDATE bookings = bookings + 1, revenue = revenue + NEW.total_cost; "
+    "END IF; "
+    "END",
+    "CREATE TRIGGER trg_bookings_rollup_delete AFTER DELETE ON bookings FOR EACH ROW "
+    "UPDATE booking_rollups SET bookings = bookings - 1, revenue = revenue - OLD.total_cost "
+    f"WHERE day = {BOOKED_DAY.format(row='OLD')}",
+]
+ROLLUP_BACKFILL = [
+    # After any triggers exist; overwriting makes it safe to re-run
+    "INSERT INTO booking_rollups (day, bookings, revenue) "
+    f"SELECT {BOOKED_DAY.format(row='bookings')} AS booked, COUNT(*), COALESCE(SUM(total_cost), 0) "
+    f"FROM bookings WHERE {BOOKED_DAY.format(row='bookings')} IS NOT NULL GROUP BY booked "
+    "ON DUPLICATE KEY UPDATE bookings = VALUES(bookings), revenue = VALUES(revenue)",
+]
+
+# In the order they are applied; None marks an optional one that is turned off
+MIGRATIONS = [
+    ("001_search_indexes", [
+        "ALTER TABLE bookings ADD INDEX idx_bookings_id_number (id_number)",
+        "ALTER TABLE bookings ADD INDEX idx_bookings_name (name)",
+        f"ALTER TABLE bookings ADD FULLTEXT INDEX ft_bookings_name (name){FULLTEXT_PARSER}",
+    ]),
+    ("002_booking_summary", BOOKING_SUMMARY) if DASHBOARD_SUMMARY_TABLE else None,
+    # Stay dates for the availability engine. Existing bookings keep a NULL
+    # check-in: their dates were never recorded, so they hold no nights.
+    ("003_stay_dates", [
+        "ALTER TABLE bookings ADD COLUMN check_in DATE NULL",
+        "ALTER TABLE bookings ADD COLUMN check_out DATE "
+        "AS (DATE_ADD(check_in, INTERVAL nights DAY)) STORED",
+        "ALTER TABLE bookings ADD INDEX idx_bookings_stay (room_type, check_out, check_in)",
+    ]),
+    # Journal reference of bookings written behind by a desk (journal.py), so a
+    # replay after a crash can't insert the same booking twice; imported rows
+    # carry their chunk's tag (importer.py)
+    ("004_client_ref", [
+        "ALTER TABLE bookings ADD COLUMN client_ref CHAR(32) NULL",
+        "ALTER TABLE bookings ADD UNIQUE INDEX uq_bookings_client_ref (client_ref)",
+    ]),
+    ("005_change_feed", CHANGE_FEED_TABLE + (CHANGE_FEED_TRIGGER_STATEMENTS if CHANGE_FEED_TRIGGERS else []))
+    if CHANGE_FEED else None,
+    # When each booking was made. Added without a default first so existing
+    # bookings keep NULL (their booking time was never recorded), then new
+    # ones are stamped by the server.
+    ("006_created_at", [
+        "ALTER TABLE bookings ADD COLUMN created_at TIMESTAMP NULL",
+        "ALTER TABLE bookings MODIFY COLUMN created_at TIMESTAMP NULL DEFAULT CURRENT_TIMESTAMP",
+    ]),
+    ("007_booking_rollups", ROLLUP_TABLE + (ROLLUP_TRIGGER_STATEMENTS if ROLLUP_TRIGGERS else []) + ROLLUP_BACKFILL)
+    if REVENUE_ROLLUPS else None,
+    # The daily receipt archive reads one day of bookings at a time
+    ("008_created_at_index", [
+        "ALTER TABLE bookings ADD INDEX idx_bookings_created_at (created_at)",
+    ]),
+]
+MIGRATIONS = [migration for migration in MIGRATIONS if migration is not None]
+
+# Duplicate key name / duplicate column / table or trigger already exists
+ALREADY_APPLIED_ERRNOS = {1050, 1060, 1061, 1359}
+
+
+def migrate(conn):
+    cursor = conn.cursor()
+    cursor.execute(
+        "CREATE TABLE IF NOT EXISTS schema_migrations ("
+        "name VARCHAR(64) PRIMARY KEY, "
+        "applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)"
+    )
+    cursor.execute("SELECT name FROM schema_migrations")
+    applied = {row[0] for row in cursor.fetchall()}
+
+    for name, statements in MIGRATIONS:
+        if name in applied:
+            continue
+        for sql in statements:
+            try:
+                cursor.execute(sql)
+            except errors.DatabaseError as err:
+                if err.errno not in ALREADY_APPLIED_ERRNOS:
+                    raise
+        cursor.execute("INSERT INTO schema_migrations (name) VALUES (%s)", (name,))
+        conn.commit()
+    cursor.close()
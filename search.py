@@ -0,0 +1,220 @@
+import re
+import threading
+from array import array
+
+from config import SEARCH_ENGINE, SEARCH_LIMIT
+from db import (
+    BOOKING_COLUMNS,
+    SQL_SEARCH_ID_PREFIX, SQL_SEARCH_NAME_PREFIX, SQL_SEARCH_NAME_FULLTEXT, SQL_SEARCH_KEYS,
+)
+
+
+# ---------------- RANKING ----------------
+# Both engines only decide *which* bookings match; the order shown to the desk
+# comes from here, so results look the same whichever engine is configured.
+FULLTEXT_MIN_TOKEN = 3             # InnoDB innodb_ft_min_token_size default
+
+
+def normalize(text):
+    return " ".join(str(text).lower().split())
+
+
+def rank(key, name, id_number):
+    # All three arguments already normalized
+    if id_number == key:
+        return 100
+    if id_number.startswith(key):
+        return 80
+    if name == key:
+        return 70
+    if name.startswith(key):
+        return 60
+    if any(word.startswith(key) for word in name.split()):
+        return 40
+    if key in name or key in id_number:
+        return 20
+    return 0
+
+
+def rank_rows(keyword, rows, limit=SEARCH_LIMIT):
+    key = normalize(keyword)
+    scored = [(rank(key, normalize(row[1]), normalize(row[4])), row) for row in rows]
+    scored.sort(key=lambda item: (item[0], item[1][0]), reverse=True)
+    return [row for score, row in scored[:limit]]
+
+
+def like_prefix(keyword):
+    escaped = keyword.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return escaped + "%"
+
+
+def fulltext_query(keyword):
+    # "+word*" for every word long enough to be in the FULLTEXT index
+    words = [w for w in re.findall(r"\w+", keyword) if len(w) >= FULLTEXT_MIN_TOKEN]
+    return " ".join(f"+{w}*" for w in words)
+
+
+# ---------------- LOCAL TRIGRAM INDEX ----------------
+def trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class TrigramIndex:
+    def __init__(self):
+        self._postings = {}        # trigram -> array of booking ids
+        self._names = {}           # booking id -> normalized name
+        self._id_numbers = {}      # booking id -> normalized ID/passport
+        self._entries = 0          # total posting entries
+        self._stale = 0            # posting entries left behind by removals
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._names)
+
+    def load(self, rows):
+        # rows: iterable of (id, name, id_number)
+        with self._lock:
+            self._postings.clear()
+            self._names.clear()
+            self._id_numbers.clear()
+            self._entries = 0
+            self._stale = 0
+            for booking_id, name, id_number in rows:
+                self._add(booking_id, name, id_number)
+
+    def add(self, booking_id, name, id_number):
+        with self._lock:
+            if booking_id in self._names:
+                self._remove(booking_id)
+            self._add(booking_id, name, id_number)
+
+    def remove(self, booking_id):
+        with self._lock:
+            self._remove(booking_id)
+
+    def search(self, keyword, limit=SEARCH_LIMIT):
+        key = normalize(keyword)
+        grams = trigrams(key)
+        if not grams:
+            return None            # too short for trigrams; caller falls back
+        with self._lock:
+            postings = [self._postings.get(gram) for gram in grams]
+            if not all(postings):
+                return []
+            # Verify against the rarest trigram's list only
+            candidates = set(min(postings, key=len))
+            scored = []
+            for booking_id in candidates:
+                name = self._names.get(booking_id)
+                if name is None:
+                    continue       # removed since it was indexed
+                score = rank(key, name, self._id_numbers[booking_id])
+                if score:
+                    scored.append((score, booking_id))
+        scored.sort(reverse=True)
+        return [booking_id for score, booking_id in scored[:limit]]
+
+    def _add(self, booking_id, name, id_number):
+        name, id_number = normalize(name), normalize(id_number)
+        self._names[booking_id] = name
+        self._id_numbers[booking_id] = id_number
+        grams = trigrams(name) | trigrams(id_number)
+        for gram in grams:
+            posting = self._postings.get(gram)
+            if posting is None:
+                posting = self._postings[gram] = array("q")
+            posting.append(booking_id)
+        self._entries += len(grams)
+
+    def _remove(self, booking_id):
+        name = self._names.pop(booking_id, None)
+        if name is None:
+            return
+        id_number = self._id_numbers.pop(booking_id)
+        # Posting lists are append-only; dead entries (removed bookings, and
+        # the old trigrams of updated ones) are skipped at query time and swept
+        # out once they make up half of the index.
+        self._stale += len(trigrams(name) | trigrams(id_number))
+        if self._stale > self._entries // 2:
+            self._compact()
+
+    def _compact(self):
+        # Rebuilt from the current names and ID numbers: an updated booking is
+        # still live, so filtering the old lists by id would keep its old grams
+        self._postings.clear()
+        self._entries = 0
+        self._stale = 0
+        for booking_id, name in list(self._names.items()):
+            self._add(booking_id, name, self._id_numbers[booking_id])
+
+
+# ---------------- SEARCH FRONT END ----------------
+class BookingSearch:
+    def __init__(self, connect, engine=SEARCH_ENGINE, limit=SEARCH_LIMIT):
+        self.connect = connect
+        self.engine = engine
+        self.limit = limit
+        self.index = TrigramIndex() if engine == "trigram" else None
+
+    def load(self):
+        # Worker thread: build the local index with one streamed pass
+        if self.index is None:
+            return
+        with self.connect() as conn:
+            cursor = conn.cursor()
+            cursor.execute(SQL_SEARCH_KEYS)
+            self.index.load(iter_rows(cursor))
+            cursor.close()
+
+    def search(self, keyword):
+        keyword = keyword.strip()
+        with self.connect() as conn:
+            if self.index is not None:
+                ids = self.index.search(keyword, self.limit)
+                if ids is not None:
+                    return fetch_by_ids(conn, ids)
+            return self.search_database(conn, keyword)
+
+    def search_database(self, conn, keyword):
+        # Indexed lookups only: B-tree prefix range on id_number, then FULLTEXT
+        # on name (B-tree name prefix for keywords too short for FULLTEXT).
+        prefix = like_prefix(keyword)
+        rows = {}
+        for row in conn.execute(SQL_SEARCH_ID_PREFIX, (prefix, self.limit)).fetchall():
+            rows[row[0]] = row
+        query = fulltext_query(keyword)
+        if query:
+            found = conn.execute(SQL_SEARCH_NAME_FULLTEXT, (query, query, self.limit)).fetchall()
+        else:
+            found = conn.execute(SQL_SEARCH_NAME_PREFIX, (prefix, self.limit)).fetchall()
+        for row in found:
+            rows.setdefault(row[0], row)
+        return rank_rows(keyword, rows.values(), self.limit)
+
+    def on_saved(self, booking_id, name, id_number):
+        if self.index is not None:
+            self.index.add(booking_id, name, id_number)
+
+    def on_deleted(self, booking_id):
+        if self.index is not None:
+            self.index.remove(booking_id)
+
+
+def iter_rows(cursor, size=5000):
+    while True:
+        rows = cursor.fetchmany(size)
+        if not rows:
+            return
+        yield from rows
+
+
+def fetch_by_ids(conn, ids):
+    if not ids:
+        return []
+    cursor = conn.cursor()
+    placeholders = ",".join(["%s"] * len(ids))
+    cursor.execute(f"SELECT {BOOKING_COLUMNS} FROM bookings WHERE id IN ({placeholders})", tuple(ids))
+    by_id = {row[0]: row for row in cursor.fetchall()}
+    cursor.close()
+    # Keep the index's ranking order
+    return [by_id[i] for i in ids if i in by_id]
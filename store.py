@@ -0,0 +1,271 @@
+import bisect
+import datetime
+import threading
+from array import array
+from decimal import Decimal
+
+from config import PAGE_SIZE
+from availability import to_date
+from db import SQL_SELECT_BOOKINGS
+from pager import Page, first_id
+from search import iter_rows
+
+
+# ---------------- BOOKING STORE ----------------
+# Every booking held client-side, one column per field: numbers in typed
+# arrays, room types as one-byte codes, text in plain lists. Rows are in id
+# order (they are loaded ORDER BY id and new ids only grow), deletes leave a
+# tombstone until enough pile up to compact. Sorting uses one cached
+# permutation per column; later inserts are merged into it with bisect, so a
+# heading click or a filter never goes back to MySQL.
+COLUMNS = ("id", "name", "phone", "email", "id_number", "room_type", "nights", "total_cost", "check_in")
+TEXT_COLUMNS = ("name", "phone", "email", "id_number")
+CENTS = Decimal("0.01")
+
+
+class BookingStore:
+    def __init__(self):
+        self.lock = threading.RLock()        # held by StorePager while it reads rows
+        self.version = 0           # bumped on every change; views rebuild when it moves
+        self._reset()
+
+    def _reset(self):
+        self.ids = array("q")
+        self.nights = array("l")
+        self.costs = array("d")
+        self.check_ins = array("l")        # date ordinals, 0 = no check-in recorded
+        self.room_types = array("B")       # codes into self.type_names
+        self.type_names = []
+        self.text = {column: [] for column in TEXT_COLUMNS}
+        self.alive = bytearray()
+        self._type_codes = {}
+        self._rows = {}            # booking id -> row number
+        self._dead = 0
+        self._perms = {}           # column -> array of row numbers in ascending order
+
+    def load(self, conn):
+        # Worker thread: one streamed pass over the table
+        cursor = conn.cursor()
+        cursor.execute(f"{SQL_SELECT_BOOKINGS} ORDER BY id")
+        with self.lock:
+            self._reset()
+            for row in iter_rows(cursor):
+                self._append(row)
+            self.version += 1
+        cursor.close()
+        conn.rollback()
+
+    def __len__(self):
+        return len(self._rows)
+
+    # ---- sync on CRUD ----
+    def put(self, row):
+        # Insert or update one booking, keeping the cached sort orders valid
+        with self.lock:
+            i = self._rows.get(row[0])
+            if i is None:
+                i = self._append(row)
+            else:
+                self._set(i, row)
+                for perm in self._perms.values():
+                    perm.remove(i)
+            for column, perm in self._perms.items():
+                bisect.insort(perm, i, key=self._key(column))
+            self.version += 1
+
+    def remove(self, booking_id):
+        with self.lock:
+            i = self._rows.pop(booking_id, None)
+            if i is None:
+                return
+            self.alive[i] = 0
+            self._dead += 1
+            if self._dead > 1000 and self._dead * 4 > len(self.ids):
+                self._compact()
+            self.version += 1
+
+    # ---- reads ----
+    def row(self, i):
+        check_in = self.check_ins[i]
+        return (
+            self.ids[i], self.text["name"][i], self.text["phone"][i], self.text["email"][i],
+            self.text["id_number"][i], self.type_names[self.room_types[i]], self.nights[i],
+            Decimal(self.costs[i]).quantize(CENTS),
+            datetime.date.fromordinal(check_in) if check_in else None,
+        )
+
+    def view(self, sort=None, reverse=False, room_type=None, nights=(None, None), cost=(None, None)):
+        # Row numbers of the live bookings matching the filters, in display order
+        with self.lock:
+            order = self._perm(sort) if sort and sort != "id" else range(len(self.ids))
+            alive = self.alive
+            rows = [i for i in order if alive[i]]
+            if room_type:
+                code = self._type_codes.get(room_type, -1)
+                types = self.room_types
+                rows = [i for i in rows if types[i] == code]
+            rows = self._between(rows, self.nights, *nights)
+            rows = self._between(rows, self.costs, *cost)
+        if reverse:
+            rows.reverse()
+        return rows
+
+    def prepare_sorts(self, columns=("name", "room_type", "nights", "total_cost", "check_in")):
+        # Background warm-up so the first heading click is already instant
+        for column in columns:
+            with self.lock:
+                self._perm(column)
+
+    # ---- internals (call with the lock held) ----
+    def _between(self, rows, values, low, high):
+        if low is not None:
+            rows = [i for i in rows if values[i] >= low]
+        if high is not None:
+            rows = [i for i in rows if values[i] <= high]
+        return rows
+
+    def _perm(self, column):
+        perm = self._perms.get(column)
+        if perm is None:
+            perm = array("l", sorted(range(len(self.ids)), key=self._key(column)))
+            self._perms[column] = perm
+        return perm
+
+    def _key(self, column):
+        if column in self.text:
+            values = self.text[column]
+            return lambda i: values[i].casefold()
+        if column == "room_type":
+            names, codes = self.type_names, self.room_types
+            return lambda i: names[codes[i]]
+        numbers = {"id": self.ids, "nights": self.nights, "total_cost": self.costs, "check_in": self.check_ins}
+        return numbers[column].__getitem__
+
+    def _code(self, room_type):
+        code = self._type_codes.get(room_type)
+        if code is None:
+            code = self._type_codes[room_type] = len(self.type_names)
+            self.type_names.append(room_type)
+        return code
+
+    def _append(self, row):
+        i = len(self.ids)
+        self.ids.append(row[0])
+        for column in TEXT_COLUMNS:
+            self.text[column].append("")
+        self.nights.append(0)
+        self.costs.append(0.0)
+        self.check_ins.append(0)
+        self.room_types.append(0)
+        self.alive.append(1)
+        self._set(i, row)
+        self._rows[row[0]] = i
+        return i
+
+    def _set(self, i, row):
+        booking_id, name, phone, email, id_number, room_type, nights, total_cost, check_in = row[:9]
+        for column, value in zip(TEXT_COLUMNS, (name, phone, email, id_number)):
+            self.text[column][i] = str(value)
+        self.room_types[i] = self._code(room_type)
+        self.nights[i] = int(nights)
+        self.costs[i] = float(total_cost)
+        self.check_ins[i] = to_date(check_in).toordinal() if check_in else 0
+
+    def _compact(self):
+        live = [self.row(i) for i in range(len(self.ids)) if self.alive[i]]
+        self._reset()
+        for row in live:
+            self._append(row)
+
+
+# ---------------- STORE PAGER ----------------
+# The KeysetPager interface over a sorted/filtered view of the store, so the
+# table's paging controls work unchanged whichever one backs them.
+class StorePager:
+    def __init__(self, store, page_size=PAGE_SIZE):
+        self.store = store
+        self.page_size = page_size
+        self.sort = None
+        self.reverse = False
+        self.filters = {}
+        self._view = None
+        self._positions = None     # booking id -> position in the view, built on demand
+        self._version = None
+        self._lock = threading.Lock()
+
+    @property
+    def appends_at_end(self):
+        # New bookings (highest id) belong after the last row only in id order
+        return self.sort in (None, "id") and not self.reverse and not self.filters
+
+    def set_order(self, sort, reverse=False):
+        with self._lock:
+            self.sort, self.reverse = sort, reverse
+            self._view = None
+
+    def set_filters(self, room_type=None, nights=(None, None), cost=(None, None)):
+        with self._lock:
+            self.filters = {key: value for key, value in
+                            (("room_type", room_type), ("nights", nights), ("cost", cost))
+                            if value and value != (None, None)}
+            self._view = None
+
+    def count(self):
+        with self._lock, self.store.lock:
+            return len(self._current())
+
+    # ---- navigation (same contract as KeysetPager) ----
+    def first(self):
+        return self._page(0)
+
+    def last(self):
+        with self._lock, self.store.lock:
+            size = len(self._current())
+        return self._page(max(size - self.page_size, 0))
+
+    def after(self, booking_id):
+        position = self._position(booking_id)
+        return self._page(position + 1) if position is not None else self.first()
+
+    def before(self, booking_id):
+        position = self._position(booking_id)
+        if position is None:
+            return self.first()
+        return self._page(max(position - self.page_size, 0), position)
+
+    def refresh(self, page):
+        if page is None or not page.rows:
+            return self.first()
+        position = self._position(first_id(page))
+        return self._page(position) if position is not None else self.first()
+
+    def prefetch(self, page):
+        pass               # every page is already in memory
+
+    def invalidate(self):
+        with self._lock:
+            self._view = None
+
+    # ---- internals ----
+    def _current(self):
+        # Call with both locks held
+        if self._view is None or self._version != self.store.version:
+            self._version = self.store.version
+            self._view = self.store.view(self.sort, self.reverse, **self.filters)
+            self._positions = None
+        return self._view
+
+    def _position(self, booking_id):
+        with self._lock, self.store.lock:
+            view = self._current()
+            if self._positions is None:
+                ids = self.store.ids
+                self._positions = {ids[i]: position for position, i in enumerate(view)}
+            return self._positions.get(booking_id)
+
+    def _page(self, start, end=None):
+        with self._lock, self.store.lock:
+            view = self._current()
+            end = min(start + self.page_size, len(view)) if end is None else end
+            rows = [self.store.row(i) for i in view[start:end]]
+            return Page(rows, start > 0, end < len(view))
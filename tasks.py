@@ -0,0 +1,136 @@
+import queue
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from config import TASK_WORKERS, TASK_POLL_MS
+from metrics import TaskTrace
+
+
+# ---------------- BACKGROUND TASK RUNNER ----------------
+# Blocking work (MySQL I/O, PDF builds) runs on a small thread pool. Finished
+# futures are pushed onto a queue which the Tk thread drains via root.after,
+# so callbacks always run on the event-loop thread and may touch widgets.
+#
+# With metrics, each submission is timed (queue wait, run, callback) under the
+# name of the UI action that submitted it, or the function's own name.
+class TaskRunner:
+    def __init__(self, root, workers=TASK_WORKERS, poll_ms=TASK_POLL_MS,
+                 on_busy=None, on_error=None, metrics=None):
+        self.root = root
+        self.poll_ms = poll_ms
+        self.on_busy = on_busy
+        self.on_error = on_error
+        self.metrics = metrics
+        self.action = None         # name of the UI action currently submitting tasks
+        self.capture = None        # its ProfileCapture, when that action is being profiled
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="lapsa-task")
+        self._results = queue.Queue()
+        self._posts = queue.Queue()         # UI callbacks posted from worker threads
+        self._generation = {}      # key -> newest submission number
+        self._futures = {}         # key -> newest future
+        self._pending = 0
+        self._was_busy = False
+        self._closed = False
+        self._after_id = self.root.after(self.poll_ms, self._drain)
+
+    def submit(self, fn, *args, on_done=None, on_error=None, key=None, quiet=False):
+        # Submitting with a key supersedes any earlier task with the same key:
+        # queued ones are cancelled, running ones have their result dropped.
+        # Quiet tasks (e.g. prefetching) don't switch the UI into busy state.
+        generation = None
+        if key is not None:
+            generation = self._generation.get(key, 0) + 1
+            self._generation[key] = generation
+            self.cancel(key, forget=False)
+
+        trace = None
+        if self.metrics is not None:
+            trace = TaskTrace(self.metrics, self.action or getattr(fn, "__name__", type(fn).__name__), self.capture)
+            fn, args = trace.run, (fn, *args)
+        future = self._executor.submit(fn, *args)
+        if key is not None:
+            self._futures[key] = future
+        if not quiet:
+            self._pending += 1
+            self._notify_busy()
+        future.add_done_callback(
+            lambda f: self._results.put((key, generation, f, on_done, on_error, quiet, trace))
+        )
+        return future
+
+    def cancel(self, key, forget=True):
+        future = self._futures.pop(key, None)
+        if future is not None:
+            future.cancel()
+        if forget and key in self._generation:
+            # Bump the generation so an already-running task is ignored too
+            self._generation[key] += 1
+
+    def post(self, callback, *args):
+        # Thread-safe: run callback(*args) on the Tk thread (e.g. progress updates)
+        self._posts.put((callback, args))
+
+    @property
+    def busy(self):
+        return self._pending > 0
+
+    def shutdown(self):
+        self._closed = True
+        try:
+            self.root.after_cancel(self._after_id)
+        except Exception:
+            pass
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _drain(self):
+        while True:
+            try:
+                callback, args = self._posts.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                callback(*args)
+            except Exception:
+                self.root.report_callback_exception(*sys.exc_info())
+        while True:
+            try:
+                key, generation, future, on_done, on_error, quiet, trace = self._results.get_nowait()
+            except queue.Empty:
+                break
+            self._deliver(key, generation, future, on_done, on_error, quiet, trace)
+            if trace is not None:
+                trace.done()
+        self._notify_busy()
+        if not self._closed:
+            self._after_id = self.root.after(self.poll_ms, self._drain)
+
+    def _deliver(self, key, generation, future, on_done, on_error, quiet, trace):
+        if not quiet:
+            self._pending -= 1
+        if key is not None:
+            if self._futures.get(key) is future:
+                del self._futures[key]
+            if self._generation.get(key) != generation:
+                return             # superseded by a newer request
+        if future.cancelled():
+            return
+        try:
+            error = future.exception()
+            if error is not None:
+                callback, result = on_error or self.on_error, error
+            else:
+                callback, result = on_done, future.result()
+            if callback:
+                if trace is not None:
+                    trace.deliver(callback, result)
+                else:
+                    callback(result)
+        except Exception:
+            # Same treatment Tk gives a failing widget callback; keep draining
+            self.root.report_callback_exception(*sys.exc_info())
+
+    def _notify_busy(self):
+        if self.busy != self._was_busy:
+            self._was_busy = self.busy
+            if self.on_busy:
+                self.on_busy(self.busy)
@@ -0,0 +1,20 @@
+import os
+import sys
+
+import pytest
+
+# The app's modules live at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks import standin  # noqa: E402
+from db import ConnectionPool  # noqa: E402
+
+
+@pytest.fixture
+def pool(tmp_path):
+    # A connection pool over the benchmarks' SQLite stand-in for hotel_db
+    path = str(tmp_path / "hotel.sqlite3")
+    standin.create_database(path)
+    pool = ConnectionPool(size=4, connect=standin.connector(path))
+    yield pool
+    pool.close_all()
@@ -0,0 +1,71 @@
+import http.client
+import json
+
+import pytest
+
+from api import BookingAPIServer, MAX_TREND_YEARS
+from booking_service import BookingService
+from config import MAX_STAY_NIGHTS, ROOM_INVENTORY
+
+BOOKING = {"name": "Jane Doe", "phone": "0700000000", "email": "jane@example.com",
+           "id_number": "12345678", "room_type": "Single", "check_in": "2026-10-16"}
+
+
+def no_database():
+    raise AssertionError("a rejected request must not reach the database")
+
+
+@pytest.fixture
+def api():
+    server = BookingAPIServer(("127.0.0.1", 0), BookingService(connect=no_database), quiet=True)
+    server.start()
+    yield server.server_port
+    server.shutdown()
+    server.server_close()
+
+
+def request(port, method, path, body=None):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+    conn.request(method, path, body=json.dumps(body) if body is not None else None,
+                 headers={"Content-Type": "application/json"})
+    response = conn.getresponse()
+    payload = json.loads(response.read() or b"null")
+    conn.close()
+    return response.status, payload
+
+
+@pytest.mark.parametrize("query", [
+    f"nights={MAX_STAY_NIGHTS + 1}",
+    "nights=10000000",
+    "nights=0",
+    "check_in=9999-12-30&nights=5",
+])
+def test_availability_rejects_bad_stays(api, query):
+    if "check_in" not in query:
+        query += "&check_in=2026-10-16"
+    status, payload = request(api, "GET", f"/availability?room_type=Single&{query}")
+    assert status == 400
+    assert payload["error"]
+
+
+def test_availability_within_the_cap(api):
+    status, payload = request(api, "GET", f"/availability?room_type=Single&check_in=2026-10-16"
+                                          f"&nights={MAX_STAY_NIGHTS}")
+    assert status == 200
+    assert payload["free"] == ROOM_INVENTORY["Single"]
+
+
+@pytest.mark.parametrize("method, path", [("POST", "/bookings"), ("PUT", "/bookings/1")])
+def test_writes_reject_long_stays(api, method, path):
+    status, payload = request(api, method, path, dict(BOOKING, nights=10**9))
+    assert status == 400
+    assert "limited to" in payload["error"]
+    status, payload = request(api, method, path, dict(BOOKING, nights=5, check_in="9999-12-30"))
+    assert status == 400
+
+
+@pytest.mark.parametrize("years", [0, -1, MAX_TREND_YEARS + 1, 2025])
+def test_trend_rejects_years_out_of_range(api, years):
+    status, payload = request(api, "GET", f"/dashboard/trend?period=day&years={years}")
+    assert status == 400
+    assert "years" in payload["error"]
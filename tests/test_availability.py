@@ -0,0 +1,48 @@
+import datetime
+
+import pytest
+
+from availability import AvailabilityIndex, busiest_night, stay_length
+from billing import validate_booking
+from config import MAX_STAY_NIGHTS
+
+TODAY = datetime.date(2026, 10, 16)
+GUEST = ("Jane Doe", "0700000000", "jane@example.com", "12345678", "Single")
+
+
+def test_stay_length_bounds():
+    assert stay_length(1) == 1
+    assert stay_length(MAX_STAY_NIGHTS) == MAX_STAY_NIGHTS
+    for nights in (0, -3, MAX_STAY_NIGHTS + 1, 10**9):
+        with pytest.raises(ValueError):
+            stay_length(nights)
+
+
+def test_long_stay_rejected_without_per_night_state():
+    index = AvailabilityIndex({"Single": 2})
+    index.add(1, "Single", TODAY, 3)
+    length = index._length
+    with pytest.raises(ValueError, match="limited to"):
+        index.free("Single", TODAY, 10**7)
+    with pytest.raises(ValueError, match="limited to"):
+        index.check("Single", TODAY, 10**7)
+    with pytest.raises(ValueError, match="limited to"):
+        busiest_night([], TODAY, 10**7)
+    assert index._length == length
+    assert index.free("Single", TODAY, 3) == 1
+
+
+def test_stay_past_the_calendar_is_a_value_error():
+    last = datetime.date(9999, 12, 30)
+    index = AvailabilityIndex({"Single": 2})
+    with pytest.raises(ValueError, match="year 10000"):
+        index.free("Single", last, 5)
+    with pytest.raises(ValueError, match="year 10000"):
+        validate_booking(*GUEST, 5, last.isoformat())
+
+
+def test_validate_booking_caps_nights():
+    row = validate_booking(*GUEST, MAX_STAY_NIGHTS, TODAY.isoformat())
+    assert row[5] == MAX_STAY_NIGHTS
+    with pytest.raises(ValueError, match="limited to"):
+        validate_booking(*GUEST, 10**9, TODAY.isoformat())
@@ -0,0 +1,75 @@
+import datetime
+import time
+
+from booking_service import BookingService
+from changefeed import ChangeFeed
+from search import BookingSearch
+
+TODAY = datetime.date.today().isoformat()
+
+
+def desk(pool, terminal=None):
+    feed = ChangeFeed(terminal) if terminal else None
+    service = BookingService(pool.connection, search=BookingSearch(pool.connection, engine="trigram"), feed=feed)
+    service.load()
+    return service
+
+
+def test_resync_returns_the_changes_it_skips_past(pool):
+    other, here = desk(pool), desk(pool, "desk-b")
+    booked = other.book("Wanjiru Kamau", "0700000000", "w@example.com", "A123", "Suite", 2, TODAY)
+    moved = other.book("Otieno Omondi", "0700000001", "o@example.com", "B456", "Single", 1, TODAY)
+    other.update(moved[0], "Otieno Omondi", "0700000001", "o@example.com", "B456", "Double", 1, TODAY)
+
+    changes = here.resync()
+
+    assert [(change.op, change.booking_id) for change in changes] == [
+        ("I", booked[0]), ("I", moved[0]), ("U", moved[0])]
+    assert [row[0] for row in here.find("Wanjiru")] == [booked[0]]
+    # The recount already has them: nothing is applied twice afterwards
+    assert here.sync() == []
+    assert here.dashboard()["bookings_by_room_type"] == {"Suite": 1, "Double": 1}
+
+
+def add_changes(pool, versions):
+    # Changelog rows by another desk, at chosen versions (a missing one is a
+    # write not committed yet)
+    with pool.connection() as conn:
+        for version in versions:
+            conn.execute("INSERT INTO booking_changes (version, booking_id, op, terminal, room_type, total_cost) "
+                         "VALUES (%s, %s, 'I', 'desk-a', 'Single', 100)", (version, version))
+        conn.commit()
+
+
+def test_poll_reads_past_an_open_gap_without_repeating_itself(pool):
+    feed = ChangeFeed("desk-b", batch=3, gap_s=60)
+    with pool.connection() as conn:
+        feed.mark(conn)
+    add_changes(pool, range(2, 8))         # version 1 not committed yet
+
+    with pool.connection() as conn:
+        polls = []
+        for _ in range(4):
+            polls.append([change.version for change in feed.poll(conn)])
+            if not feed.behind:
+                break
+    assert polls == [[2, 3, 4], [5, 6, 7], []]
+    assert feed.version == 7 and feed.floor == 0
+
+    add_changes(pool, [1])
+    with pool.connection() as conn:
+        assert [change.version for change in feed.poll(conn)] == [1]
+        assert feed.floor == 7 and not feed.behind
+        assert feed.poll(conn) == []
+
+
+def test_poll_gives_up_on_a_gap_after_gap_s(pool):
+    feed = ChangeFeed("desk-b", batch=3, gap_s=0)
+    with pool.connection() as conn:
+        feed.mark(conn)
+    add_changes(pool, [2])
+    with pool.connection() as conn:
+        assert [change.version for change in feed.poll(conn)] == [2]
+        time.sleep(0.01)
+        assert feed.poll(conn) == []
+    assert feed.floor == 2
@@ -0,0 +1,74 @@
+import csv
+import datetime
+
+from mysql.connector import errors
+
+from availability import OverbookedError
+from billing import validate_booking
+from importer import check_chunk, import_bookings
+
+CHECK_IN = (datetime.date.today() + datetime.timedelta(days=30)).isoformat()
+HEADER = ["name", "phone", "email", "id_number", "room_type", "nights", "check_in"]
+
+
+def write_csv(path, rows):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADER)
+        writer.writerows(rows)
+    return str(path)
+
+
+def guests(count, room_type="Single", nights=2, check_in=CHECK_IN):
+    return [[f"Guest {i}", "0700000000", f"guest{i}@example.com", f"ID{i:05d}", room_type, nights, check_in]
+            for i in range(count)]
+
+
+def test_import_records_the_changelog_for_the_inserted_ids(pool, tmp_path):
+    path = write_csv(tmp_path / "bookings.csv", guests(7) + guests(3, room_type="Double"))
+    report = import_bookings(path, connect=pool.connection, chunk_size=4)
+    assert report.imported == 10
+    with pool.connection() as conn:
+        ids = [row[0] for row in conn.execute("SELECT id FROM bookings ORDER BY id").fetchall()]
+        changes = conn.execute("SELECT booking_id, op, room_type FROM booking_changes ORDER BY booking_id").fetchall()
+    assert [(booking_id, op) for booking_id, op, room_type in changes] == [(booking_id, "I") for booking_id in ids]
+    assert [room_type for booking_id, op, room_type in changes] == ["Single"] * 7 + ["Double"] * 3
+
+
+def test_check_chunk_counts_booked_stays_and_the_chunks_earlier_rows(pool, tmp_path):
+    import_bookings(write_csv(tmp_path / "booked.csv", guests(5, room_type="Suite")), connect=pool.connection)
+    later = (datetime.date.fromisoformat(CHECK_IN) + datetime.timedelta(days=2)).isoformat()
+    rows = [(line_no, {}, validate_booking(*guest)) for line_no, guest in enumerate(
+        guests(3, room_type="Suite") + guests(1, room_type="Suite", check_in=later), start=2)]
+    held = {}
+    with pool.connection() as conn:
+        fits, overbooked_rows = check_chunk(conn, rows, held)
+        conn.rollback()
+    # 6 suites: the one left goes to the first row; the stay after check-out fits too
+    assert [line_no for line_no, record, data in fits] == [2, 5]
+    assert [line_no for line_no, record, err in overbooked_rows] == [3, 4]
+    assert all(isinstance(err, OverbookedError) for line_no, record, err in overbooked_rows)
+    assert sum(held["Suite"].values()) == 4    # two nights for each row that fits
+
+
+def test_dry_run_counts_what_would_be_imported(pool, tmp_path):
+    rows = guests(8, room_type="Suite") + [["Bad Row", "0700000000", "bad@example.com", "ID99999", "Attic", 2, CHECK_IN]]
+    report = import_bookings(write_csv(tmp_path / "bookings.csv", rows), connect=pool.connection, chunk_size=3,
+                             dry_run=True)
+    # Earlier chunks' rows hold their rooms even though nothing is written
+    assert (report.read, report.valid, report.rejected, report.imported) == (9, 6, 3, 0)
+    assert report.checked_availability
+    with pool.connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM bookings").fetchone()[0] == 0
+    with open(report.errors_path, newline="", encoding="utf-8") as f:
+        assert sorted(int(line[0]) for line in list(csv.reader(f))[1:]) == [8, 9, 10]
+
+
+def test_dry_run_without_the_database_only_validates(tmp_path):
+    def unreachable():
+        raise errors.InterfaceError("Can't connect")
+
+    report = import_bookings(write_csv(tmp_path / "bookings.csv", guests(8, room_type="Suite")), connect=unreachable,
+                             dry_run=True)
+    assert (report.valid, report.rejected) == (8, 0)
+    assert not report.checked_availability
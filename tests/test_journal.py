@@ -0,0 +1,78 @@
+import datetime
+
+import pytest
+from mysql.connector import errors
+
+from availability import OverbookedError
+from billing import validate_booking
+from booking_service import BookingService
+from journal import BookingJournal, JournalFlusher
+
+CHECK_IN = (datetime.date.today() + datetime.timedelta(days=30)).isoformat()
+
+
+def guest(i, room_type="Suite"):
+    return validate_booking(f"Guest {i}", "0700000000", f"guest{i}@example.com", f"ID{i:05d}", room_type, 2, CHECK_IN)
+
+
+@pytest.fixture
+def journal(tmp_path):
+    journal = BookingJournal(str(tmp_path / "journal.sqlite3"))
+    yield journal
+    journal.close()
+
+
+@pytest.fixture
+def service(pool):
+    service = BookingService(pool.connection)
+    service.load()
+    return service
+
+
+def statuses(journal):
+    return journal._db.execute("SELECT status, booking_id, error FROM journal ORDER BY seq").fetchall()
+
+
+def test_replay_after_a_crash_finds_the_committed_booking(pool, journal, service):
+    entry = journal.append("insert", guest(1))
+    # Committed to MySQL, then the desk died before the journal heard back
+    [(_, row)] = JournalFlusher(journal, service).write(journal.pending())
+    assert journal.count_pending() == 1
+
+    flushed = []
+    assert not JournalFlusher(journal, service, on_flushed=flushed.extend).flush()
+    assert [(done.client_ref, result[0]) for done, result in flushed] == [(entry.client_ref, row[0])]
+    assert statuses(journal) == [("done", row[0], None)]
+    with pool.connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM bookings").fetchone()[0] == 1
+
+
+def test_rejected_writes_stay_in_the_journal_with_the_reason(pool, journal, service):
+    for i in range(6):
+        service.insert(guest(i))            # every suite taken
+    kept = service.insert(guest(6, "Single"))
+    service.delete(kept[0])
+    journal.append("insert", guest(7))
+    journal.append("update", guest(8, "Single"), booking_id=kept[0])
+    journal.append("insert", guest(9, "Double"))
+
+    flushed = []
+    JournalFlusher(journal, service, on_flushed=flushed.extend).flush()
+    results = [result for entry, result in flushed]
+    assert isinstance(results[0], OverbookedError)
+    assert isinstance(results[1], LookupError)
+    assert results[2][5] == "Double"
+    assert [status for status, booking_id, error in statuses(journal)] == ["rejected", "rejected", "done"]
+    assert "Fully booked" in statuses(journal)[0][2]
+    assert journal.count_pending() == 0
+
+
+def test_an_unreachable_database_keeps_the_writes_pending(journal):
+    class Unreachable:
+        def write_group(self, writes, keep_going=False):
+            raise errors.OperationalError("Lost connection")
+
+    journal.append("insert", guest(1))
+    with pytest.raises(errors.OperationalError):
+        JournalFlusher(journal, Unreachable()).flush()
+    assert statuses(journal) == [("pending", None, None)]
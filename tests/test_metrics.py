@@ -0,0 +1,28 @@
+import pstats
+import time
+
+from metrics import Metrics, ProfileCapture, TaskTrace
+
+
+def wait_on_user(seconds=0.2):
+    time.sleep(seconds)
+    return "ok"
+
+
+def test_dialog_time_is_left_out_of_actions_and_callbacks(tmp_path):
+    metrics = Metrics(log_path=None, profile_dir=str(tmp_path))
+    with metrics.timed("action", "book_room"):
+        assert metrics.dialog(wait_on_user) == "ok"
+    trace = TaskTrace(metrics, "book_room")
+    trace.deliver(lambda result: metrics.dialog(wait_on_user), None)
+    samples = {sample.kind: sample for sample in metrics._samples}
+    assert samples["action"].ms < 100
+    assert samples["ui"].ms < 100
+    assert metrics.dialog_ms >= 400
+
+
+def test_dialog_is_not_profiled(tmp_path):
+    metrics = Metrics(log_path=None, profile_dir=str(tmp_path))
+    capture = ProfileCapture("book_room", str(tmp_path))
+    capture.run(lambda: metrics.dialog(wait_on_user))
+    assert pstats.Stats(capture._profiles[0]).total_tt < 0.1
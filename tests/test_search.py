@@ -0,0 +1,32 @@
+from search import TrigramIndex, trigrams
+
+
+def posted(index, booking_id):
+    return {gram for gram, ids in index._postings.items() if booking_id in ids}
+
+
+def test_compaction_drops_an_updated_bookings_old_trigrams():
+    index = TrigramIndex()
+    index.load([(1, "Alice Wanjiru", "A1234567"), (2, "Brian Otieno", "B7654321"), (3, "Esther Achieng", "E3333333")])
+    index.add(1, "Carol Njeri", "C1111111")
+    assert index._stale                    # the old grams are still posted until compaction
+    index.add(2, "Dennis Kamau", "D2222222")
+    assert index._stale == 0               # the second update crossed half the index
+
+    assert posted(index, 1) == trigrams("carol njeri") | trigrams("c1111111")
+    assert posted(index, 2) == trigrams("dennis kamau") | trigrams("d2222222")
+    assert index._entries == sum(len(ids) for ids in index._postings.values())
+    assert index.search("alice") == []
+    assert index.search("a1234") == []
+    assert index.search("carol") == [1]
+
+
+def test_compaction_sweeps_removed_bookings():
+    index = TrigramIndex()
+    index.load([(1, "Alice Wanjiru", "A1234567"), (2, "Brian Otieno", "B7654321"), (3, "Carol Njeri", "C1111111")])
+    index.remove(1)
+    index.remove(2)
+    assert index._stale == 0
+    assert all(list(ids) == [3] for ids in index._postings.values())
+    assert len(index) == 1
+    assert index.search("brian") == []
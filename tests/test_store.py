@@ -0,0 +1,78 @@
+import datetime
+from decimal import Decimal
+
+from store import BookingStore, StorePager
+
+CHECK_IN = datetime.date(2026, 11, 2)
+
+
+def booking(booking_id, name, room_type="Single", nights=1, total_cost=50):
+    return (booking_id, name, "0700000000", f"guest{booking_id}@example.com", f"ID{booking_id}",
+            room_type, nights, Decimal(total_cost), CHECK_IN)
+
+
+def filled():
+    store = BookingStore()
+    for row in (booking(1, "wanjiru", "Suite", 3, 360), booking(2, "Achieng", "Single", 1, 50),
+                booking(3, "Otieno", "Double", 2, 160), booking(4, "Baraka", "Single", 4, 200)):
+        store.put(row)
+    return store
+
+
+def ids(store, rows):
+    return [store.ids[i] for i in rows]
+
+
+def test_sort_orders_stay_valid_through_writes():
+    store = filled()
+    assert ids(store, store.view("name")) == [2, 4, 3, 1]          # case-insensitive
+    assert ids(store, store.view("total_cost", reverse=True)) == [1, 4, 3, 2]
+    store.put(booking(5, "Njeri", "Double", 2, 160))
+    store.put(booking(2, "Zawadi", "Single", 1, 50))               # an update moves the row
+    store.remove(4)
+    assert ids(store, store.view("name")) == [5, 3, 1, 2]
+    assert ids(store, store.view("total_cost", reverse=True)) == [1, 5, 3, 2]
+    assert ids(store, store.view()) == [1, 2, 3, 5]
+    assert store.row(store._rows[2]) == booking(2, "Zawadi", "Single", 1, 50)
+
+
+def test_filters_combine():
+    store = filled()
+    assert ids(store, store.view(room_type="Single")) == [2, 4]
+    assert ids(store, store.view(nights=(2, None))) == [1, 3, 4]
+    assert ids(store, store.view(nights=(2, 3), cost=(None, 200))) == [3]
+    assert ids(store, store.view("name", room_type="Single", cost=(100, None))) == [4]
+    assert store.view(room_type="Penthouse") == []
+
+
+def test_pager_pages_through_the_sorted_filtered_view():
+    store = filled()
+    pager = StorePager(store, page_size=2)
+    pager.set_order("name")
+    first = pager.first()
+    assert [row[0] for row in first.rows] == [2, 4] and (first.has_prev, first.has_next) == (False, True)
+    second = pager.after(4)
+    assert [row[0] for row in second.rows] == [3, 1] and (second.has_prev, second.has_next) == (True, False)
+    assert [row[0] for row in pager.before(3).rows] == [2, 4]
+    assert [row[0] for row in pager.last().rows] == [3, 1]
+
+    pager.set_filters(room_type="Single")
+    assert pager.count() == 2 and not pager.appends_at_end
+    assert [row[0] for row in pager.first().rows] == [2, 4]
+    # A write moves the store's version; the view is rebuilt without invalidate()
+    store.put(booking(6, "Amani", "Single", 1, 50))
+    assert pager.count() == 3
+    assert [row[0] for row in pager.refresh(first).rows] == [2, 6]
+
+
+def test_load_reads_bookings_in_id_order(pool):
+    with pool.connection() as conn:
+        for name in ("Wanjiru", "Achieng", "Otieno"):
+            conn.execute("INSERT INTO bookings (name, phone, email, id_number, room_type, nights, total_cost, check_in) "
+                         "VALUES (%s, '0700000000', 'x@example.com', 'ID1', 'Single', 1, 50, %s)", (name, CHECK_IN))
+        conn.commit()
+        store = BookingStore()
+        store.load(conn)
+    assert len(store) == 3
+    assert [store.row(i)[1] for i in store.view()] == ["Wanjiru", "Achieng", "Otieno"]
+    assert store.row(0)[8] == CHECK_IN